@@ -0,0 +1,131 @@
+import random
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from login.models import User
+from quizbank.models import Category, Course, Question, QuestionType, SupportObjective
+from quizbank.search import rebuild_index
+from users.models import LearningRecord
+from users.summary import rebuild_summaries
+
+# 合成数据规模：courses门课程，每门课程一棵depth层、每个节点fanout个子节点的知识点树，
+# 共questions道题平均分到各课程，students个学生共records条学习记录
+SCALES = {
+    'tiny': {'courses': 2, 'depth': 3, 'fanout': 2, 'questions': 200, 'students': 10, 'records': 1000},
+    'small': {'courses': 3, 'depth': 5, 'fanout': 3, 'questions': 10000, 'students': 100, 'records': 100000},
+    'full': {'courses': 5, 'depth': 7, 'fanout': 3, 'questions': 100000, 'students': 1000, 'records': 1000000},
+}
+BATCH_SIZE = 5000
+# 基准使用的账号，密码相同
+TEACHER = 'bench-teacher'
+STUDENT = 'bench-student'
+PASSWORD = 'bench-password'
+COURSE_PREFIX = '基准课程'
+# 试题文本的词汇，搜索接口用其中的词查询
+VOCABULARY = ['函数', '极限', '导数', '积分', '矩阵', '向量', '概率', '统计', '数列', '方程', 'sql', 'python', 'tcp', 'cache']
+
+
+# 生成合成数据，返回describe()的结果；同一规模和种子生成的数据相同
+def generate(scale='small', seed=0):
+    params = SCALES[scale]
+    rng = random.Random(seed)
+    with transaction.atomic():
+        teacher = User.objects.create_user(username=TEACHER, password=PASSWORD, role='教师')
+        students = [User.objects.create_user(username=STUDENT, password=PASSWORD, role='学生')]
+        students += User.objects.bulk_create([
+            User(username=f'bench-student-{i}', password=teacher.password, role='学生')
+            for i in range(1, params['students'])
+        ])
+        question_type = QuestionType.objects.get_or_create(type_code='SC', defaults={'description': '单选题'})[0]
+        per_course = params['questions'] // params['courses']
+        question_ids = []
+        for number in range(params['courses']):
+            # 课程简介记录数据规模，--keepdb复用数据时据此检查
+            course = Course.objects.create(name=f'{COURSE_PREFIX}{number + 1}', description=scale)
+            leaves = _category_tree(course, params['depth'], params['fanout'])
+            objectives = SupportObjective.objects.bulk_create([
+                SupportObjective(course=course, name=f'目标{i + 1}', order=i + 1) for i in range(5)
+            ])
+            question_ids += _questions(rng, course, question_type, per_course, leaves, objectives)
+        _records(rng, students, question_ids, params['records'])
+    rebuild_index()
+    rebuild_summaries()
+    return describe()
+
+# 按层批量创建知识点，物化路径随后一次性写入；返回叶子节点（知识点）
+def _category_tree(course, depth, fanout):
+    level = [None]
+    for height in range(depth):
+        level = Category.objects.bulk_create([
+            Category(course=course, name=f'{height + 1}-{index + 1}', parent=parent, order=index + 1,
+                     is_knowledge_point=height == depth - 1)
+            for parent in level for index in range(fanout)
+        ], batch_size=BATCH_SIZE)
+        for category in level:
+            category.path = f'{category.parent.path if category.parent else "/"}{category.pk}/'
+        Category.objects.bulk_update(level, ['path'], batch_size=BATCH_SIZE)
+    return level
+
+def _questions(rng, course, question_type, count, leaves, objectives):
+    created = []
+    for start in range(0, count, BATCH_SIZE):
+        created += Question.objects.bulk_create([
+            Question(
+                question_type=question_type, course=course, summary=f'{course.name}第{i + 1}题{rng.choice(VOCABULARY)}',
+                content_markdown=' '.join(rng.choices(VOCABULARY, k=20)), answer_markdown='A',
+                answer_json={'answer': 'A'}, explanation_markdown=' '.join(rng.choices(VOCABULARY, k=10)),
+            )
+            for i in range(start, min(start + BATCH_SIZE, count))
+        ])
+    ids = [question.pk for question in created]
+    Question.categories.through.objects.bulk_create([
+        Question.categories.through(question_id=question_id, category_id=rng.choice(leaves).pk) for question_id in ids
+    ], batch_size=BATCH_SIZE)
+    Question.support_objectives.through.objects.bulk_create([
+        Question.support_objectives.through(question_id=question_id, supportobjective_id=rng.choice(objectives).pk)
+        for question_id in ids
+    ], batch_size=BATCH_SIZE)
+    return list(zip(ids, [course.pk] * len(ids)))
+
+# 每个学生学习同样数量的随机试题，到期日期分布在过去30天到未来60天
+def _records(rng, students, questions, total):
+    today = timezone.now().date()
+    per_student = min(total // len(students), len(questions))
+    batch = []
+    for student in students:
+        for question_id, course_id in rng.sample(questions, per_student):
+            repetition = rng.randint(0, 8)
+            batch.append(LearningRecord(
+                user_id=student.pk, question_id=question_id, course_id=course_id, ef=round(rng.uniform(1.3, 2.8), 2),
+                interval=rng.randint(1, 60), next_review_date=today + timedelta(days=rng.randint(-30, 60)),
+                last_review_date=today - timedelta(days=rng.randint(0, 60)), repetition=repetition,
+                last_quality=rng.randint(0, 5), status='mastered' if repetition >= 6 else 'reviewing',
+            ))
+            if len(batch) >= BATCH_SIZE:
+                LearningRecord.objects.bulk_create(batch)
+                batch = []
+    LearningRecord.objects.bulk_create(batch)
+
+
+# 基准接口要用到的对象ID；数据不存在时返回None
+def describe():
+    teacher = User.objects.filter(username=TEACHER).first()
+    student = User.objects.filter(username=STUDENT).first()
+    course = Course.objects.filter(name=f'{COURSE_PREFIX}1').first()
+    if teacher is None or student is None or course is None:
+        return None
+    categories = Category.objects.filter(course=course)
+    return {
+        'scale': course.description,
+        'teacher_id': teacher.pk,
+        'student_id': student.pk,
+        'course_id': course.pk,
+        'root_category_id': categories.filter(parent=None).order_by('order').values_list('id', flat=True).first(),
+        'branch_category_id': categories.filter(parent__parent=None).exclude(parent=None).order_by('id').values_list('id', flat=True).first(),
+        'leaf_category_id': categories.filter(is_knowledge_point=True).order_by('id').values_list('id', flat=True).first(),
+        'objective_id': SupportObjective.objects.filter(course=course).order_by('order').values_list('id', flat=True).first(),
+        'question_id': Question.objects.filter(course=course).order_by('id').values_list('id', flat=True).first(),
+        'question_type_id': QuestionType.objects.get(type_code='SC').pk,
+        'questions': Question.objects.count(),
+        'records': LearningRecord.objects.count(),
+    }
@@ -0,0 +1,138 @@
+import io
+import json
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from quizbank.models import Category, Course, Question, SupportObjective
+from .datagen import PASSWORD, STUDENT, VOCABULARY
+
+# 基准覆盖的接口：login、quizbank和users三个应用urls.py中的每个路由至少一个
+# path和data（GET时为查询参数）可以是值，也可以是接收上下文ctx的函数；ctx包含datagen.describe()的ID、本次执行的序号i，
+# 以及setup(ctx)返回的字段。setup在计时之外执行，用于为删除等破坏性接口准备对象
+
+
+class Endpoint:
+    def __init__(self, name, method, path, data=None, format='json', status=200, user='student', setup=None, repeat=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.format = format
+        self.status = status
+        # student、teacher或None（不登录）
+        self.user = user
+        self.setup = setup
+        # 覆盖默认执行次数，用于密码哈希等本身就慢的接口
+        self.repeat = repeat
+
+    def build(self, ctx):
+        path = self.path(ctx) if callable(self.path) else self.path.format(**ctx)
+        data = self.data(ctx) if callable(self.data) else self.data
+        return path, data
+
+
+def _course(ctx):
+    return {'course': Course.objects.create(name=f'临时课程{ctx["i"]}', description='基准测试').pk}
+
+def _category(ctx):
+    category = Category.objects.create(course_id=ctx['course_id'], name=f'临时知识点{ctx["i"]}', parent_id=ctx['leaf_category_id'])
+    return {'category': category.pk}
+
+def _objective(ctx):
+    return {'objective': SupportObjective.objects.create(course_id=ctx['course_id'], name=f'临时目标{ctx["i"]}').pk}
+
+def _question(ctx):
+    question = Question.objects.create(
+        question_type_id=ctx['question_type_id'], course_id=ctx['course_id'], summary='临时试题',
+        content_markdown='内容', answer_markdown='A', answer_json={}, explanation_markdown='解析',
+    )
+    return {'question': question.pk}
+
+def _question_payload(ctx):
+    return {
+        'question_type': ctx['question_type_id'], 'summary': f'新试题{ctx["i"]}', 'content_markdown': '内容',
+        'answer_markdown': 'A', 'answer_json': {'answer': 'A'}, 'explanation_markdown': '解析',
+        'categories': [ctx['leaf_category_id']], 'support_objectives': [ctx['objective_id']],
+    }
+
+def _question_import(ctx):
+    row = {**_question_payload(ctx), 'question_type': 'SC'}
+    lines = '\n'.join(json.dumps(row, ensure_ascii=False) for _ in range(20))
+    return {'file': SimpleUploadedFile('bank.jsonl', lines.encode())}
+
+def _roster(ctx):
+    rows = ''.join(f'roster-{ctx["i"]}-{n},pw{n}\n' for n in range(10))
+    return {'file': SimpleUploadedFile('roster.csv', f'username,password\n{rows}'.encode())}
+
+# 每次内容不同，避免按内容去重后不再写文件
+def _image(ctx):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 32), (ctx['i'] % 256, 0, 0)).save(buffer, format='PNG')
+    return {'image': SimpleUploadedFile(f'bench-{ctx["i"]}.png', buffer.getvalue())}
+
+def _grades(ctx):
+    return {'updates': [{'question_id': ctx['question_id'] + n, 'quality_score': (ctx['i'] + n) % 6} for n in range(20)]}
+
+
+COURSE = '/api/teach_admin/courses/{course_id}'
+LEARN = '/api/learn/courses/{course_id}'
+
+ENDPOINTS = [
+    # login
+    Endpoint('login.login', 'post', '/api/users/login/', {'username': STUDENT, 'password': PASSWORD}, user=None, repeat=5),
+    Endpoint('login.register', 'post', '/api/users/register/',
+             lambda ctx: {'username': f'register-{ctx["i"]}', 'password': 'pw', 'role': '学生'}, status=201, user=None, repeat=5),
+    Endpoint('login.roster_import', 'post', '/api/users/roster/import/', _roster, format='multipart', user='teacher', repeat=3),
+    # quizbank
+    Endpoint('quizbank.course_list', 'get', '/api/teach_admin/courses/'),
+    Endpoint('quizbank.course_create', 'post', '/api/teach_admin/courses/',
+             lambda ctx: {'name': f'新课程{ctx["i"]}', 'description': '基准测试'}, status=201, user='teacher'),
+    Endpoint('quizbank.course_update', 'patch', lambda ctx: f'/api/teach_admin/courses/{ctx["course"]}/',
+             lambda ctx: {'description': f'简介{ctx["i"]}'}, user='teacher', setup=_course),
+    Endpoint('quizbank.course_delete', 'delete', lambda ctx: f'/api/teach_admin/courses/{ctx["course"]}/',
+             status=204, user='teacher', setup=_course),
+    Endpoint('quizbank.course_export', 'get', COURSE + '/export/', user='teacher', repeat=7),
+    Endpoint('quizbank.category_list', 'get', COURSE + '/category/'),
+    Endpoint('quizbank.category_create', 'post', COURSE + '/category/',
+             lambda ctx: {'name': f'新知识点{ctx["i"]}', 'parent_id': ctx['branch_category_id']}, status=201, user='teacher'),
+    Endpoint('quizbank.category_update', 'put', COURSE + '/category/{leaf_category_id}/',
+             lambda ctx: {'order': ctx['i'] + 1}, user='teacher'),
+    Endpoint('quizbank.category_delete', 'delete', lambda ctx: f'/api/teach_admin/courses/{ctx["course_id"]}/category/{ctx["category"]}/',
+             status=204, user='teacher', setup=_category),
+    Endpoint('quizbank.tree_move', 'post', COURSE + '/tree-update/',
+             lambda ctx: {'draggedId': ctx['category'], 'dropId': ctx['branch_category_id'], 'type': 'inner'},
+             user='teacher', setup=_category),
+    Endpoint('quizbank.tree_move_batch', 'post', COURSE + '/tree-update/batch/',
+             lambda ctx: {'moves': [{'draggedId': ctx['category'], 'dropId': ctx['root_category_id'], 'type': 'before'},
+                                    {'draggedId': ctx['category'], 'dropId': ctx['branch_category_id'], 'type': 'inner'}]},
+             user='teacher', setup=_category),
+    Endpoint('quizbank.question_list', 'get', COURSE + '/questions/'),
+    Endpoint('quizbank.question_list_page', 'get', COURSE + '/questions/?page_size=50'),
+    Endpoint('quizbank.question_create', 'post', COURSE + '/questions/', _question_payload, status=201, user='teacher'),
+    Endpoint('quizbank.question_import', 'post', COURSE + '/questions/import/', _question_import, format='multipart', user='teacher'),
+    Endpoint('quizbank.objective_list', 'get', '/api/teach_admin/question/{course_id}/support-objectives/'),
+    Endpoint('quizbank.objective_create', 'post', '/api/teach_admin/question/{course_id}/support-objectives/',
+             lambda ctx: {'name': f'新目标{ctx["i"]}'}, status=201, user='teacher'),
+    Endpoint('quizbank.objective_delete', 'delete',
+             lambda ctx: f'/api/teach_admin/question/{ctx["course_id"]}/support-objectives/{ctx["objective"]}/',
+             status=204, user='teacher', setup=_objective),
+    Endpoint('quizbank.question_detail', 'get', '/api/teach_admin/question/{question_id}/detail'),
+    Endpoint('quizbank.question_update', 'put', lambda ctx: f'/api/teach_admin/question/{ctx["question"]}/detail',
+             _question_payload, user='teacher', setup=_question),
+    Endpoint('quizbank.question_delete', 'delete', lambda ctx: f'/api/teach_admin/question/{ctx["question"]}/delete',
+             status=204, user='teacher', setup=_question),
+    Endpoint('quizbank.upload_image', 'post', '/api/teach_admin/upload_image/', _image, format='multipart', user='teacher'),
+    Endpoint('quizbank.search', 'get', '/api/teach_admin/question/search-by-content/',
+             lambda ctx: {'query': VOCABULARY[0], 'course_id': ctx['course_id'], 'page_size': 20}),
+    Endpoint('quizbank.cache_stats', 'get', '/api/teach_admin/cache-stats/', user='teacher'),
+    # users
+    Endpoint('learn.question_stats', 'get', LEARN + '/question-stats/'),
+    Endpoint('learn.question_learn', 'get', LEARN + '/question-learn/?question_num=10'),
+    Endpoint('learn.question_review', 'get', LEARN + '/question-review/?question_num=10'),
+    Endpoint('learn.grade', 'post', '/api/learn/courses/learning-records/', _grades),
+    Endpoint('learn.statistics', 'get', '/api/learn/courses/learning-statistics/'),
+    Endpoint('learn.forecast', 'get', '/api/learn/review-forecast/?days=30'),
+    Endpoint('learn.course_forecast', 'get', LEARN + '/review-forecast/?days=30'),
+    Endpoint('learn.async_question_learn', 'get', '/api/learn/async/courses/{course_id}/question-learn/?question_num=10'),
+    Endpoint('learn.async_question_review', 'get', '/api/learn/async/courses/{course_id}/question-review/?question_num=10'),
+    Endpoint('learn.async_grade', 'post', '/api/learn/async/courses/learning-records/', _grades),
+]
@@ -0,0 +1,128 @@
+"""
+接口性能回归基准：在临时测试数据库中生成合成数据，经Django测试客户端逐个调用接口，
+记录查询数、p50/p99延迟和峰值内存，与JSON基线比较，超出budgets.json中的预算时以状态码1退出。
+
+    python benchmarks/run.py --scale small
+    python benchmarks/run.py --scale small --update-baseline     # 在本机重新生成基线
+
+默认使用benchmarks/settings.py（本地SQLite和进程内缓存），要在PostgreSQL上测量时用--settings指定其他设置模块；
+数据库使用设置中的default，与manage.py test一样创建并在结束后删除测试库；
+--keepdb保留测试库和生成的数据，下次运行直接复用（full规模生成100万条学习记录需要数分钟）；
+SQLite的测试库默认在内存中，需要在DATABASES['default']['TEST']['NAME']中指定文件才能保留。
+延迟与机器有关，更换机器后先用--update-baseline生成基线；查询数与机器无关。
+延迟超出预算的接口会重测（--retries，默认2次），延迟取各次的最小值，避免偶发干扰使检查失败。
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口查询数、延迟和内存的回归基准')
+    parser.add_argument('--settings', default='benchmarks.settings', help='Django设置模块，默认为本地SQLite')
+    parser.add_argument('--scale', default='small', help='合成数据规模：tiny、small或full')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, help='每个接口计时的次数')
+    parser.add_argument('--only', action='append', help='只测量名称以此开头的接口，可重复')
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIR, 'baseline.json'))
+    parser.add_argument('--budgets', default=os.path.join(BENCHMARK_DIR, 'budgets.json'))
+    parser.add_argument('--update-baseline', action='store_true', help='把本次结果写入基线')
+    parser.add_argument('--retries', type=int, default=2, help='延迟超出预算的接口最多重测的次数，延迟取各次最小值')
+    parser.add_argument('--output', help='把本次结果另存为JSON')
+    parser.add_argument('--keepdb', action='store_true', help='保留测试数据库和合成数据')
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases
+    from benchmarks.datagen import SCALES, describe, generate
+    from benchmarks.endpoints import ENDPOINTS
+    from benchmarks.runner import DEFAULT_REPEAT, BenchmarkError, check, confirm, run
+
+    if args.scale not in SCALES:
+        parser.error(f'--scale必须是{"、".join(SCALES)}之一')
+    endpoints = [e for e in ENDPOINTS if not args.only or any(e.name.startswith(prefix) for prefix in args.only)]
+
+    baseline = budgets = None
+    if not args.update_baseline:
+        if not os.path.exists(args.baseline):
+            print(f'没有基线{args.baseline}，请先用--update-baseline生成', file=sys.stderr)
+            return 1
+        baseline = _read(args.baseline)
+        if (baseline['scale'], baseline['database']) != (args.scale, connection.vendor):
+            print(f'基线是{baseline["database"]}上的{baseline["scale"]}规模数据，与本次不同，请用--update-baseline重新生成',
+                  file=sys.stderr)
+            return 1
+        budgets = _read(args.budgets) if os.path.exists(args.budgets) else {}
+
+    setup_test_environment()
+    try:
+        databases = setup_databases(verbosity=1, interactive=False, keepdb=args.keepdb, aliases={'default'})
+    except Exception as exc:
+        print(f'创建测试数据库失败：{exc}', file=sys.stderr)
+        return 1
+    try:
+        dataset = describe()
+        if dataset is None:
+            started = time.perf_counter()
+            dataset = generate(args.scale, args.seed)
+            print(f'生成{args.scale}规模数据：{dataset["questions"]}道题、{dataset["records"]}条学习记录，'
+                  f'用时{time.perf_counter() - started:.1f}s')
+        elif dataset['scale'] != args.scale:
+            raise BenchmarkError(f'保留的测试库是{dataset["scale"]}规模的数据，请去掉--keepdb重新生成')
+
+        def progress(name, result):
+            print(f'{name:32} {result["queries"]:>4}次查询  p50 {result["p50_ms"]:>9.2f}ms  '
+                  f'p99 {result["p99_ms"]:>9.2f}ms  峰值内存 {result["peak_kb"]:>9.1f}KB')
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            offset = int(time.time()) * 1000
+            results = run(endpoints, dataset, args.repeat or DEFAULT_REPEAT, offset=offset, progress=progress)
+            if baseline is not None:
+                confirm(endpoints, dataset, results, baseline['endpoints'], budgets, args.retries,
+                        args.repeat or DEFAULT_REPEAT, offset=offset, progress=progress)
+    except BenchmarkError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        if not args.keepdb:
+            teardown_databases(databases, verbosity=1)
+
+    report = {'scale': args.scale, 'database': connection.vendor, 'endpoints': results}
+    if args.output:
+        _write(args.output, report)
+    if args.update_baseline:
+        if args.only and os.path.exists(args.baseline):
+            report['endpoints'] = {**_read(args.baseline)['endpoints'], **results}
+        _write(args.baseline, report)
+        print(f'已写入基线{args.baseline}')
+        return 0
+
+    violations = check(results, baseline['endpoints'], budgets)
+    for violation in violations:
+        print(f'超出预算 {violation}', file=sys.stderr)
+    if violations:
+        return 1
+    print(f'{len(results)}个接口均在预算内')
+    return 0
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
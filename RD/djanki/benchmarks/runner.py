@@ -0,0 +1,148 @@
+import gc
+import math
+import time
+import tracemalloc
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from login.models import User
+
+# 每个接口默认计时的次数；另有一次预热（填充缓存、启动进程池）和一次单独的内存测量，均不计入延迟
+DEFAULT_REPEAT = 20
+# 预算默认值：查询数不能超过基线，延迟和峰值内存不能超过基线的对应倍数；
+# 与基线的差值小于min_ms毫秒或min_kb KB时视为噪声，不判定超出
+DEFAULT_BUDGET = {'queries': 0, 'p50_ratio': 1.5, 'p99_ratio': 3.0, 'memory_ratio': 1.5, 'min_ms': 10.0, 'min_kb': 64}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+# 最近秩法百分位
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+# 按接口要求的身份创建客户端，使用真实的JWT认证
+def make_clients(dataset):
+    clients = {None: APIClient()}
+    for role in ('student', 'teacher'):
+        token = RefreshToken.for_user(User.objects.get(pk=dataset[f'{role}_id'])).access_token
+        clients[role] = APIClient()
+        clients[role].credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return clients
+
+def _call(client, endpoint, ctx):
+    path, data = endpoint.build(ctx)
+    if endpoint.method == 'get':
+        response = client.get(path, data)
+    else:
+        response = getattr(client, endpoint.method)(path, data, format=endpoint.format)
+    # 流式响应要读完才算完成
+    if response.streaming:
+        b''.join(response.streaming_content)
+    if response.status_code != endpoint.status:
+        raise BenchmarkError(f'{endpoint.name}: {path}返回{response.status_code}，应为{endpoint.status}')
+    return response
+
+def _context(endpoint, dataset, index):
+    ctx = {**dataset, 'i': index}
+    if endpoint.setup is not None:
+        try:
+            ctx.update(endpoint.setup(ctx))
+        except Exception as exc:
+            raise BenchmarkError(f'{endpoint.name}: 准备数据失败：{exc!r}') from exc
+    return ctx
+
+# 测量一个接口：查询数取各次的最大值，延迟取p50/p99，峰值内存为Python分配（tracemalloc）的峰值
+# offset使每次运行创建的用户名、课程名等不与之前的运行（--keepdb）重复
+def measure(endpoint, dataset, clients, repeat=DEFAULT_REPEAT, offset=0):
+    client = clients[endpoint.user]
+    repeat = endpoint.repeat or repeat
+    _call(client, endpoint, _context(endpoint, dataset, offset))
+    latencies, queries = [], 0
+    # 与timeit相同，计时期间关闭循环垃圾回收：完整回收的时机取决于之前分配了多少对象，
+    # 落在哪次请求里是偶然的，会使p99随无关的改动跳变
+    gc.collect()
+    gc.disable()
+    try:
+        for index in range(1, repeat + 1):
+            ctx = _context(endpoint, dataset, offset + index)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                _call(client, endpoint, ctx)
+                latencies.append(time.perf_counter() - started)
+            queries = max(queries, len(captured.captured_queries))
+    finally:
+        gc.enable()
+    ctx = _context(endpoint, dataset, offset + repeat + 1)
+    tracemalloc.start()
+    try:
+        _call(client, endpoint, ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'queries': queries,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+# 依次测量所有接口，返回{接口名: 结果}
+def run(endpoints, dataset, repeat=DEFAULT_REPEAT, offset=0, progress=None):
+    for cache in caches.all():
+        cache.clear()
+    clients = make_clients(dataset)
+    results = {}
+    # 各接口的序号区间互不重叠，临时对象的名称在整次运行中唯一
+    for position, endpoint in enumerate(endpoints):
+        results[endpoint.name] = measure(endpoint, dataset, clients, repeat, offset + position * 10000)
+        if progress is not None:
+            progress(endpoint.name, results[endpoint.name])
+    return results
+
+
+def budget_for(budgets, name):
+    return {**DEFAULT_BUDGET, **budgets.get('default', {}), **budgets.get('endpoints', {}).get(name, {})}
+
+def _latency_violations(name, result, base, budget):
+    violations = []
+    for metric, ratio in (('p50_ms', 'p50_ratio'), ('p99_ms', 'p99_ratio')):
+        if result[metric] > base[metric] * budget[ratio] and result[metric] - base[metric] > budget['min_ms']:
+            violations.append(f'{name}: {metric} {result[metric]:.1f}，基线{base[metric]:.1f}，上限为基线的{budget[ratio]}倍')
+    return violations
+
+# 延迟超出预算的接口最多再测量retries次，每项延迟取各次中的最小值后重新比较
+# 真正的退化每次都会出现，而机器上的偶发干扰（其他进程、CPU降频）很少连续落在同一个接口上；查询数和内存是确定的，不重测
+def confirm(endpoints, dataset, results, baseline, budgets, retries=2, repeat=DEFAULT_REPEAT, offset=0, progress=None):
+    clients = make_clients(dataset)
+    for attempt in range(1, retries + 1):
+        pending = [endpoint for endpoint in endpoints if endpoint.name in baseline and _latency_violations(
+            endpoint.name, results[endpoint.name], baseline[endpoint.name], budget_for(budgets, endpoint.name))]
+        for position, endpoint in enumerate(pending):
+            again = measure(endpoint, dataset, clients, repeat, offset + attempt * 1000000 + position * 10000)
+            result = results[endpoint.name]
+            result['p50_ms'], result['p99_ms'] = min(result['p50_ms'], again['p50_ms']), min(result['p99_ms'], again['p99_ms'])
+            if progress is not None:
+                progress(endpoint.name, result)
+    return results
+
+# 与基线比较，返回超出预算的说明；基线中没有的接口不比较
+def check(results, baseline, budgets):
+    violations = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        budget = budget_for(budgets, name)
+        if result['queries'] > base['queries'] + budget['queries']:
+            violations.append(f'{name}: 查询数{result["queries"]}，基线{base["queries"]}，允许增加{budget["queries"]}')
+        violations += _latency_violations(name, result, base, budget)
+        if result['peak_kb'] > base['peak_kb'] * budget['memory_ratio'] and result['peak_kb'] - base['peak_kb'] > budget['min_kb']:
+            violations.append(f'{name}: 峰值内存{result["peak_kb"]:.0f}KB，基线{base["peak_kb"]:.0f}KB，上限为基线的{budget["memory_ratio"]}倍')
+    return violations
@@ -0,0 +1,16 @@
+# 基准默认使用的设置：本地SQLite和进程内缓存，不连接settings中的外部数据库和缓存
+# 要在PostgreSQL等其他环境中测量时，用--settings指定相应的设置模块
+from djanki.settings import *  # noqa: F401,F403
+from djanki.settings import BASE_DIR, CACHES
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'benchmark.sqlite3',
+    },
+}
+
+CACHES = {
+    alias: {**config, 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias, config in CACHES.items()
+}
@@ -0,0 +1,50 @@
+import tempfile
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import get_resolver, resolve
+from .datagen import generate
+from .endpoints import ENDPOINTS
+from .runner import check, confirm, run
+
+
+# 只检查接口都能跑通，用MD5避免密码哈希拖慢测试
+@override_settings(PASSWORD_HASH_WORKERS=0, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkSuiteTests(TestCase):
+    def test_endpoints_cover_every_route(self):
+        routes = set()
+        for prefix in ('api/users/', 'api/teach_admin/', 'api/learn/'):
+            resolver = next(p for p in get_resolver().url_patterns if str(p.pattern) == prefix)
+            routes |= {prefix + str(pattern.pattern) for pattern in resolver.url_patterns}
+        dataset = generate('tiny')
+        covered = {resolve(endpoint.build({**dataset, 'i': 0, 'course': 0, 'category': 0, 'objective': 0, 'question': 0})[0].split('?')[0]).route
+                   for endpoint in ENDPOINTS}
+        self.assertEqual(routes - covered, set())
+
+    def test_run_on_tiny_dataset(self):
+        dataset = generate('tiny')
+        self.assertEqual(dataset['questions'], 200)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            results = run(ENDPOINTS, dataset, repeat=1)
+        self.assertEqual(set(results), {endpoint.name for endpoint in ENDPOINTS})
+        self.assertEqual(results['quizbank.course_list']['queries'], 1)
+
+    def test_budget_check(self):
+        baseline = {'a': {'queries': 3, 'p50_ms': 10.0, 'p99_ms': 20.0, 'peak_kb': 100.0}}
+        self.assertEqual(check({'a': {'queries': 3, 'p50_ms': 14.0, 'p99_ms': 59.0, 'peak_kb': 160.0}}, baseline, {}), [])
+        violations = check({'a': {'queries': 4, 'p50_ms': 21.0, 'p99_ms': 61.0, 'peak_kb': 300.0}}, baseline, {})
+        self.assertEqual(len(violations), 4)
+        self.assertEqual(check({'a': {'queries': 5, 'p50_ms': 10.0, 'p99_ms': 20.0, 'peak_kb': 100.0}}, baseline,
+                               {'endpoints': {'a': {'queries': 2}}}), [])
+
+    def test_confirm_remeasures_slow_endpoints(self):
+        endpoints = [mock.Mock(), mock.Mock()]
+        endpoints[0].name, endpoints[1].name = 'slow', 'fast'
+        baseline = {name: {'queries': 1, 'p50_ms': 10.0, 'p99_ms': 20.0, 'peak_kb': 1.0} for name in ('slow', 'fast')}
+        results = {'slow': {'queries': 1, 'p50_ms': 40.0, 'p99_ms': 30.0, 'peak_kb': 1.0}, 'fast': dict(baseline['fast'])}
+        again = {'queries': 1, 'p50_ms': 12.0, 'p99_ms': 35.0, 'peak_kb': 1.0}
+        with mock.patch('benchmarks.runner.make_clients'), mock.patch('benchmarks.runner.measure', return_value=again) as measure:
+            confirm(endpoints, {}, results, baseline, {}, retries=2)
+        # 第一次重测后已在预算内，不再重测；未超出预算的接口不重测
+        self.assertEqual([call.args[0].name for call in measure.call_args_list], ['slow'])
+        self.assertEqual((results['slow']['p50_ms'], results['slow']['p99_ms']), (12.0, 30.0))
+        self.assertEqual(check(results, baseline, {}), [])
@@ -0,0 +1,17 @@
+# ASGI部署：gunicorn管理uvicorn工作进程，每个进程一个事件循环，慢速连接只占用协程
+# gunicorn -c deploy/gunicorn_asgi.py djanki.asgi:application
+# 异步接口位于 /api/learn/async/；同步DRF视图在ASGI下由线程池执行，仍可访问
+# 流式响应需通过quizbank.func.streaming_response返回，否则Django 4.2会在ASGI下先读入全部内容再发送
+import multiprocessing
+import os
+
+bind = os.environ.get('DJANKI_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+# 事件循环不会被慢速客户端阻塞，进程数与CPU核数相同即可
+workers = int(os.environ.get('DJANKI_WORKERS', multiprocessing.cpu_count()))
+backlog = 2048
+keepalive = 30
+timeout = 60
+graceful_timeout = 30
+# Django在ASGI下为每个请求使用线程池中的数据库连接，保持settings中CONN_MAX_AGE为0，
+# 需要连接复用时在数据库前部署PgBouncer
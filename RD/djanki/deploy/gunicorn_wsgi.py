@@ -0,0 +1,13 @@
+# WSGI部署（对照基线）：同步工作进程，每个连接在请求期间独占一个线程
+# gunicorn -c deploy/gunicorn_wsgi.py djanki.wsgi:application
+import multiprocessing
+import os
+
+bind = os.environ.get('DJANKI_BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.environ.get('DJANKI_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('DJANKI_THREADS', 4))
+backlog = 2048
+keepalive = 5
+timeout = 60
+graceful_timeout = 30
@@ -0,0 +1,96 @@
+"""
+并发连接压测：模拟网络较慢的移动端，比较ASGI与WSGI部署能同时服务的连接数。
+
+每个虚拟客户端循环发起请求，请求头和请求体在--trickle秒内分段慢慢发送，
+期间WSGI的同步工作线程被占用，而ASGI只占用一个协程。只依赖标准库。
+
+    python deploy/loadtest.py http://127.0.0.1:8000/api/learn/async/courses/1/question-review/ \\
+        --token <JWT> --connections 500 --duration 30 --trickle 2
+
+分别对 gunicorn_wsgi.py 和 gunicorn_asgi.py 启动的服务运行（WSGI使用同步接口的URL），
+比较完成请求数、延迟分位数和超时数。
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def build_request(url, token, body):
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    lines = [
+        f"{'POST' if body else 'GET'} {path} HTTP/1.1",
+        f'Host: {parts.netloc}',
+        'Connection: close',
+        'Accept: application/json',
+    ]
+    if token:
+        lines.append(f'Authorization: Bearer {token}')
+    payload = body.encode() if body else b''
+    if body:
+        lines += ['Content-Type: application/json', f'Content-Length: {len(payload)}']
+    return (parts.hostname, parts.port or 80), ('\r\n'.join(lines) + '\r\n\r\n').encode() + payload
+
+# 发送一次请求，返回(状态码, 耗时秒数)
+async def request_once(address, raw, trickle, timeout):
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(*address), timeout)
+    try:
+        chunks = 10 if trickle else 1
+        size = -(-len(raw) // chunks)
+        for i in range(chunks):
+            writer.write(raw[i * size:(i + 1) * size])
+            await writer.drain()
+            if trickle:
+                await asyncio.sleep(trickle / chunks)
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+    return status, time.perf_counter() - started
+
+async def client(address, raw, args, deadline, results):
+    while time.perf_counter() < deadline:
+        try:
+            status, elapsed = await request_once(address, raw, args.trickle, args.timeout)
+            results['latencies' if 200 <= status < 300 else 'errors'].append(elapsed if 200 <= status < 300 else status)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            results['timeouts'] += 1
+            await asyncio.sleep(0.1)
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+async def run(args):
+    address, raw = build_request(args.url, args.token, args.body)
+    results = {'latencies': [], 'errors': [], 'timeouts': 0}
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(client(address, raw, args, deadline, results) for _ in range(args.connections)))
+    latencies = results['latencies']
+    return {
+        'connections': args.connections,
+        'completed': len(latencies),
+        'requests_per_second': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': len(results['errors']),
+        'timeouts': results['timeouts'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟慢速客户端的并发连接压测')
+    parser.add_argument('url')
+    parser.add_argument('--token', help='JWT访问令牌')
+    parser.add_argument('--body', help='POST的JSON请求体，不指定则发送GET')
+    parser.add_argument('--connections', type=int, default=200, help='并发连接数，默认200')
+    parser.add_argument('--duration', type=float, default=20, help='持续秒数，默认20')
+    parser.add_argument('--trickle', type=float, default=1.0, help='每个请求分段发送的总秒数，默认1')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求的超时秒数，默认30')
+    print(json.dumps(asyncio.run(run(parser.parse_args())), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
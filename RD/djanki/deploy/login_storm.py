@@ -0,0 +1,71 @@
+"""
+登录风暴压测：大量客户端同时登录，同时测量其他接口的延迟。
+
+    python deploy/login_storm.py http://127.0.0.1:8000 --username student --password pw \\
+        --probe /api/learn/review-forecast/ --token <JWT> --logins 200 --duration 20
+
+输出登录吞吐（成功数/秒）、429拒绝数，以及探测接口的p50/p99延迟。
+分别在PASSWORD_HASH_WORKERS=0（请求线程内哈希）和默认进程池配置下运行以作比较。
+"""
+import argparse
+import asyncio
+import json
+import time
+from loadtest import build_request, percentile, request_once
+
+
+async def hammer(address, raw, deadline, results, timeout):
+    while time.perf_counter() < deadline:
+        try:
+            status, elapsed = await request_once(address, raw, 0, timeout)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            results['failed'] += 1
+            continue
+        if status == 429:
+            results['rejected'] += 1
+            await asyncio.sleep(0.05)
+        elif 200 <= status < 300:
+            results['latencies'].append(elapsed)
+        else:
+            results['failed'] += 1
+
+async def run(args):
+    base = args.url.rstrip('/')
+    login_address, login_raw = build_request(
+        f'{base}/api/users/login/', None, json.dumps({'username': args.username, 'password': args.password})
+    )
+    probe_address, probe_raw = build_request(f'{base}{args.probe}', args.token, None)
+    logins = {'latencies': [], 'rejected': 0, 'failed': 0}
+    probes = {'latencies': [], 'rejected': 0, 'failed': 0}
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        *(hammer(login_address, login_raw, deadline, logins, args.timeout) for _ in range(args.logins)),
+        *(hammer(probe_address, probe_raw, deadline, probes, args.timeout) for _ in range(args.probes)),
+    )
+    return {
+        'logins_per_second': len(logins['latencies']) / args.duration,
+        'login_p99_ms': percentile(logins['latencies'], 0.99) * 1000,
+        'login_rejected_429': logins['rejected'],
+        'login_failed': logins['failed'],
+        'probe_completed': len(probes['latencies']),
+        'probe_p50_ms': percentile(probes['latencies'], 0.5) * 1000,
+        'probe_p99_ms': percentile(probes['latencies'], 0.99) * 1000,
+        'probe_failed': probes['failed'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='登录风暴下的登录吞吐与其他接口尾延迟')
+    parser.add_argument('url', help='服务根地址，如 http://127.0.0.1:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--probe', default='/api/learn/review-forecast/', help='测量延迟的其他接口路径')
+    parser.add_argument('--token', help='访问探测接口用的JWT')
+    parser.add_argument('--logins', type=int, default=200, help='同时登录的客户端数，默认200')
+    parser.add_argument('--probes', type=int, default=5, help='探测接口的客户端数，默认5')
+    parser.add_argument('--duration', type=float, default=20, help='持续秒数，默认20')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求的超时秒数，默认30')
+    print(json.dumps(asyncio.run(run(parser.parse_args())), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import contextvars
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+# 读写分离：继承ReplicaReadMixin的视图处理GET等只读请求时，读查询发往READ_REPLICA_ALIAS指定的只读副本，
+# 写入和其余视图的查询都走default；未配置副本时全部走default
+# 用户写过数据后READ_YOUR_WRITES_SECONDS秒内的请求仍读default，保证能读到自己刚写入的数据（副本有复制延迟）
+# 写入标记存放在CACHE_ALIAS缓存中，多进程部署时应指向共享缓存（如Redis）
+CACHE_ALIAS = 'default'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+# 当前请求中写入过的模型，由ReadYourWritesMiddleware设置
+_request_writes = contextvars.ContextVar('request_writes', default=None)
+
+
+# 已配置的只读副本别名，未配置时返回None
+def replica_alias():
+    alias = getattr(settings, 'READ_REPLICA_ALIAS', None)
+    return alias if alias in connections.settings else None
+
+def _pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+# 让用户接下来READ_YOUR_WRITES_SECONDS秒内的读取都走default
+def pin_to_primary(user_id):
+    seconds = getattr(settings, 'READ_YOUR_WRITES_SECONDS', 10)
+    if seconds:
+        caches[CACHE_ALIAS].set(_pin_key(user_id), True, seconds)
+
+def pinned_to_primary(user_id):
+    return caches[CACHE_ALIAS].get(_pin_key(user_id), False)
+
+# 在代码块中强制读default，如生成要写入缓存的内容时，避免把副本上的旧数据缓存起来
+@contextmanager
+def use_primary():
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.add(model._meta.label)
+        return None
+
+    # 副本与default是同一份数据
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+# 只读请求使用只读副本的视图，需放在APIView之前：class XxxView(ReplicaReadMixin, APIView)
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        token = _use_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    # 认证和权限检查之后才切换到副本，认证用户的查询仍走default
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = request.user
+        if request.method in SAFE_METHODS and not (user.is_authenticated and pinned_to_primary(user.pk)):
+            _use_replica.set(True)
+
+
+def _pin_writer(request, writes):
+    user = getattr(request, 'user', None)
+    if writes and user is not None and user.is_authenticated:
+        pin_to_primary(user.pk)
+
+# 记录请求中是否有写入，有写入时标记该用户，之后的短时间内读default
+@sync_and_async_middleware
+def ReadYourWritesMiddleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            writes = set()
+            token = _request_writes.set(writes)
+            try:
+                response = await get_response(request)
+            finally:
+                _request_writes.reset(token)
+            if writes:
+                await sync_to_async(_pin_writer)(request, writes)
+            return response
+    else:
+        def middleware(request):
+            writes = set()
+            token = _request_writes.set(writes)
+            try:
+                response = get_response(request)
+            finally:
+                _request_writes.reset(token)
+            _pin_writer(request, writes)
+            return response
+    return middleware
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'quizbank',
     'corsheaders',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'djanki.replica.ReadYourWritesMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
 ROOT_URLCONF = 'djanki.urls'
@@ -95,8 +97,40 @@ DATABASES = {
     }
 }
 
+# 只读副本（可选）：统计、试题列表和搜索等接口的只读请求发往该库，见djanki.replica；未配置时全部走default
+# DATABASES['replica'] = {**DATABASES['default'], 'HOST': '副本主机'}
+# 配置后把READ_REPLICA_ALIAS设为'replica'
+READ_REPLICA_ALIAS = None
+# 用户写入后这段时间（秒）内的读取仍走default
+READ_YOUR_WRITES_SECONDS = 10
+DATABASE_ROUTERS = ['djanki.replica.ReadReplicaRouter']
 
 
+
+# 缓存
+# quizbank 缓存课程的知识点树、支撑目标和试题列表，按条目数量淘汰；
+# 多进程部署时应改为共享缓存（如 django.core.cache.backends.redis.RedisCache），否则各进程的失效互不可见
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'quizbank': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'quizbank',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    # JWT认证的用户缓存，见login.authentication
+    'principals': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'principals',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -117,7 +151,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'login.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -137,6 +171,24 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'id',  # token中使用的claim名称
 }
 
+# SM-2评分引擎：batch为批量计算、批量写入；atomic为每次评分一条原子upsert，多设备并发提交同一题时使用
+SM2_ENGINE = 'batch'
+
+# 按用户、课程、日期缓存到期复习队列，评分后失效；多进程部署需配合共享缓存
+REVIEW_QUEUE_CACHE = False
+
+# 分散到期日期：在SM-2到期日附近±min(间隔×容差, 最大天数)内选该用户到期最少的一天，0为关闭；仅batch引擎生效
+SM2_SPREAD_TOLERANCE = 0
+SM2_SPREAD_MAX_DAYS = 7
+
+# 登录、注册的密码哈希在进程池中计算：进程数（0为在请求线程中直接计算）、同时提交的任务上限（超出返回429，0为不限制）、单次超时秒数
+# 每个应用进程各有一个进程池，总占用CPU为 应用进程数 × PASSWORD_HASH_WORKERS
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE_LIMIT = 32
+PASSWORD_HASH_TIMEOUT = 10
+# 网页导入名单每次的最大行数：密码在上面的进程池中计算，需在PASSWORD_HASH_TIMEOUT内完成
+ROSTER_IMPORT_MAX_ROWS = 30
+
 # drf-spectacular 配置 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'DjanKi——刷题系统',
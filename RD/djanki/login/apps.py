@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LoginConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'login'
+
+    def ready(self):
+        from . import signals  # noqa: F401  注册信号处理
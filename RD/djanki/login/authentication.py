@@ -0,0 +1,74 @@
+import time
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# 已认证用户的缓存别名，settings中限定条目数；多进程部署时应指向共享缓存（如Redis），否则失效只在本进程生效
+CACHE_ALIAS = 'principals'
+# 缓存的用户对象最长保留时间（秒），兜底绕过信号的批量update
+PRINCIPAL_TIMEOUT = 5 * 60
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+def _version_key(user_id):
+    return f'login:principal:{user_id}:version'
+
+# 用户的缓存版本号，与用户id一起组成缓存键；被淘汰后以当前时间重新初始化
+def principal_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+def _bump(user_id):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+
+# 用户变化时递增版本号：立即递增一次，事务中的其他请求不再读到旧对象；
+# 提交后再递增一次，丢弃提交前按旧数据回填的缓存
+def invalidate_principal(user_id):
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id))
+
+
+# JWT认证：按(用户id, 版本号)缓存用户对象，命中时不查询数据库；
+# 是否启用、令牌是否因改密码失效的检查与JWTAuthentication相同，每次请求都执行
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = get_cache()
+        key = f'login:principal:{user_id}:{principal_version(user_id)}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, timeout=PRINCIPAL_TIMEOUT)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+# 让drf-spectacular按JWT生成认证说明
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = 'login.authentication.CachedJWTAuthentication'
@@ -0,0 +1,179 @@
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# 密码哈希（PBKDF2等）在独立进程池中计算，不占用处理请求的线程和GIL
+# 同时提交的任务数（排队+执行中）有上限，满了或等待超时都由视图返回429
+
+
+# 进程池已满，调用方应稍后重试
+class HashingBusy(Exception):
+    pass
+
+
+def _worker_init():
+    # spawn方式启动的子进程需要自行加载Django配置才能使用PASSWORD_HASHERS
+    import django
+    django.setup()
+
+def _verify(password, encoded):
+    # 与django.contrib.auth.hashers.check_password相同，额外返回是否需要按首选算法重新哈希
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, False
+    preferred = get_hasher('default')
+    valid = hasher.verify(password, encoded)
+    must_update = valid and (hasher.algorithm != preferred.algorithm or preferred.must_update(encoded))
+    return valid, must_update
+
+
+class PasswordHashPool:
+    def __init__(self, workers, queue_limit, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        # queue_limit为0或None时不限制
+        self._slots = threading.BoundedSemaphore(queue_limit) if queue_limit else None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # 请求处理进程可能是多线程的，用spawn避免fork时复制锁状态
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_worker_init
+                )
+                atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+            return self._executor
+
+    def run(self, function, *args):
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        if not self.workers:
+            try:
+                return function(*args)
+            finally:
+                self._release()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._release()
+            raise
+        # 任务结束（完成、失败或取消）时才释放名额，超时后仍在执行的任务继续占用名额
+        future.add_done_callback(lambda _: self._release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy()
+
+    # 把items分成至多workers份并行执行function(份)，每份占用一个名额，名额不足时整体拒绝；
+    # 所有份共用一个超时，按原顺序拼接各份返回的列表
+    def map_chunks(self, function, items):
+        items = list(items)
+        size = max(1, math.ceil(len(items) / (self.workers or 1)))
+        chunks = [items[start:start + size] for start in range(0, len(items), size)]
+        acquired = 0
+        while self._slots is not None and acquired < len(chunks) and self._slots.acquire(blocking=False):
+            acquired += 1
+        if self._slots is not None and acquired < len(chunks):
+            for _ in range(acquired):
+                self._release()
+            raise HashingBusy()
+        if not self.workers:
+            try:
+                return [result for chunk in chunks for result in function(chunk)]
+            finally:
+                for _ in chunks:
+                    self._release()
+        futures = []
+        try:
+            executor = self._get_executor()
+            for chunk in chunks:
+                futures.append(executor.submit(function, chunk))
+                futures[-1].add_done_callback(lambda _: self._release())
+        except BaseException:
+            for _ in range(len(chunks) - len(futures)):
+                self._release()
+            for future in futures:
+                future.cancel()
+            raise
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        try:
+            return [result for future in futures
+                    for result in future.result(timeout=None if deadline is None else max(0, deadline - time.monotonic()))]
+        except TimeoutError:
+            for future in futures:
+                future.cancel()
+            raise HashingBusy()
+
+    def _release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# 进程级共享的哈希池，参数见settings中的PASSWORD_HASH_*
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PasswordHashPool(
+                getattr(settings, 'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)),
+                getattr(settings, 'PASSWORD_HASH_QUEUE_LIMIT', 32),
+                getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10),
+            )
+        return _pool
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+# 测试中修改PASSWORD_HASH_*设置后重新创建
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting.startswith('PASSWORD_HASH'):
+        reset_pool()
+
+
+def hash_password(password):
+    return get_pool().run(make_password, password)
+
+# 返回(密码是否正确, 是否需要重新哈希)
+def verify_password(password, encoded):
+    return get_pool().run(_verify, password, encoded)
+
+def _make_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+# 在共享的哈希池中批量哈希（网页导入名单），与登录共用名额和超时，行数由ROSTER_IMPORT_MAX_ROWS限制
+def hash_passwords_shared(passwords):
+    return get_pool().map_chunks(_make_passwords, passwords)
+
+# 批量哈希（命令行导入名单）：临时启动与CPU核数相同的进程并行计算，不占用登录用的进程池
+def hash_passwords(passwords):
+    workers = min(os.cpu_count() or 1, len(passwords))
+    if not getattr(settings, 'PASSWORD_HASH_WORKERS', 1) or workers < 2:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=_worker_init) as executor:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
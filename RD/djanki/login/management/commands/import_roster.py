@@ -0,0 +1,28 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from login.roster import ROSTER_ROLES, RosterError, import_roster
+
+
+class Command(BaseCommand):
+    help = '从CSV名单（username,password[,role]）批量创建账号'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='UTF-8编码的CSV名单')
+        parser.add_argument('--role', choices=ROSTER_ROLES, default='学生', help='名单中未填写角色时使用的角色')
+        parser.add_argument('--report', help='把逐行结果以JSON写入该文件')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as upload:
+                result = import_roster(upload, options['role'])
+        except (OSError, RosterError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                json.dump(result['rows'], report, ensure_ascii=False, indent=2)
+        for row in result['rows']:
+            if row['status'] != 'created':
+                self.stderr.write(f"第{row['line']}行 {row['username']}: {row['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"已创建 {result['created']} 个账号，已存在 {result['exists']}，重复 {result['duplicate']}，无效 {result['invalid']}"
+        ))
@@ -0,0 +1,71 @@
+import csv
+import io
+from django.db import IntegrityError, transaction
+from .hashing import hash_passwords
+from .models import User
+
+ROSTER_ROLES = ('学生', '教师')
+INSERT_BATCH_SIZE = 500
+
+
+# 名单格式错误（缺少必要的列）
+class RosterError(Exception):
+    pass
+
+
+# 插入时部分用户名已被同时进行的注册占用，整批未创建
+class RosterConflict(RosterError):
+    def __init__(self, usernames):
+        super().__init__(f'以下用户名刚被注册，请修改后重新导入：{"、".join(usernames)}')
+        self.usernames = usernames
+
+
+# 从CSV名单（列：username、password、可选role）批量创建账号，返回汇总和逐行结果
+# 已存在的用户名用一次IN查询找出，密码用hash_many并行哈希，新账号分批插入；max_rows限制数据行数
+def import_roster(upload, default_role='学生', max_rows=None, hash_many=hash_passwords):
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+    if not {'username', 'password'} <= set(reader.fieldnames or []):
+        raise RosterError('名单必须包含username和password列')
+
+    report, pending, seen = [], [], set()
+    for count, row in enumerate(reader, 1):
+        if max_rows is not None and count > max_rows:
+            raise RosterError(f'名单超过{max_rows}行，请分批上传或由管理员使用manage.py import_roster导入')
+        line = reader.line_num
+        username = (row.get('username') or '').strip()
+        password = row.get('password') or ''
+        role = (row.get('role') or '').strip() or default_role
+        if not username or not password:
+            report.append({'line': line, 'username': username, 'status': 'invalid', 'error': '缺少用户名或密码'})
+        elif len(username) > User._meta.get_field('username').max_length:
+            report.append({'line': line, 'username': username, 'status': 'invalid', 'error': '用户名过长'})
+        elif role not in ROSTER_ROLES:
+            report.append({'line': line, 'username': username, 'status': 'invalid', 'error': f'角色必须是{"、".join(ROSTER_ROLES)}之一'})
+        elif username in seen:
+            report.append({'line': line, 'username': username, 'status': 'duplicate', 'error': '名单中用户名重复'})
+        else:
+            seen.add(username)
+            pending.append((line, username, password, role))
+
+    existing = set(User.objects.filter(username__in=seen).values_list('username', flat=True))
+    for line, username, _, _ in pending:
+        if username in existing:
+            report.append({'line': line, 'username': username, 'status': 'exists', 'error': '用户已存在'})
+    pending = [row for row in pending if row[1] not in existing]
+
+    hashes = hash_many([password for _, _, password, _ in pending])
+    users = [User(username=username, password=encoded, role=role) for (_, username, _, role), encoded in zip(pending, hashes)]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+    except IntegrityError:
+        taken = User.objects.filter(username__in=[user.username for user in users]).order_by('username')
+        raise RosterConflict(list(taken.values_list('username', flat=True)))
+    for (line, username, _, _), user in zip(pending, users):
+        report.append({'line': line, 'username': username, 'status': 'created', 'id': user.pk})
+
+    report.sort(key=lambda item: item['line'])
+    counts = {status: 0 for status in ('created', 'exists', 'duplicate', 'invalid')}
+    for item in report:
+        counts[item['status']] += 1
+    return {**counts, 'rows': report}
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_principal
+from .models import User
+
+
+# 用户保存（启用状态、角色、密码等变化）或删除时使其缓存失效
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
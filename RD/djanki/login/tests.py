@@ -1,3 +1,185 @@
-from django.test import TestCase
+import time
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.contrib.auth.hashers import check_password
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import CachedJWTAuthentication, get_cache
+from .hashing import HashingBusy, PasswordHashPool, get_pool, hash_passwords
+from .models import User
 
 # Create your tests here.
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='student', password='pw', role='学生')
+        token = RefreshToken.for_user(self.user).access_token
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def authenticate(self):
+        with CaptureQueriesContext(connection) as ctx:
+            user, _ = CachedJWTAuthentication().authenticate(self.request)
+        return user, len(ctx.captured_queries)
+
+    def test_second_request_skips_user_query(self):
+        self.assertEqual(self.authenticate()[1], 1)
+        user, queries = self.authenticate()
+        self.assertEqual((user.pk, queries), (self.user.pk, 0))
+
+    def test_role_and_active_changes_invalidate(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = '教师'
+            self.user.save()
+        self.assertEqual(self.authenticate()[0].role, '教师')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change_invalidates(self):
+        self.authenticate()
+        self.user.set_password('new')
+        self.user.save()
+        user, queries = self.authenticate()
+        self.assertEqual((user.password, queries), (self.user.password, 1))
+
+
+@override_settings(PASSWORD_HASH_WORKERS=0)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post('/api/users/register/', {'username': 'student', 'password': 'pw', 'role': '学生'})
+
+    def login(self, password='pw', username='student'):
+        return self.client.post('/api/users/login/', {'username': username, 'password': password})
+
+    def test_login(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login(username='nobody').status_code, 401)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_process_pool(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(User.objects.get(username='student').check_password('pw'))
+
+    def test_back_pressure(self):
+        with override_settings(PASSWORD_HASH_QUEUE_LIMIT=1):
+            # 占住唯一的名额
+            get_pool()._slots.acquire()
+            response = self.login()
+            self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+            self.assertEqual(self.client.post('/api/users/register/', {'username': 'b', 'password': 'pw', 'role': '学生'}).status_code, 429)
+        self.assertEqual(self.login().status_code, 200)
+        with override_settings(PASSWORD_HASH_QUEUE_LIMIT=0):
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_timeout_keeps_slot_until_done(self):
+        pool = PasswordHashPool(1, 1, 0.1)
+        try:
+            # 首次提交还要启动进程，必然超时
+            with self.assertRaises(HashingBusy):
+                pool.run(time.sleep, 1)
+            with self.assertRaises(HashingBusy):
+                pool.run(abs, -1)
+        finally:
+            pool.shutdown()
+        # 任务结束后名额已归还
+        self.assertTrue(pool._slots.acquire(blocking=False))
+
+    def test_map_chunks(self):
+        pool = PasswordHashPool(2, 2, 30)
+        try:
+            self.assertEqual(pool.map_chunks(sorted, [3, 1, 2, 5, 4]), [1, 2, 3, 4, 5])
+            self.assertEqual(pool.map_chunks(sorted, [4, 3, 2, 1]), [3, 4, 1, 2])
+            # 两份需要两个名额，被占用一个时整体拒绝，已取得的名额归还
+            pool._slots.acquire()
+            with self.assertRaises(HashingBusy):
+                pool.map_chunks(sorted, [2, 1])
+            self.assertTrue(pool._slots.acquire(blocking=False))
+        finally:
+            pool.shutdown()
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_outdated_hash_upgraded(self):
+        User.objects.create_user(username='legacy', password='pw', role='学生')
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher']):
+            self.assertEqual(self.login(username='legacy').status_code, 200)
+            self.assertTrue(User.objects.get(username='legacy').password.startswith('pbkdf2_sha256$'))
+
+
+@override_settings(PASSWORD_HASH_WORKERS=0)
+class RosterImportTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='pw', role='教师')
+        User.objects.create_user(username='taken', password='pw', role='学生')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def upload(self, text, **data):
+        roster = SimpleUploadedFile('roster.csv', text.encode('utf-8-sig'), content_type='text/csv')
+        return self.client.post('/api/users/roster/import/', {'file': roster, **data}, format='multipart')
+
+    def test_report(self):
+        text = 'username,password,role\ns1,p1,\ns2,p2,教师\ntaken,p3,\ns1,p4,\n,p5,\ns3,p6,管理员\n'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.upload(text)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['line'], row['username'], row['status']) for row in response.data['rows']],
+            [(2, 's1', 'created'), (3, 's2', 'created'), (4, 'taken', 'exists'), (5, 's1', 'duplicate'), (6, '', 'invalid'), (7, 's3', 'invalid')],
+        )
+        self.assertEqual((response.data['created'], response.data['exists'], response.data['duplicate'], response.data['invalid']), (2, 1, 1, 2))
+        # 查询已存在的用户名只用一次IN查询，插入合并为一条INSERT
+        statements = [query['sql'] for query in ctx.captured_queries if 'login_user' in query['sql']]
+        self.assertEqual(sum(sql.startswith('SELECT') and ' IN ' in sql for sql in statements), 1)
+        self.assertEqual(sum(sql.startswith('INSERT') for sql in statements), 1)
+        self.assertEqual(User.objects.get(username='s2').role, '教师')
+        self.assertEqual(User.objects.get(username='s1').role, '学生')
+
+    def test_default_hasher(self):
+        self.upload('username,password\nfresh,secret\n')
+        self.assertTrue(User.objects.get(username='fresh').password.startswith('pbkdf2_sha256$'))
+
+    def test_rejected(self):
+        self.assertEqual(self.upload('name,pw\na,b\n').status_code, 400)
+        self.client.force_authenticate(User.objects.get(username='taken'))
+        self.assertEqual(self.upload('username,password\na,b\n').status_code, 403)
+        self.assertFalse(User.objects.filter(username='a').exists())
+
+    def test_concurrent_registration(self):
+        def register_then_hash(passwords):
+            # 检查已存在的用户名之后、插入之前，另一个请求注册了同名账号
+            User.objects.create_user(username='s2', password='pw', role='学生')
+            return hash_passwords(passwords)
+        with mock.patch('login.views.hash_passwords_shared', register_then_hash):
+            response = self.upload('username,password\ns1,p1\ns2,p2\n')
+        self.assertEqual((response.status_code, response.data['usernames']), (400, ['s2']))
+        self.assertFalse(User.objects.filter(username='s1').exists())
+
+    @override_settings(ROSTER_IMPORT_MAX_ROWS=2)
+    def test_row_limit(self):
+        response = self.upload('username,password\na,1\nb,2\nc,3\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username__in=['a', 'b', 'c']).exists())
+        self.assertEqual(self.upload('username,password\na,1\nb,2\n').data['created'], 2)
+
+    @override_settings(PASSWORD_HASH_QUEUE_LIMIT=1)
+    def test_busy(self):
+        get_pool()._slots.acquire()
+        response = self.upload('username,password\nfresh,secret\n')
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        self.assertFalse(User.objects.filter(username='fresh').exists())
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_parallel_hashing(self):
+        encoded = hash_passwords(['a', 'b', 'c'])
+        self.assertEqual(len(set(encoded)), 3)
+        self.assertTrue(all(check_password(p, e) for p, e in zip('abc', encoded)))
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import LoginView,RegisterView
+from .views import LoginView,RegisterView,RosterImportView
 
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'), # 登录
     path('register/', RegisterView.as_view(), name='register'), # 注册
+    path('roster/import/', RosterImportView.as_view(), name='roster-import'), # 批量导入名单
 ]
\ No newline at end of file
@@ -1,12 +1,19 @@
 # Create your views here.
-from django.contrib.auth.hashers import make_password
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
 from .models import User
 from rest_framework import status,serializers
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from django.conf import settings
+from .hashing import HashingBusy, hash_password, hash_passwords_shared, verify_password
+from .roster import ROSTER_ROLES, RosterConflict, RosterError, import_roster
+
+# 密码哈希进程池已满时的响应
+def busy_response():
+    return Response({'error': '服务器繁忙，请稍后重试'}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': '1'})
 
 
 # 登录
@@ -34,14 +41,29 @@ class LoginView(APIView):
                 }
             ),
             400: OpenApiResponse(description='密码错误'),
-            404: OpenApiResponse(description='用户不存在')
+            404: OpenApiResponse(description='用户不存在'),
+            429: OpenApiResponse(description='登录人数较多，稍后重试')
         },
     )
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
-        user = authenticate(username=username, password=password)  # 使用Django的authenticate方法
-        if user is not None:
+        # 与ModelBackend相同的校验，密码哈希在进程池中计算
+        user = User.objects.filter(username=username).first() if username and password else None
+        try:
+            if user is None:
+                # 用户不存在时也计算一次哈希，避免通过响应时间判断用户名是否存在
+                if username and password:
+                    hash_password(password)
+                valid = False
+            else:
+                valid, must_update = verify_password(password, user.password)
+                if valid and must_update:
+                    user.password = hash_password(password)
+                    user.save(update_fields=['password'])
+        except HashingBusy:
+            return busy_response()
+        if valid and user.is_active:
             refresh = RefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
@@ -77,7 +99,8 @@ class RegisterView(APIView):
                 }
             ),
             400: OpenApiResponse(description='缺少必要信息或信息格式错误'),
-            409: OpenApiResponse(description='用户已存在')
+            409: OpenApiResponse(description='用户已存在'),
+            429: OpenApiResponse(description='注册人数较多，稍后重试')
         },
     )
     def post(self, request):
@@ -91,9 +114,73 @@ class RegisterView(APIView):
         if User.objects.filter(username=username).exists():
             return Response({'error': '用户已存在'}, status=status.HTTP_409_CONFLICT)
         
+        try:
+            encoded = hash_password(password)
+        except HashingBusy:
+            return busy_response()
         user = User.objects.create(
             username=username,
-            password=make_password(password),
+            password=encoded,
             role=role
         )
-        return Response({'message': '账号创建成功', 'id': user.pk}, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response({'message': '账号创建成功', 'id': user.pk}, status=status.HTTP_201_CREATED)
+
+
+# 教师批量导入学生名单
+class RosterImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        tags=['注册'],
+        summary='批量导入名单',
+        description=(
+            '教师上传UTF-8编码的CSV名单批量创建账号，列为username、password和可选的role（默认学生）。'
+            '已存在、名单内重复或信息不完整的行不创建，rows中逐行返回结果。'
+            '密码使用与登录相同的哈希器，在登录共用的哈希进程池中计算；'
+            '每次最多ROSTER_IMPORT_MAX_ROWS行，更大的名单请分批上传或使用manage.py import_roster导入。'
+        ),
+        request={
+            'multipart/form-data': inline_serializer(
+                name='RosterImportRequest',
+                fields={
+                    'file': serializers.FileField(),
+                    'role': serializers.ChoiceField(choices=ROSTER_ROLES, required=False),
+                }
+            )
+        },
+        responses={
+            200: inline_serializer(
+                name='RosterImportResponse',
+                fields={
+                    'created': serializers.IntegerField(),
+                    'exists': serializers.IntegerField(),
+                    'duplicate': serializers.IntegerField(),
+                    'invalid': serializers.IntegerField(),
+                    'rows': serializers.ListField(child=serializers.DictField()),
+                }
+            ),
+            400: OpenApiResponse(description='缺少文件、名单格式错误、行数超限或用户名刚被注册（usernames）'),
+            403: OpenApiResponse(description='只有教师可以导入名单'),
+            429: OpenApiResponse(description='密码哈希进程池繁忙，稍后重试'),
+        },
+    )
+    def post(self, request):
+        if request.user.role != '教师':
+            return Response({'error': '只有教师可以导入名单'}, status=status.HTTP_403_FORBIDDEN)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': '请上传名单文件'}, status=status.HTTP_400_BAD_REQUEST)
+        role = request.data.get('role') or '学生'
+        if role not in ROSTER_ROLES:
+            return Response({'error': f'角色必须是{"、".join(ROSTER_ROLES)}之一'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = import_roster(upload, role, getattr(settings, 'ROSTER_IMPORT_MAX_ROWS', 30), hash_passwords_shared)
+        except RosterConflict as exc:
+            return Response({'error': str(exc), 'usernames': exc.usernames}, status=status.HTTP_400_BAD_REQUEST)
+        except (RosterError, UnicodeDecodeError) as exc:
+            message = str(exc) if isinstance(exc, RosterError) else '名单必须是UTF-8编码的CSV文件'
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        except HashingBusy:
+            return busy_response()
+        return Response(result, status=status.HTTP_200_OK)
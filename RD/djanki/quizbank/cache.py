@@ -0,0 +1,87 @@
+import threading
+import time
+from django.core.cache import caches
+from django.db import transaction
+from djanki.replica import use_primary
+
+# 课程内容缓存使用的缓存别名，多进程部署时应在settings中指向共享缓存（如Redis）
+CACHE_ALIAS = 'quizbank'
+# 缓存内容的过期时间（秒），版本号不过期
+PAYLOAD_TIMEOUT = 60 * 60
+
+
+# 进程内的命中、未命中计数
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+def _version_key(course_id):
+    return f'quizbank:course:{course_id}:version'
+
+# 获取课程版本号；版本号被淘汰后以当前时间重新初始化，保证不会与旧版本号重复
+def course_version(course_id):
+    cache = get_cache()
+    key = _version_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+def _bump(course_id):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(course_id))
+    except ValueError:
+        # 版本号不存在，直接以当前时间初始化
+        cache.add(_version_key(course_id), time.time_ns(), timeout=None)
+
+# 课程内容变化时递增版本号，使该课程所有缓存内容失效；在事务提交后执行，避免并发读取缓存旧数据
+def bump_course_version(course_id):
+    if course_id is not None:
+        transaction.on_commit(lambda: _bump(course_id))
+
+# 题型等全局数据变化时清空全部课程缓存
+def clear_course_cache():
+    transaction.on_commit(get_cache().clear)
+
+# 读取课程的缓存内容，未命中时调用build生成并写入缓存；生成时读default，不缓存只读副本上尚未同步的旧数据
+def cached_course_payload(course_id, name, build):
+    cache = get_cache()
+    key = f'quizbank:course:{course_id}:{course_version(course_id)}:{name}'
+    payload = cache.get(key)
+    stats.record(payload is not None)
+    if payload is None:
+        with use_primary():
+            payload = build()
+        cache.set(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return payload
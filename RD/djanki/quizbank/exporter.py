@@ -0,0 +1,108 @@
+import io
+import json
+import zipfile
+from rest_framework.utils.encoders import JSONEncoder
+from .func import markdown_image_paths, media_file_path
+from .models import Category, Question, SupportObjective
+
+# 服务端游标每次读取的行数
+EXPORT_CHUNK_SIZE = 500
+# 缓冲区超过该大小时向客户端输出一次
+FLUSH_SIZE = 64 * 1024
+# 读取媒体文件的块大小
+FILE_CHUNK_SIZE = 1024 * 1024
+CATEGORY_FIELDS = ('id', 'name', 'parent_id', 'is_knowledge_point', 'order')
+OBJECTIVE_FIELDS = ('id', 'name', 'description', 'order')
+MARKDOWN_FIELDS = ('content_markdown', 'answer_markdown', 'explanation_markdown')
+
+
+# 只写的流缓冲区，ZipFile写入后由生成器取出输出；不可seek，ZipFile会使用数据描述符流式写入
+class StreamBuffer(io.RawIOBase):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+def _json_line(row):
+    return (json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+
+def _question_row(question):
+    return {
+        'id': question.id,
+        'question_type': question.question_type.type_code,
+        'summary': question.summary,
+        'content_markdown': question.content_markdown,
+        'answer_markdown': question.answer_markdown,
+        'answer_json': question.answer_json,
+        'explanation_markdown': question.explanation_markdown,
+        # 预加载后直接取id，不再查询
+        'categories': [category.id for category in question.categories.all()],
+        'support_objectives': [objective.id for objective in question.support_objectives.all()],
+    }
+
+# 逐行写入JSON Lines成员，每行后让出控制权以便输出缓冲区
+def _write_jsonl(archive, name, rows):
+    with archive.open(name, 'w', force_zip64=True) as member:
+        for row in rows:
+            member.write(_json_line(row))
+            yield
+
+def _write_archive(archive, course):
+    archive.writestr('course.json', _json_line({'id': course.id, 'name': course.name, 'description': course.description}))
+    yield from _write_jsonl(
+        archive, 'categories.jsonl',
+        Category.objects.filter(course=course).order_by('id').values(*CATEGORY_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    yield from _write_jsonl(
+        archive, 'support_objectives.jsonl',
+        SupportObjective.objects.filter(course=course).order_by('id').values(*OBJECTIVE_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    media = set()
+    questions = Question.objects.filter(course=course).order_by('id').select_related('question_type').prefetch_related(
+        'categories', 'support_objectives'
+    )
+    def question_rows():
+        for question in questions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            for field in MARKDOWN_FIELDS:
+                media.update(markdown_image_paths(getattr(question, field)))
+            yield _question_row(question)
+    yield from _write_jsonl(archive, 'questions.jsonl', question_rows())
+
+    # 按块读取媒体文件，避免整个文件进入内存
+    for relative_path in sorted(media):
+        path = media_file_path(relative_path)
+        if path is None:
+            continue
+        try:
+            source = open(path, 'rb')
+        except OSError:
+            continue
+        with source, archive.open(f'media/{relative_path}', 'w', force_zip64=True) as member:
+            while chunk := source.read(FILE_CHUNK_SIZE):
+                member.write(chunk)
+                yield
+
+
+# 生成课程导出压缩包的字节流：course.json、categories.jsonl、support_objectives.jsonl、questions.jsonl和media/
+def stream_course_archive(course):
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for _ in _write_archive(archive, course):
+            if buffer.size >= FLUSH_SIZE:
+                yield buffer.drain()
+    yield buffer.drain()
@@ -1,24 +1,90 @@
 import os
 import re
+import json
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from urllib.parse import urlparse, unquote
+from rest_framework.utils.encoders import JSONEncoder
 
-# 删除试题时一起图片
-def remove_markdown_images(markdown_text):
+# 游标分页默认每页数量和最大每页数量
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# 流式输出时每次从服务端游标读取的行数
+STREAM_CHUNK_SIZE = 500
+
+# 提取Markdown中引用的本站媒体文件，返回相对于MEDIA_ROOT的路径
+def markdown_image_paths(markdown_text):
+    paths = []
     # 正则表达式匹配Markdown图片链接，提取完整的URL
-    image_patterns = re.findall(r'!\[.*?\]\((.*?)\)', markdown_text)
-    for url in image_patterns:
-        # 解析URL获取路径部分，并对路径进行URL解码
-        parsed_url = urlparse(url)
-        # URL解码，防止路径中的特殊字符问题
-        relative_path = unquote(parsed_url.path)
+    for url in re.findall(r'!\[.*?\]\((.*?)\)', markdown_text or ''):
+        # 解析URL获取路径部分，并对路径进行URL解码，防止路径中的特殊字符问题
+        relative_path = unquote(urlparse(url).path)
         # 移除URL的/media前缀
         if relative_path.startswith(settings.MEDIA_URL):
             relative_path = relative_path[len(settings.MEDIA_URL):]
         # 正确处理路径中可能的多余斜杠
-        relative_path = relative_path.lstrip('/')
-        # 完整的文件系统路径
-        image_path = os.path.join(relative_path)
-        # 检查并删除文件
-        if os.path.exists(image_path):
-            os.remove(image_path)
+        paths.append(relative_path.lstrip('/'))
+    return paths
+
+# 将相对路径解析为MEDIA_ROOT下的绝对路径，越出MEDIA_ROOT时返回None
+def media_file_path(relative_path):
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(media_root, relative_path))
+    if os.path.commonpath([media_root, path]) != media_root or path == media_root:
+        return None
+    return path
+
+# 解析游标分页参数，参数非法时抛出ValueError
+def parse_page_params(query_params):
+    cursor = query_params.get('cursor')
+    cursor = int(cursor) if cursor else None
+    if cursor is not None and cursor < 0:
+        raise ValueError('cursor不能为负数')
+    page_size = int(query_params.get('page_size', DEFAULT_PAGE_SIZE))
+    if page_size <= 0:
+        raise ValueError('page_size必须大于0')
+    return cursor, min(page_size, MAX_PAGE_SIZE)
+
+# 游标（keyset）分页：按id升序，cursor为上一页最后一条记录的id，深翻页不需要OFFSET
+def keyset_paginate(queryset, cursor, page_size):
+    if cursor is not None:
+        queryset = queryset.filter(id__gt=cursor)
+    # 多取一条用于判断是否还有下一页
+    page = list(queryset.order_by('id')[:page_size + 1])
+    next_cursor = page[page_size - 1].id if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+# 偏移分页：用于按相关度排序的搜索结果，cursor为下一页的起始位置
+def offset_paginate(queryset, offset, page_size):
+    offset = offset or 0
+    page = list(queryset[offset:offset + page_size + 1])
+    next_cursor = offset + page_size if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+# 流式响应：Django 4.2在ASGI下会把同步迭代器的全部内容读入内存后才发送，
+# 因此ASGI请求改用异步迭代器，每块在同步视图所在的线程中读取（生成器使用同一个数据库连接）
+def streaming_response(request, chunks, **kwargs):
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _iterate_in_thread(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+async def _iterate_in_thread(chunks):
+    chunks, done = iter(chunks), object()
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, done)) is not done:
+            yield chunk
+    finally:
+        # 客户端提前断开时关闭生成器，释放服务端游标
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
+
+# 流式输出JSON数组：逐块从服务端游标读取并逐行序列化，内存占用与结果数量无关
+def stream_json_array(queryset, serializer_class):
+    yield '['
+    for index, instance in enumerate(queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)):
+        row = json.dumps(serializer_class(instance).data, cls=JSONEncoder, ensure_ascii=False)
+        yield row if index == 0 else ',' + row
+    yield ']'
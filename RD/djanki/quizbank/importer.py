@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+from .cache import bump_course_version
+from .models import Category, Question, QuestionType, SupportObjective
+from .media import link_question_images
+from .search import index_questions
+from .serializers import QuestionSerializer
+
+# 每批写入的试题数量
+IMPORT_BATCH_SIZE = 500
+# 必填的文本字段，按QuestionSerializer中对应字段的规则校验（去除首尾空白后不能为空）
+TEXT_FIELDS = ('summary', 'content_markdown', 'answer_markdown', 'explanation_markdown')
+TEXT_ERRORS = {'required': '该字段是必填项', 'null': '该字段是必填项', 'blank': '该字段不能为空'}
+SUPPORTED_FORMATS = ('jsonl', 'csv')
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+# 整个文件无法读取（编码错误或CSV格式错误），不导入任何试题
+class ImportFileError(Exception):
+    pass
+
+
+# 导入前一次性加载题型、课程知识点和支撑目标，逐行校验时不再查询数据库
+class ImportLookups:
+    def __init__(self, course):
+        self.types = {}
+        for type_id, type_code in QuestionType.objects.values_list('id', 'type_code'):
+            self.types[str(type_id)] = type_id
+            self.types[type_code] = type_id
+        self.categories = set(
+            Category.objects.filter(course=course, is_knowledge_point=True).values_list('id', flat=True)
+        )
+        self.objectives = set(SupportObjective.objects.filter(course=course).values_list('id', flat=True))
+        fields = QuestionSerializer().fields
+        self.text_fields = {field: fields[field] for field in TEXT_FIELDS}
+
+
+# 由文件名推断格式
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'jsonl': 'jsonl', 'ndjson': 'jsonl', 'csv': 'csv'}.get(extension)
+
+# 逐行读取上传文件，产生(行号, 原始数据)；单行解析失败时产生(行号, RowError)，文件无法读取时抛出ImportFileError
+def iter_rows(upload, file_format):
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    try:
+        yield from (_iter_csv(text) if file_format == 'csv' else _iter_jsonl(text))
+    except UnicodeDecodeError:
+        raise ImportFileError('文件必须是UTF-8编码')
+
+def _iter_csv(text):
+    reader = csv.DictReader(text)
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as e:
+        raise ImportFileError(f'CSV格式错误：{e}')
+
+def _iter_jsonl(text):
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, RowError({'line': f'JSON格式错误：{e.msg}'})
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError({'line': '每行必须是一个JSON对象'})
+            continue
+        yield line_number, row
+
+# 知识点、支撑目标ID列表：JSON中为数组，CSV中为分号分隔的字符串
+def parse_id_list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = [item for item in value.replace(',', ';').split(';') if item.strip()]
+    if not isinstance(value, list):
+        raise ValueError
+    return [int(item) for item in value]
+
+# 校验并转换一行数据，返回(试题, 知识点ID列表, 支撑目标ID列表)
+def clean_row(row, lookups, course):
+    errors = {}
+    type_id = lookups.types.get(str(row.get('question_type', '')).strip())
+    if type_id is None:
+        errors['question_type'] = '题型不存在'
+    values = {}
+    for field in TEXT_FIELDS:
+        try:
+            values[field] = lookups.text_fields[field].run_validation(row.get(field, empty))
+        except serializers.ValidationError as e:
+            errors[field] = TEXT_ERRORS.get(e.get_codes()[0], str(e.detail[0]))
+    answer_json = row.get('answer_json', {})
+    if isinstance(answer_json, str):
+        try:
+            answer_json = json.loads(answer_json) if answer_json.strip() else {}
+        except json.JSONDecodeError:
+            errors['answer_json'] = 'JSON格式错误'
+    related = {}
+    for field, known in (('categories', lookups.categories), ('support_objectives', lookups.objectives)):
+        try:
+            ids = parse_id_list(row.get(field))
+        except (TypeError, ValueError):
+            errors[field] = 'ID列表格式错误'
+            continue
+        missing = [item for item in ids if item not in known]
+        if missing:
+            errors[field] = f'本课程中不存在：{missing}'
+        related[field] = ids
+    if errors:
+        raise RowError(errors)
+    question = Question(course=course, question_type_id=type_id, answer_json=answer_json, **values)
+    return question, related['categories'], related['support_objectives']
+
+
+def _write_batch(batch):
+    questions = Question.objects.bulk_create([question for question, _, _ in batch])
+    Question.categories.through.objects.bulk_create([
+        Question.categories.through(question_id=question.id, category_id=category_id)
+        for question, category_ids, _ in batch for category_id in set(category_ids)
+    ], batch_size=IMPORT_BATCH_SIZE)
+    Question.support_objectives.through.objects.bulk_create([
+        Question.support_objectives.through(question_id=question.id, supportobjective_id=objective_id)
+        for question, _, objective_ids in batch for objective_id in set(objective_ids)
+    ], batch_size=IMPORT_BATCH_SIZE)
+    # bulk_create不触发信号，手动更新搜索索引和图片关联
+    index_questions(questions)
+    link_question_images(questions)
+
+
+# 批量导入试题：逐行解析、按预加载的数据校验，在一个事务中分批写入；返回导入数量和逐行错误
+def import_questions(course, upload, file_format):
+    lookups = ImportLookups(course)
+    created, errors, batch = 0, [], []
+    with transaction.atomic():
+        for line_number, row in iter_rows(upload, file_format):
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(clean_row(row, lookups, course))
+            except RowError as e:
+                errors.append({'line': line_number, 'errors': e.errors})
+                continue
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _write_batch(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            _write_batch(batch)
+            created += len(batch)
+        if created:
+            bump_course_version(course.id)
+    return created, errors
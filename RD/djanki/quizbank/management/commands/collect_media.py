@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from quizbank.media import collect_orphaned_media
+
+
+class Command(BaseCommand):
+    help = '删除未被任何试题引用的媒体文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24, help='只删除修改时间早于该小时数的文件')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批删除的文件数量')
+        parser.add_argument('--pause', type=float, default=0.0, help='每批之间暂停的秒数，用于限制IO')
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+
+    def handle(self, *args, **options):
+        result = collect_orphaned_media(
+            grace_period=options['grace_hours'] * 60 * 60,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        action = '可回收' if options['dry_run'] else '已删除'
+        self.stdout.write(self.style.SUCCESS(f"{action} {result['files']} 个文件，共 {result['bytes']} 字节"))
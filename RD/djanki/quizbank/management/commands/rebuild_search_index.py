@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from quizbank.models import Question
+from quizbank.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = '重建试题搜索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='只重建指定课程的试题')
+
+    def handle(self, *args, **options):
+        questions = Question.objects.all()
+        if options['course']:
+            questions = questions.filter(course_id=options['course'])
+        total = rebuild_index(questions)
+        self.stdout.write(self.style.SUCCESS(f'已重建 {total} 道试题的搜索索引'))
@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .func import markdown_image_paths, media_file_path
+from .models import Question, QuestionImage
+
+try:
+    from PIL import Image
+except ImportError:  # 未安装Pillow时不生成缩略图
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# 图片按内容哈希存放的目录
+IMAGE_DIR = 'images'
+# 上传中的临时文件目录
+UPLOAD_TMP_DIR = 'tmp'
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp', 'svg'}
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+# 缩略图宽度，原图不宽于该值时不生成
+THUMBNAIL_WIDTHS = (320, 960)
+# 矢量图不生成缩略图
+VECTOR_EXTENSIONS = {'svg'}
+THUMBNAIL_WORKERS = 2
+# 等待生成缩略图的最大任务数，超出时跳过，不阻塞请求
+THUMBNAIL_QUEUE_LIMIT = 32
+MARKDOWN_FIELDS = ('content_markdown', 'answer_markdown', 'explanation_markdown')
+
+_thumbnail_pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnail')
+_thumbnail_slots = threading.BoundedSemaphore(THUMBNAIL_QUEUE_LIMIT)
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def image_extension(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in ALLOWED_EXTENSIONS:
+        raise ImageRejected(f'不支持的图片格式：{extension or "无扩展名"}')
+    return 'jpg' if extension == 'jpeg' else extension
+
+def _relative_path(digest, extension, suffix=''):
+    return f'{IMAGE_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}.{extension}'
+
+def thumbnail_path(relative_path, width):
+    stem, extension = relative_path.rsplit('.', 1)
+    return f'{stem}_{width}.{extension}'
+
+def media_url(relative_path):
+    return settings.MEDIA_URL + relative_path
+
+
+# 按块写入临时文件并同时计算SHA-256，相同内容只保存一份；返回(相对路径, 是否已存在)
+def store_image(upload):
+    extension = image_extension(upload.name)
+    if upload.size is not None and upload.size > MAX_IMAGE_SIZE:
+        raise ImageRejected('图片不能超过10MB')
+    tmp_dir = os.path.join(settings.MEDIA_ROOT, UPLOAD_TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest, size = hashlib.sha256(), 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in upload.chunks():
+                size += len(chunk)
+                if size > MAX_IMAGE_SIZE:
+                    raise ImageRejected('图片不能超过10MB')
+                digest.update(chunk)
+                tmp.write(chunk)
+        relative_path = _relative_path(digest.hexdigest(), extension)
+        final_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+        if os.path.exists(final_path):
+            try:
+                _touch(relative_path)
+                return relative_path, True
+            except FileNotFoundError:
+                # 检查后恰好被媒体回收删除，按新文件写入
+                pass
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        return relative_path, False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# 重复上传视为新上传：刷新原图和已有缩略图的修改时间，宽限期重新计算，避免刚上传就被媒体回收删除
+def _touch(relative_path):
+    os.utime(os.path.join(settings.MEDIA_ROOT, relative_path))
+    for width in THUMBNAIL_WIDTHS:
+        try:
+            os.utime(os.path.join(settings.MEDIA_ROOT, thumbnail_path(relative_path, width)))
+        except FileNotFoundError:
+            pass
+
+
+# 会为图片生成的缩略图宽度：Pillow能读取的位图中，比原图窄的宽度；existing为True时只返回已生成的
+def thumbnail_widths(relative_path, existing=False):
+    source = media_file_path(relative_path)
+    if Image is None or source is None or relative_path.rsplit('.', 1)[-1] in VECTOR_EXTENSIONS:
+        return []
+    try:
+        # 只读取文件头，不解码像素
+        with Image.open(source) as image:
+            width = image.width
+    except Exception:
+        return []
+    widths = [thumbnail_width for thumbnail_width in THUMBNAIL_WIDTHS if thumbnail_width < width]
+    if existing:
+        widths = [w for w in widths if os.path.exists(os.path.join(settings.MEDIA_ROOT, thumbnail_path(relative_path, w)))]
+    return widths
+
+def make_thumbnails(relative_path):
+    source = media_file_path(relative_path)
+    if Image is None or source is None or relative_path.rsplit('.', 1)[-1] in VECTOR_EXTENSIONS:
+        return
+    try:
+        with Image.open(source) as image:
+            for width in THUMBNAIL_WIDTHS:
+                target = os.path.join(settings.MEDIA_ROOT, thumbnail_path(relative_path, width))
+                if image.width <= width or os.path.exists(target):
+                    continue
+                variant = image.copy()
+                variant.thumbnail((width, image.height * width // image.width))
+                # 先写临时文件再改名，避免读到写了一半的缩略图
+                tmp_target = target + '.tmp'
+                variant.save(tmp_target, format=image.format)
+                os.replace(tmp_target, target)
+    except Exception:
+        logger.exception('生成缩略图失败：%s', relative_path)
+
+# 在后台线程池中生成缩略图；队列已满时跳过，返回是否已提交
+def schedule_thumbnails(relative_path):
+    if Image is None or not _thumbnail_slots.acquire(blocking=False):
+        return False
+    future = _thumbnail_pool.submit(make_thumbnails, relative_path)
+    future.add_done_callback(lambda _: _thumbnail_slots.release())
+    return True
+
+
+def question_image_urls(question):
+    urls = set()
+    for field in MARKDOWN_FIELDS:
+        urls.update(media_url(path) for path in markdown_image_paths(getattr(question, field)))
+    return urls
+
+# 使QuestionImage与试题Markdown中引用的图片保持一致
+def link_question_images(questions):
+    questions = list(questions)
+    existing = {}
+    for question_id, image_url in QuestionImage.objects.filter(
+        question_id__in=[question.pk for question in questions]
+    ).values_list('question_id', 'image_url'):
+        existing.setdefault(question_id, set()).add(image_url)
+    stale, missing = [], []
+    for question in questions:
+        referenced = question_image_urls(question)
+        linked = existing.get(question.pk, set())
+        stale.extend((question.pk, url) for url in linked - referenced)
+        missing.extend(QuestionImage(question_id=question.pk, image_url=url) for url in referenced - linked)
+    for question_id, image_url in stale:
+        QuestionImage.objects.filter(question_id=question_id, image_url=image_url).delete()
+    QuestionImage.objects.bulk_create(missing)
+
+
+# 缩略图文件名对应的原图路径，非缩略图返回None
+def _thumbnail_source(relative_path):
+    stem, dot, extension = relative_path.rpartition('.')
+    for width in THUMBNAIL_WIDTHS:
+        suffix = f'_{width}'
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)] + dot + extension
+    return None
+
+# 所有试题Markdown和QuestionImage引用的媒体文件（相对MEDIA_ROOT的路径）
+def referenced_media():
+    referenced = set()
+    rows = Question.objects.order_by().values_list(*MARKDOWN_FIELDS).iterator(chunk_size=2000)
+    for markdowns in rows:
+        for markdown in markdowns:
+            referenced.update(markdown_image_paths(markdown))
+    for image_url in QuestionImage.objects.values_list('image_url', flat=True).iterator(chunk_size=2000):
+        referenced.update(markdown_image_paths(f'![]({image_url})'))
+    return referenced
+
+# 遍历MEDIA_ROOT，产生超过宽限期且未被引用的文件
+def _orphaned_files(referenced, cutoff):
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    for directory, _, names in os.walk(media_root):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative_path = os.path.relpath(path, media_root).replace(os.sep, '/')
+            if relative_path in referenced or _thumbnail_source(relative_path) in referenced:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # 宽限期内的文件可能刚上传、尚未保存到试题中
+            if stat.st_mtime < cutoff:
+                yield path, stat.st_size
+
+# 分批删除未被引用的媒体文件，返回{'files': 删除数量, 'bytes': 回收字节数}
+def collect_orphaned_media(grace_period=24 * 60 * 60, batch_size=500, pause=0.0, dry_run=False):
+    referenced = referenced_media()
+    cutoff = time.time() - grace_period
+    files = reclaimed = 0
+    batch = []
+    for path, size in _orphaned_files(referenced, cutoff):
+        batch.append((path, size))
+        if len(batch) >= batch_size:
+            deleted, freed = _delete_batch(batch, cutoff, dry_run)
+            files, reclaimed, batch = files + deleted, reclaimed + freed, []
+            if pause:
+                time.sleep(pause)
+    deleted, freed = _delete_batch(batch, cutoff, dry_run)
+    return {'files': files + deleted, 'bytes': reclaimed + freed}
+
+# 删除前再检查一次修改时间：列出文件后它可能又被重新上传
+def _delete_batch(batch, cutoff, dry_run):
+    deleted = freed = 0
+    for path, size in batch:
+        try:
+            if os.stat(path).st_mtime >= cutoff:
+                continue
+        except OSError:
+            continue
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        deleted += 1
+        freed += size
+    return deleted, freed
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+# 为已有知识点按层级逐层填充物化路径
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model('quizbank', 'Category')
+    paths = {}
+    level = list(Category.objects.filter(parent__isnull=True).values_list('id', flat=True))
+    for category_id in level:
+        paths[category_id] = f'/{category_id}/'
+    while level:
+        children = list(Category.objects.filter(parent_id__in=level).values_list('id', 'parent_id'))
+        for category_id, parent_id in children:
+            paths[category_id] = f'{paths[parent_id]}{category_id}/'
+        level = [category_id for category_id, _ in children]
+    categories = [Category(id=category_id, path=path) for category_id, path in paths.items()]
+    Category.objects.bulk_update(categories, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizbank', '0002_questionimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='quizbank_category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:54
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# 仅在PostgreSQL上为搜索文档建立GIN三元组索引，其他数据库使用倒排索引
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX quizbank_search_document_trgm ON quizbank_questionsearchdocument '
+            'USING gin (document gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS quizbank_search_document_trgm')
+
+
+# 为已有的试题建立搜索索引，之后由信号随试题增删改维护；PostgreSQL上只需要搜索文档
+def backfill_search_index(apps, schema_editor):
+    from quizbank.search import FIELD_WEIGHTS, INDEX_BATCH_SIZE, build_document, build_terms
+    Question = apps.get_model('quizbank', 'Question')
+    QuestionSearchDocument = apps.get_model('quizbank', 'QuestionSearchDocument')
+    QuestionSearchTerm = apps.get_model('quizbank', 'QuestionSearchTerm')
+    db = schema_editor.connection.alias
+    questions = Question.objects.using(db).only(*(field for field, _ in FIELD_WEIGHTS)).order_by('pk')
+    last_pk = 0
+    while batch := list(questions.filter(pk__gt=last_pk)[:INDEX_BATCH_SIZE]):
+        QuestionSearchDocument.objects.using(db).bulk_create(
+            [QuestionSearchDocument(question_id=question.pk, document=build_document(question)) for question in batch]
+        )
+        if schema_editor.connection.vendor != 'postgresql':
+            QuestionSearchTerm.objects.using(db).bulk_create(
+                [QuestionSearchTerm(term=term, question_id=question_id, weight=weight)
+                 for question in batch for term, question_id, weight in build_terms(question)],
+                batch_size=INDEX_BATCH_SIZE,
+            )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizbank', '0003_category_path'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='QuestionSearchDocument',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='quizbank.question')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('weight', models.FloatField(default=0.0, help_text='按字段加权的词频')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='quizbank.question')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'question'], name='quizbank_qu_term_b548b1_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import CharField, Max, Min, Value
+from django.db.models.functions import Concat, Substr
 
 
 # 题目类型
@@ -27,6 +29,11 @@ class Course(models.Model):
     def __str__(self):
         return self.name
 
+# 知识点拖拽的位置
+MOVE_POSITIONS = ("before", "after", "inner")
+# 相邻排序值的最小间隔，小于该值时重新编号
+ORDER_MIN_GAP = 1e-9
+
 # 知识点
 class Category(models.Model):
     course = models.ForeignKey(
@@ -38,14 +45,135 @@ class Category(models.Model):
     )
     is_knowledge_point = models.BooleanField(default=False) # 是否为知识点
     order = models.FloatField(default=0.0, help_text="用于设置显示顺序")
+    # 物化路径，如"/1/5/12/"，由save()维护，用于无递归地读取子树
+    path = models.CharField(max_length=1024, blank=True, default="", editable=False)
 
     class Meta:
         unique_together = ("parent", "name") # 设置parent和name的组合唯一，保证同一父分类下没有重名的子分类
         ordering = ["order"]
+        indexes = [
+            models.Index(fields=["path"], name="quizbank_category_path_idx", opclasses=["varchar_pattern_ops"]),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """保存时维护物化路径，父级变化时用一条UPDATE同步所有后代的路径。
+
+        父级变化时先检查新父级不是自身或其后代，否则抛出ValueError，避免形成环。
+        """
+        old_path = self.path
+        # 路径末尾两段即父级id和自身id，父级未变化时无需额外查询
+        tail = f"/{self.parent_id}/{self.pk}/" if self.parent_id else f"/{self.pk}/"
+        unchanged = self.pk is not None and old_path.endswith(tail) and (self.parent_id or old_path == tail)
+        parent_path = None
+        if not unchanged and self.pk is not None and self.parent_id is not None:
+            parent_path = self._check_parent()
+        super().save(*args, **kwargs)
+        if unchanged:
+            return
+        if not self.parent_id:
+            parent_path = "/"
+        elif parent_path is None:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list("path", flat=True).get()
+        new_path = f"{parent_path}{self.pk}/"
+        if new_path == old_path:
+            return
+        Category.objects.filter(pk=self.pk).update(path=new_path)
+        if old_path:
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1), output_field=CharField())
+            )
+        self.path = new_path
+
+    # 返回新父级的路径，save()直接使用，不再单独查询
+    def _check_parent(self):
+        # 使用数据库中的路径：内存中的self.path在祖先移动后可能已过期
+        paths = dict(Category.objects.filter(pk__in=[self.pk, self.parent_id]).values_list("pk", "path"))
+        own_path, parent_path = paths.get(self.pk), paths.get(self.parent_id)
+        if own_path and parent_path:
+            cyclic = parent_path.startswith(own_path)
+        else:
+            cyclic = self.pk in _ancestor_ids(self.parent_id)
+        if cyclic:
+            raise ValueError("不能将知识点移动到其自身或子知识点下")
+        return parent_path
+
+    def get_subtree(self, include_self=True):
+        """按物化路径一次查询取出子树；路径缺失时按parent逐层查询。"""
+        if self.path:
+            subtree = Category.objects.filter(path__startswith=self.path)
+        else:
+            ids, level = [self.pk], [self.pk]
+            while level:
+                level = list(Category.objects.filter(parent_id__in=level).exclude(pk__in=ids).values_list("pk", flat=True))
+                ids += level
+            subtree = Category.objects.filter(pk__in=ids)
+        return subtree if include_self else subtree.exclude(pk=self.pk)
+
+    def is_descendant_of(self, other):
+        """self是other本身或其后代；任一方路径缺失时沿parent逐级向上查找。"""
+        if self.path and other.path:
+            return self.path.startswith(other.path)
+        return other.pk in _ancestor_ids(self.pk)
+
+    def move_to(self, target, position):
+        """移动到target之前（before）、之后（after）或内部末尾（inner）。
+
+        order取相邻兄弟排序值的中点，只写入被移动的节点；间隔小于ORDER_MIN_GAP时，
+        先用一条批量UPDATE把新兄弟节点重新编号为1, 2, 3...
+        """
+        if position not in MOVE_POSITIONS:
+            raise ValueError("type必须是before、after或inner")
+        parent = target if position == "inner" else target.parent
+        if target.pk == self.pk or (parent is not None and parent.is_descendant_of(self)):
+            raise ValueError("不能将知识点移动到其自身或子知识点下")
+        order = self._order_near(parent, target, position)
+        if order is None:
+            self._renumber_children(parent)
+            target.refresh_from_db(fields=["order"])
+            order = self._order_near(parent, target, position)
+        self.parent = parent
+        self.order = order
+        self.save(update_fields=["parent", "order"])
+
+    def _order_near(self, parent, target, position):
+        siblings = Category.objects.filter(course_id=self.course_id, parent=parent).exclude(pk=self.pk)
+        if position == "inner":
+            last = siblings.aggregate(Max("order"))["order__max"]
+            return 1.0 if last is None else last + 1
+        # 与target同序的兄弟也算作相邻节点，此时间隔为0，触发重新编号
+        siblings = siblings.exclude(pk=target.pk)
+        if position == "before":
+            neighbour = siblings.filter(order__lte=target.order).aggregate(Max("order"))["order__max"]
+            default = target.order - 1
+        else:
+            neighbour = siblings.filter(order__gte=target.order).aggregate(Min("order"))["order__min"]
+            default = target.order + 1
+        if neighbour is None:
+            return default
+        if abs(target.order - neighbour) < ORDER_MIN_GAP:
+            return None
+        return (target.order + neighbour) / 2
+
+    def _renumber_children(self, parent):
+        siblings = list(
+            Category.objects.filter(course_id=self.course_id, parent=parent).exclude(pk=self.pk)
+            .order_by("order", "id").only("id", "order")
+        )
+        for index, sibling in enumerate(siblings):
+            sibling.order = index + 1
+        Category.objects.bulk_update(siblings, ["order"])
+
+# 从category_id开始沿parent逐级向上的id列表（含自身），每层一次查询；已有环时在重复处停止
+def _ancestor_ids(category_id):
+    ids = []
+    while category_id is not None and category_id not in ids:
+        ids.append(category_id)
+        category_id = Category.objects.filter(pk=category_id).values_list("parent_id", flat=True).first()
+    return ids
+
 # 支撑目标
 class SupportObjective(models.Model):
     course = models.ForeignKey(
@@ -96,4 +224,28 @@ class QuestionImage(models.Model):
     image_url = models.URLField(max_length=1024)
 
     def __str__(self):
-        return f"Image for {self.question.id}"
\ No newline at end of file
+        return f"Image for {self.question.id}"
+
+# 试题搜索文档：简介、内容、答案、解析规范化后的文本，PostgreSQL上建立GIN三元组索引
+class QuestionSearchDocument(models.Model):
+    question = models.OneToOneField(
+        Question, on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Search document for {self.question_id}"
+
+# 试题倒排索引：n-gram词项到试题的映射，非PostgreSQL数据库使用
+class QuestionSearchTerm(models.Model):
+    term = models.CharField(max_length=32)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.FloatField(default=0.0, help_text="按字段加权的词频")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'question']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.question_id}"
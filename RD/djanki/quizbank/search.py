@@ -0,0 +1,117 @@
+import math
+import re
+from collections import Counter
+from django.db import connection
+from django.db.models import Count, Sum
+from .models import Question, QuestionSearchDocument, QuestionSearchTerm
+
+# 参与搜索的字段及其权重
+FIELD_WEIGHTS = (
+    ('summary', 4.0),
+    ('content_markdown', 2.0),
+    ('answer_markdown', 1.0),
+    ('explanation_markdown', 1.0),
+)
+# 倒排索引检索时，至少要命中的查询词项比例
+MIN_TERM_COVERAGE = 0.5
+# 词项最大长度，与QuestionSearchTerm.term一致
+MAX_TERM_LENGTH = 32
+# 重建索引时每批处理的试题数量
+INDEX_BATCH_SIZE = 500
+
+# Markdown图片、链接地址和标记符号，不参与搜索
+MARKDOWN_NOISE = re.compile(r'!\[[^\]]*\]\([^)]*\)|\]\([^)]*\)|https?://\S+|[#*_`>|~\[\]\-]+')
+# 连续的中日韩文字，或连续的字母数字
+TOKEN_RUNS = re.compile(r'[㐀-鿿豈-﫿]+|[0-9a-z]+')
+CJK_RUN = re.compile(r'[㐀-鿿豈-﫿]+')
+
+
+# PostgreSQL使用pg_trgm三元组检索，其余数据库使用本地倒排索引
+def uses_trigram():
+    return connection.vendor == 'postgresql'
+
+# 去掉Markdown标记并转为小写
+def normalize(text):
+    return MARKDOWN_NOISE.sub(' ', text or '').lower()
+
+# 分词：中文按二元组切分（单字时保留单字），英文和数字按整词切分
+def tokenize(text):
+    terms = []
+    for run in TOKEN_RUNS.findall(normalize(text)):
+        if CJK_RUN.fullmatch(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run[:MAX_TERM_LENGTH])
+    return terms
+
+def build_document(question):
+    return '\n'.join(normalize(getattr(question, field)) for field, _ in FIELD_WEIGHTS)
+
+def build_terms(question):
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(getattr(question, field)):
+            weights[term] += weight
+    return [(term, question.pk, weight) for term, weight in weights.items()]
+
+# 词项行数远多于试题数，绕过模型实例化直接executemany写入
+def _insert_terms(rows):
+    table = connection.ops.quote_name(QuestionSearchTerm._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {table} (term, question_id, weight) VALUES (%s, %s, %s)', rows)
+
+
+# 重建一批试题的搜索索引
+def index_questions(questions):
+    questions = list(questions)
+    if not questions:
+        return
+    ids = [question.pk for question in questions]
+    QuestionSearchDocument.objects.filter(question_id__in=ids).delete()
+    QuestionSearchDocument.objects.bulk_create(
+        [QuestionSearchDocument(question_id=question.pk, document=build_document(question)) for question in questions]
+    )
+    if not uses_trigram():
+        QuestionSearchTerm.objects.filter(question_id__in=ids).delete()
+        _insert_terms([row for question in questions for row in build_terms(question)])
+
+def index_question(question):
+    index_questions([question])
+
+# 分批重建全部（或指定范围）试题的搜索索引，返回处理的试题数量
+def rebuild_index(queryset=None):
+    queryset = (queryset if queryset is not None else Question.objects.all()).order_by('id')
+    total, last_id = 0, 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:INDEX_BATCH_SIZE])
+        if not batch:
+            return total
+        index_questions(batch)
+        total += len(batch)
+        last_id = batch[-1].id
+
+
+# 按相关度搜索试题，返回按相关度降序排列的查询集
+def search_questions(query, course_id=None, type_code=None):
+    questions = Question.objects.all()
+    if course_id is not None:
+        questions = questions.filter(course_id=course_id)
+    if type_code:
+        questions = questions.filter(question_type__type_code=type_code)
+
+    if uses_trigram():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        text = normalize(query).strip()
+        if not text:
+            return questions.none()
+        return questions.filter(search_document__document__trigram_word_similar=text).annotate(
+            rank=TrigramWordSimilarity(text, 'search_document__document')
+        ).order_by('-rank', 'id')
+
+    terms = set(tokenize(query))
+    if not terms:
+        return questions.none()
+    return questions.filter(search_terms__term__in=terms).annotate(
+        matched=Count('search_terms__term', distinct=True),
+        rank=Sum('search_terms__weight'),
+    ).filter(matched__gte=math.ceil(len(terms) * MIN_TERM_COVERAGE)).order_by('-matched', '-rank', 'id')
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import Course,Category,Question,QuestionType,SupportObjective
 
 # 课程序列化
@@ -7,14 +8,34 @@ class CourseSerializer(serializers.ModelSerializer):
         model = Course
         fields = ['id','name', 'description']
 
-# 知识点序列化
-class RecursiveSerializer(serializers.Serializer):
-    def to_representation(self, value):
-        serializer = self.parent.parent.__class__(value, context=self.context)
-        return serializer.data
+# 知识点树的字段，与CategorySerializer的输出保持一致
+CATEGORY_TREE_FIELDS = ('id', 'name', 'parent_id', 'is_knowledge_point', 'order')
+
+# 在内存中由扁平的知识点行构建树，rows需按order排序；父级不在rows中的节点作为根
+def build_category_tree(rows):
+    nodes = {}
+    for row in rows:
+        nodes[row['id']] = {
+            'id': row['id'],
+            'name': row['name'],
+            'parent': row['parent_id'],
+            'is_knowledge_point': row['is_knowledge_point'],
+            'order': row['order'],
+            'children': [],
+            'parent_id': row['parent_id'],
+        }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['children'].append(node)
+    return roots
 
+# 知识点序列化
 class CategorySerializer(serializers.ModelSerializer):
-    children = RecursiveSerializer(many=True, read_only=True)
+    children = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
@@ -23,9 +44,20 @@ class CategorySerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         # 为顶层知识点设置parent_id为None
-        representation['parent_id'] = instance.parent_id if instance.parent else None
+        representation['parent_id'] = instance.parent_id
         return representation
 
+    # 修改父级时不能移到自身或其后代下，否则形成环
+    def validate_parent(self, value):
+        if self.instance is not None and value is not None and value.is_descendant_of(self.instance):
+            raise serializers.ValidationError('不能将知识点移动到其自身或子知识点下')
+        return value
+
+    # 按物化路径一次查询取出子树，不再逐层递归查询children
+    def get_children(self, instance):
+        rows = instance.get_subtree().values(*CATEGORY_TREE_FIELDS)
+        return build_category_tree(rows)[0]['children']
+
 # 试题创建序列化
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -47,6 +79,20 @@ class QuestionSerializer(serializers.ModelSerializer):
     categories = serializers.PrimaryKeyRelatedField(queryset=Category.objects.filter(is_knowledge_point=True), many=True)
     support_objectives = serializers.PrimaryKeyRelatedField(queryset=SupportObjective.objects.all(), many=True)
 
+    # 列表序列化前预加载题型、知识点和支撑目标，查询次数与题目数量无关
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('question_type').prefetch_related(*question_prefetches())
+
+
+# 试题列表的预加载项，prefix用于从其他模型关联到试题，如'question__'
+def question_prefetches(prefix=''):
+    # 列表序列化只用到知识点和支撑目标的id、name
+    return (
+        Prefetch(prefix + 'categories', queryset=Category.objects.only('id', 'name')),
+        Prefetch(prefix + 'support_objectives', queryset=SupportObjective.objects.only('id', 'name')),
+    )
+
 # 课程支撑
 class SupportObjectiveSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,51 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_course_version, clear_course_cache
+from .models import Category, Course, Question, QuestionType, SupportObjective
+from .media import link_question_images
+from .search import index_question
+
+
+# 试题保存后更新搜索索引，删除时索引随外键级联删除
+@receiver(post_save, sender=Question)
+def update_question_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_question(instance)
+
+
+# 试题保存后同步其引用的图片
+@receiver(post_save, sender=Question)
+def update_question_images(sender, instance, raw=False, **kwargs):
+    if not raw:
+        link_question_images([instance])
+
+
+# 课程及其知识点、支撑目标、试题变化时使课程缓存失效
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SupportObjective)
+@receiver(post_delete, sender=SupportObjective)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_course_cache(sender, instance, **kwargs):
+    bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course(sender, instance, **kwargs):
+    bump_course_version(instance.pk)
+
+
+# 试题与知识点、支撑目标的关联变化，instance可能是任意一端，两端都有course_id
+@receiver(m2m_changed, sender=Question.categories.through)
+@receiver(m2m_changed, sender=Question.support_objectives.through)
+def invalidate_course_relations(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=QuestionType)
+@receiver(post_delete, sender=QuestionType)
+def invalidate_question_types(sender, **kwargs):
+    clear_course_cache()
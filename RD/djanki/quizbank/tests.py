@@ -1,3 +1,540 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from unittest import mock, skipUnless
+from PIL import Image
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from login.models import User
+from .cache import get_cache
+from .media import collect_orphaned_media, make_thumbnails
+from .models import Course, Category, Question, QuestionImage, QuestionSearchDocument, QuestionSearchTerm, QuestionType, SupportObjective
 
-# Create your tests here.
+
+# 创建带知识点、支撑目标的试题，供各测试复用
+def create_questions(course, count, question_type=None):
+    question_type = question_type or QuestionType.objects.get_or_create(type_code='SC', defaults={'description': '单选题'})[0]
+    category = Category.objects.get_or_create(course=course, name='知识点', defaults={'is_knowledge_point': True})[0]
+    objective = SupportObjective.objects.get_or_create(course=course, name='目标')[0]
+    questions = []
+    for i in range(count):
+        question = Question.objects.create(
+            question_type=question_type, course=course, summary=f'题目{i}',
+            content_markdown=f'内容{i}', answer_markdown='答案', answer_json={}, explanation_markdown='解析'
+        )
+        question.categories.add(category)
+        question.support_objectives.add(objective)
+        questions.append(question)
+    return questions
+
+
+# 已登录用户的接口测试，每个测试前清空课程缓存
+class ApiTestCase(TestCase):
+    role = '教师'
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='tester', password='pw', role=self.role)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(name='课程')
+
+    # 执行写操作并运行事务提交回调（缓存失效在提交后进行）
+    def commit(self, write):
+        with self.captureOnCommitCallbacks(execute=True):
+            return write()
+
+
+# 列表接口的查询次数不能随行数增长
+class QueryBudgetMixin:
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, grow):
+        small = self.count_queries(url)
+        self.commit(grow)
+        self.assertEqual(self.count_queries(url), small)
+
+
+class QuestionListQueryTests(QueryBudgetMixin, ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        create_questions(self.course, 2)
+
+    def test_course_question_list(self):
+        url = f'/api/teach_admin/courses/{self.course.id}/questions/'
+        self.assertConstantQueries(url, lambda: create_questions(self.course, 20))
+
+    def test_search_questions(self):
+        url = '/api/teach_admin/question/search-by-content/?query=内容'
+        self.assertConstantQueries(url, lambda: create_questions(self.course, 20))
+
+    def test_representation_unchanged(self):
+        response = self.client.get(f'/api/teach_admin/courses/{self.course.id}/questions/')
+        row = response.json()[0]
+        self.assertEqual(row['question_type'], '单选题')
+        self.assertEqual(row['categories'][0]['name'], '知识点')
+        self.assertEqual(row['support_objectives'][0]['name'], '目标')
+
+
+class QuestionListPagingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.questions = create_questions(self.course, 7)
+        self.url = f'/api/teach_admin/courses/{self.course.id}/questions/'
+
+    def test_keyset_pages_cover_all_rows(self):
+        ids, cursor = [], None
+        while True:
+            params = {'page_size': 3} if cursor is None else {'page_size': 3, 'cursor': cursor}
+            body = self.client.get(self.url, params).json()
+            ids += [row['id'] for row in body['results']]
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, [q.id for q in self.questions])
+
+    def test_invalid_page_params(self):
+        self.assertEqual(self.client.get(self.url, {'page_size': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'cursor': -1}).status_code, 400)
+
+    def test_stream_matches_full_list(self):
+        response = self.client.get(self.url, {'stream': 1})
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get(self.url).json())
+
+    async def test_stream_under_asgi(self):
+        # ASGI下使用异步迭代器逐块发送，而不是先把全部内容读入内存
+        token = RefreshToken.for_user(self.user).access_token
+        client, headers = AsyncClient(), {'authorization': f'Bearer {token}'}
+        response = await client.get(self.url, {'stream': 1}, headers=headers)
+        self.assertTrue(response.is_async)
+        streamed = json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual(streamed, (await sync_to_async(self.client.get)(self.url)).json())
+        response = await client.get(f'/api/teach_admin/courses/{self.course.id}/export/', headers=headers)
+        self.assertTrue(response.is_async)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join([chunk async for chunk in response.streaming_content])))
+        self.assertIn('questions.jsonl', archive.namelist())
+
+
+class CategoryTreeTests(QueryBudgetMixin, ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = Category.objects.create(course=self.course, name='章', order=1)
+        self.child = Category.objects.create(course=self.course, name='节', parent=self.root, order=1)
+        self.leaf = Category.objects.create(course=self.course, name='点', parent=self.child, order=1)
+
+    def add_branch(self, depth):
+        parent = self.root
+        for i in range(depth):
+            parent = Category.objects.create(course=self.course, name=f'层{i}', parent=parent, order=i + 10)
+
+    def test_tree_is_single_query(self):
+        url = f'/api/teach_admin/courses/{self.course.id}/category/'
+        self.assertConstantQueries(url, lambda: self.add_branch(10))
+        tree = self.client.get(url).json()
+        self.assertEqual(tree[0]['children'][0]['children'][0]['name'], '点')
+
+    def test_paths_follow_moves(self):
+        other = Category.objects.create(course=self.course, name='另一章', order=2)
+        response = self.client.post(
+            f'/api/teach_admin/courses/{self.course.id}/tree-update/',
+            {'draggedId': self.child.id, 'dropId': other.id, 'type': 'inner'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.path, f'/{other.id}/{self.child.id}/{self.leaf.id}/')
+        self.assertEqual(set(other.get_subtree()), {other, self.child, self.leaf})
+
+    def test_cannot_move_into_own_subtree(self):
+        response = self.client.post(
+            f'/api/teach_admin/courses/{self.course.id}/tree-update/',
+            {'draggedId': self.root.id, 'dropId': self.leaf.id, 'type': 'inner'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_cannot_create_cycle(self):
+        url = f'/api/teach_admin/courses/{self.course.id}/category/{self.root.id}/'
+        self.assertEqual(self.client.put(url, {'parent': self.leaf.id}, format='json').status_code, 400)
+        self.root.refresh_from_db()
+        self.assertIsNone(self.root.parent_id)
+        self.root.parent = self.child
+        with self.assertRaises(ValueError):
+            self.root.save()
+
+    def test_missing_paths_fall_back_to_parents(self):
+        Category.objects.update(path='')
+        root, child, leaf = (Category.objects.get(pk=c.pk) for c in (self.root, self.child, self.leaf))
+        self.assertTrue(leaf.is_descendant_of(root))
+        self.assertFalse(root.is_descendant_of(leaf))
+        self.assertEqual(set(root.get_subtree()), {root, child, leaf})
+        self.assertEqual(self.client.put(f'/api/teach_admin/courses/{self.course.id}/category/{root.id}/',
+                                         {'parent': leaf.id}, format='json').status_code, 400)
+
+
+class QuestionSearchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_course = Course.objects.create(name='其他课程')
+        question_type = QuestionType.objects.create(type_code='SA', description='简答题')
+        self.in_explanation, self.in_summary = create_questions(self.course, 2, question_type)
+        self.in_explanation.explanation_markdown = '参见二叉树的遍历'
+        self.in_explanation.save()
+        self.in_summary.summary = '二叉树遍历'
+        self.in_summary.save()
+        self.elsewhere = create_questions(self.other_course, 1, question_type)[0]
+        self.elsewhere.answer_markdown = '二叉树'
+        self.elsewhere.save()
+
+    def search(self, **params):
+        return self.client.get('/api/teach_admin/question/search-by-content/', params)
+
+    def test_ranked_across_fields(self):
+        ids = [row['id'] for row in self.search(query='二叉树遍历').json()]
+        self.assertEqual(ids[:2], [self.in_summary.id, self.in_explanation.id])
+
+    def test_course_filter_and_pagination(self):
+        body = self.search(query='二叉树', course_id=self.course.id, page_size=1).json()
+        self.assertEqual(len(body['results']), 1)
+        body = self.search(query='二叉树', course_id=self.course.id, page_size=1, cursor=body['next_cursor']).json()
+        self.assertEqual(len(body['results']), 1)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_negative_cursor(self):
+        self.assertEqual(self.search(query='二叉树', cursor=-1).status_code, 400)
+
+    def test_no_match(self):
+        self.assertEqual(self.search(query='红黑树').status_code, 404)
+
+    def test_migration_backfills_existing_questions(self):
+        backfill = importlib.import_module('quizbank.migrations.0004_question_search').backfill_search_index
+        expected = self.search(query='二叉树遍历').json()
+        QuestionSearchDocument.objects.all().delete()
+        QuestionSearchTerm.objects.all().delete()
+        # 回填只用到schema_editor.connection
+        backfill(apps, mock.Mock(connection=connection))
+        self.assertEqual(self.search(query='二叉树遍历').json(), expected)
+
+
+class CourseCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        create_questions(self.course, 3)
+        self.url = f'/api/teach_admin/courses/{self.course.id}/questions/'
+
+    def test_repeat_read_is_cached(self):
+        self.client.get(self.url)
+        # 命中缓存时只剩课程存在性检查
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get(self.url).json()), 3)
+
+    def test_write_invalidates(self):
+        self.client.get(self.url)
+        self.commit(lambda: create_questions(self.course, 1))
+        self.assertEqual(len(self.client.get(self.url).json()), 4)
+
+    def test_objective_delete_invalidates(self):
+        url = f'/api/teach_admin/question/{self.course.id}/support-objectives/'
+        objective = self.client.get(url).json()[0]
+        self.commit(lambda: self.client.delete(f'{url}{objective["id"]}/'))
+        self.assertEqual(self.client.get(url).json(), [])
+
+    def test_other_course_unaffected(self):
+        other = Course.objects.create(name='其他课程')
+        self.client.get(self.url)
+        self.commit(lambda: create_questions(other, 1))
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        self.assertGreater(self.client.get('/api/teach_admin/cache-stats/').json()['hits'], 0)
+
+
+class QuestionImportTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        QuestionType.objects.create(type_code='SC', description='单选题')
+        self.category = Category.objects.create(course=self.course, name='知识点', is_knowledge_point=True)
+        self.objective = SupportObjective.objects.create(course=self.course, name='目标')
+        self.url = f'/api/teach_admin/courses/{self.course.id}/questions/import/'
+
+    def upload(self, name, content):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def row(self, **overrides):
+        row = {
+            'question_type': 'SC', 'summary': '导入题', 'content_markdown': '内容', 'answer_markdown': 'A',
+            'answer_json': {'answer': 'A'}, 'explanation_markdown': '解析',
+            'categories': [self.category.id], 'support_objectives': [self.objective.id],
+        }
+        row.update(overrides)
+        return json.dumps(row, ensure_ascii=False)
+
+    def test_unreadable_file(self):
+        header = 'question_type,summary,content_markdown,answer_markdown,answer_json,explanation_markdown\n'
+        gbk = SimpleUploadedFile('bank.csv', (header + 'SC,导入题,内容,A,{},解析\n').encode('gbk'))
+        self.assertEqual(self.client.post(self.url, {'file': gbk}, format='multipart').status_code, 400)
+        # 超过csv模块字段长度上限
+        response = self.upload('bank.csv', header + 'SC,' + 'x' * 200000 + ',内容,A,{},解析\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CSV格式错误', response.json()['error'])
+        self.assertFalse(Question.objects.filter(course=self.course).exists())
+
+    def test_jsonl_with_row_errors(self):
+        lines = [self.row(), self.row(question_type='XX'), '{broken', self.row(categories=[999999])]
+        response = self.upload('bank.jsonl', '\n'.join(lines))
+        body = response.json()
+        self.assertEqual(body['created'], 1)
+        self.assertEqual([error['line'] for error in body['errors']], [2, 3, 4])
+        question = Question.objects.get(course=self.course)
+        self.assertEqual(list(question.categories.all()), [self.category])
+        self.assertTrue(question.search_document.document)
+
+    def test_blank_text_rejected_like_serializer(self):
+        lines = [self.row(content_markdown='  '), self.row(answer_markdown=''), self.row(explanation_markdown=None)]
+        body = self.upload('bank.jsonl', '\n'.join(lines)).json()
+        self.assertEqual(body['created'], 0)
+        self.assertEqual([list(error['errors']) for error in body['errors']],
+                         [['content_markdown'], ['answer_markdown'], ['explanation_markdown']])
+
+    def test_csv_import_is_constant_queries(self):
+        header = 'question_type,summary,content_markdown,answer_markdown,answer_json,explanation_markdown,categories,support_objectives\n'
+        line = f'SC,题,内容,A,"{{""a"": 1}}",解析,{self.category.id},{self.objective.id}\n'
+        with CaptureQueriesContext(connection) as small:
+            self.upload('bank.csv', header + line * 2)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.upload('bank.csv', header + line * 50).json()['created'], 50)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(Question.objects.get(pk=Question.objects.last().pk).answer_json, {'a': 1})
+
+
+class CourseExportTests(ApiTestCase):
+    def test_archive_contents(self):
+        questions = create_questions(self.course, 3)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with open(os.path.join(media_root, 'diagram.png'), 'wb') as image:
+                image.write(b'png-bytes')
+            questions[0].content_markdown = '![图](/media/diagram.png) ![外部](/media/../secret.txt)'
+            questions[0].save()
+            response = self.client.get(f'/api/teach_admin/courses/{self.course.id}/export/')
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            ['categories.jsonl', 'course.json', 'media/diagram.png', 'questions.jsonl', 'support_objectives.jsonl']
+        )
+        rows = [json.loads(line) for line in archive.read('questions.jsonl').decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [q.id for q in questions])
+        self.assertEqual(rows[0]['question_type'], 'SC')
+        self.assertEqual(archive.read('media/diagram.png'), b'png-bytes')
+
+
+class CategoryMoveTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nodes = [Category.objects.create(course=self.course, name=f'章{i}', order=i + 1) for i in range(4)]
+        self.url = f'/api/teach_admin/courses/{self.course.id}/tree-update/'
+
+    def names(self):
+        return [row['name'] for row in self.client.get(f'/api/teach_admin/courses/{self.course.id}/category/').json()]
+
+    def move(self, dragged, drop, position):
+        return self.commit(lambda: self.client.post(
+            self.url, {'draggedId': dragged.id, 'dropId': drop.id, 'type': position}, format='json'
+        ))
+
+    def test_move_writes_only_moved_node(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.move(self.nodes[3], self.nodes[0], 'after')
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.names(), ['章0', '章3', '章1', '章2'])
+
+    def test_renumbers_when_gap_exhausted(self):
+        for _ in range(60):
+            self.move(self.nodes[3], self.nodes[1], 'before')
+            self.move(self.nodes[2], self.nodes[3], 'before')
+        self.assertEqual(self.names(), ['章0', '章2', '章3', '章1'])
+
+    def test_batch_is_atomic(self):
+        batch_url = self.url + 'batch/'
+        moves = [
+            {'draggedId': self.nodes[0].id, 'dropId': self.nodes[3].id, 'type': 'after'},
+            {'draggedId': self.nodes[1].id, 'dropId': self.nodes[1].id, 'type': 'inner'},
+        ]
+        response = self.client.post(batch_url, {'moves': moves}, format='json')
+        self.assertEqual((response.status_code, response.json()['index']), (400, 1))
+        self.assertEqual(self.names(), ['章0', '章1', '章2', '章3'])
+        response = self.commit(lambda: self.client.post(batch_url, {'moves': moves[:1]}, format='json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(), ['章1', '章2', '章3', '章0'])
+
+
+class ImageUploadTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, name, content):
+        return self.client.post('/api/teach_admin/upload_image/', {'image': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def png(self, width):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, width // 2)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_identical_content_stored_once(self):
+        with mock.patch('quizbank.views.schedule_thumbnails') as schedule:
+            first = self.upload('a.png', self.png(1200)).json()
+            second = self.upload('b.png', self.png(1200)).json()
+        self.assertEqual(first['url'], second['url'])
+        self.assertEqual((first['deduplicated'], second['deduplicated']), (False, True))
+        self.assertEqual(schedule.call_count, 1)
+        stored = [name for _, _, names in os.walk(os.path.join(self.media_root, 'images')) for name in names]
+        self.assertEqual(len(stored), 1)
+
+    def test_rejects_unknown_extension(self):
+        self.assertEqual(self.upload('a.exe', b'x').status_code, 400)
+
+    def test_thumbnails(self):
+        with mock.patch('quizbank.views.schedule_thumbnails'):
+            body = self.upload('wide.png', self.png(1200)).json()
+        make_thumbnails(body['url'][len('/media/'):])
+        with Image.open(os.path.join(self.media_root, body['thumbnails']['320'][len('/media/'):])) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 160))
+
+    def test_only_generated_thumbnails_listed(self):
+        with mock.patch('quizbank.views.schedule_thumbnails') as schedule:
+            narrow = self.upload('narrow.png', self.png(500)).json()
+            self.assertEqual(list(narrow['thumbnails']), ['320'])
+            svg = self.upload('icon.svg', b'<svg xmlns="http://www.w3.org/2000/svg"/>').json()
+            self.assertEqual(svg['thumbnails'], {})
+        self.assertEqual(schedule.call_count, 1)
+        make_thumbnails(svg['url'][len('/media/'):])
+        # 重复上传时只列出已经生成的缩略图
+        self.assertEqual(self.upload('again.png', self.png(500)).json()['thumbnails'], {})
+        make_thumbnails(narrow['url'][len('/media/'):])
+        self.assertEqual(self.upload('again.png', self.png(500)).json()['thumbnails'], narrow['thumbnails'])
+        for url in narrow['thumbnails'].values():
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, url[len('/media/'):])))
+        with mock.patch('quizbank.views.schedule_thumbnails', return_value=False):
+            self.assertEqual(self.upload('busy.png', self.png(1000)).json()['thumbnails'], {})
+
+    def test_question_images_linked(self):
+        question = create_questions(self.course, 1)[0]
+        question.content_markdown = '![a](/media/images/a.png)'
+        question.answer_markdown = '![b](/media/images/b.png)'
+        question.save()
+        self.assertEqual(set(question.images.values_list('image_url', flat=True)), {'/media/images/a.png', '/media/images/b.png'})
+        question.answer_markdown = ''
+        question.save()
+        self.assertEqual(list(question.images.values_list('image_url', flat=True)), ['/media/images/a.png'])
+
+
+class MediaCollectorTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, relative_path, age):
+        path = os.path.join(self.media_root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'12345')
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def test_collects_only_old_unreferenced_files(self):
+        day = 24 * 60 * 60
+        used = self.write('images/aa/bb/used.png', 2 * day)
+        used_thumbnail = self.write('images/aa/bb/used_320.png', 2 * day)
+        linked = self.write('legacy/linked.png', 2 * day)
+        orphan = self.write('images/cc/dd/orphan.png', 2 * day)
+        fresh = self.write('images/cc/dd/fresh.png', 60)
+        question = create_questions(self.course, 1)[0]
+        question.content_markdown = '![](/media/images/aa/bb/used.png)'
+        question.save()
+        QuestionImage.objects.create(question=question, image_url='/media/legacy/linked.png')
+
+        self.assertEqual(collect_orphaned_media(grace_period=day, batch_size=1), {'files': 1, 'bytes': 5})
+        self.assertEqual(
+            [os.path.exists(path) for path in (used, used_thumbnail, linked, orphan, fresh)],
+            [True, True, True, False, True]
+        )
+
+    def test_reupload_restarts_grace_period(self):
+        day = 24 * 60 * 60
+        with mock.patch('quizbank.views.schedule_thumbnails'):
+            url = self.client.post('/api/teach_admin/upload_image/', {'image': SimpleUploadedFile('a.png', b'same')},
+                                   format='multipart').json()['url']
+            path = os.path.join(self.media_root, url[len('/media/'):])
+            os.utime(path, (time.time() - 2 * day, time.time() - 2 * day))
+            self.client.post('/api/teach_admin/upload_image/', {'image': SimpleUploadedFile('b.png', b'same')}, format='multipart')
+        self.assertEqual(collect_orphaned_media(grace_period=day)['files'], 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_question_delete_keeps_shared_images(self):
+        shared = self.write('images/aa/bb/shared.png', 0)
+        first, second = create_questions(self.course, 2)
+        for question in (first, second):
+            question.content_markdown = '![](/media/images/aa/bb/shared.png)'
+            question.save()
+        self.client.delete(f'/api/teach_admin/question/{first.id}/delete')
+        self.assertTrue(os.path.exists(shared))
+
+
+# 只读副本路由：需要在测试设置中配置名为replica的第二个数据库（如另一个SQLite文件，见README）
+# 两个库的数据互不同步，从返回的数据即可看出查询发往了哪个库
+@skipUnless('replica' in settings.DATABASES, '未配置replica数据库')
+@override_settings(READ_REPLICA_ALIAS='replica')
+class ReadReplicaRoutingTests(ApiTestCase):
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        Course.objects.using('replica').create(id=self.course.id, name='副本课程')
+
+    def course_names(self):
+        return [course['name'] for course in self.client.get('/api/teach_admin/courses/').data]
+
+    def test_reads_use_replica(self):
+        self.assertEqual(self.course_names(), ['副本课程'])
+        with override_settings(READ_REPLICA_ALIAS=None):
+            self.assertEqual(self.course_names(), ['课程'])
+
+    def test_read_your_writes(self):
+        response = self.client.post('/api/teach_admin/courses/', {'name': '新课程', 'description': '简介'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.course_names(), ['课程', '新课程'])
+        # 标记过期后重新读副本
+        caches['default'].clear()
+        self.assertEqual(self.course_names(), ['副本课程'])
+
+    def test_cached_payload_built_from_primary(self):
+        create_questions(self.course, 2)
+        url = f'/api/teach_admin/courses/{self.course.id}/questions/'
+        self.assertEqual(len(self.client.get(url).data), 2)
+        self.assertEqual(self.client.get(url, {'page_size': 10}).data['results'], [])
@@ -2,18 +2,51 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status,serializers
-from .serializers import CourseSerializer,CategorySerializer,QuestionSerializer,SupportObjectiveSerializer
+from rest_framework.parsers import MultiPartParser
+from .serializers import CourseSerializer,CategorySerializer,QuestionSerializer,SupportObjectiveSerializer,build_category_tree,CATEGORY_TREE_FIELDS
 from .models import Course,Category,Question,SupportObjective,QuestionImage
-from drf_spectacular.utils import extend_schema,inline_serializer,OpenApiResponse
-from django.db.models import F,Max
+from drf_spectacular.utils import extend_schema,inline_serializer,OpenApiResponse,OpenApiParameter
+from django.db.models import Max
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.core.files.storage import FileSystemStorage
 from django.http import JsonResponse
-from .func import remove_markdown_images
+from .func import parse_page_params,keyset_paginate,offset_paginate,stream_json_array,streaming_response
+from .search import search_questions
+from .exporter import stream_course_archive
+from .media import store_image,schedule_thumbnails,media_url,thumbnail_path,thumbnail_widths,ImageRejected
+from .importer import import_questions,guess_format,ImportFileError,SUPPORTED_FORMATS
+from .cache import cached_course_payload,stats as cache_stats
+from djanki.replica import ReplicaReadMixin
+
+# 试题列表的分页、流式输出参数
+QUESTION_LIST_PARAMETERS = [
+    OpenApiParameter('cursor', int, description='游标分页：上一页返回的next_cursor'),
+    OpenApiParameter('page_size', int, description='游标分页：每页数量，默认50，最大500'),
+    OpenApiParameter('stream', bool, description='为1时以流式JSON数组返回全部结果'),
+]
+
+# 试题列表按需分页或流式输出；未请求分页或流式时返回None，由调用方返回完整列表
+# ranked为True时保持查询集已有的相关度排序，按偏移分页
+def paged_question_response(request, questions, ranked=False):
+    params = request.query_params
+    if params.get('stream') in ('1', 'true'):
+        rows = stream_json_array(questions if ranked else questions.order_by('id'), QuestionSerializer)
+        return streaming_response(request, rows, content_type='application/json')
+    if 'cursor' in params or 'page_size' in params:
+        try:
+            cursor, page_size = parse_page_params(params)
+        except ValueError:
+            return Response({'error': '分页参数错误'}, status=status.HTTP_400_BAD_REQUEST)
+        paginate = offset_paginate if ranked else keyset_paginate
+        page, next_cursor = paginate(questions, cursor, page_size)
+        return Response({
+            'results': QuestionSerializer(page, many=True).data,
+            'next_cursor': next_cursor
+        })
+    return None
 
 # 课程列表、添加
-class CourseView(APIView):
+class CourseView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
@@ -99,6 +132,25 @@ class CourseDetailView(APIView):
         except Course.DoesNotExist:
             return Response({'error': '课程未找到'}, status=status.HTTP_404_NOT_FOUND)
 
+# 导出课程
+class CourseExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['课程管理'],
+        summary='导出课程',
+        description='以zip流式导出课程：course.json、categories.jsonl、support_objectives.jsonl、questions.jsonl，以及试题Markdown中引用的media/文件。',
+        responses={
+            (200, 'application/zip'): OpenApiResponse(description='课程压缩包'),
+            404: OpenApiResponse(description='课程未找到'),
+        }
+    )
+    def get(self, request, pk):
+        course = get_object_or_404(Course, pk=pk)
+        response = streaming_response(request, stream_course_archive(course), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="course-{course.id}.zip"'
+        return response
+
 # 知识点
 class CourseCategoryView(APIView):
     permission_classes = [IsAuthenticated]
@@ -117,10 +169,10 @@ class CourseCategoryView(APIView):
         except Course.DoesNotExist:
             return Response({'error': '课程未找到'}, status=status.HTTP_404_NOT_FOUND)
 
-        # 获取该课程下所有顶层知识点或分类（没有父知识点的知识点）
-        categories = Category.objects.filter(course=course, parent__isnull=True)
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        # 一次查询取出该课程下的全部知识点，在内存中构建树，结果按课程版本缓存
+        def build():
+            return build_category_tree(Category.objects.filter(course=course).values(*CATEGORY_TREE_FIELDS))
+        return Response(cached_course_payload(course.id, 'category-tree', build))
 
     # 添加知识点
     @extend_schema(
@@ -169,17 +221,8 @@ class CourseCategoryDetailView(APIView):
         except Category.DoesNotExist:
             return Response({'error': '知识点未找到'}, status=status.HTTP_404_NOT_FOUND)
         
-        parent_id = category.parent_id  # 获取被删除知识点的父知识点ID
-        category_order = category.order  # 获取被删除知识点的顺序
-        category.delete()  # 删除知识点
-
-        # 重新排序：对同一父级下，顺序在被删除知识点之后的所有知识点，其order值递减1
-        if category.parent_id is None:
-        # 对同一课程下的顶层知识点重新排序
-            Category.objects.filter(course_id=course_id, parent__isnull=True, order__gt=category_order).update(order=F('order') - 1)
-        else:
-            # 对同一父级下，顺序在被删除知识点之后的所有知识点，其order值递减1
-            Category.objects.filter(parent_id=category.parent_id, order__gt=category_order).update(order=F('order') - 1)
+        # 排序值允许有间隔，删除后无需调整兄弟节点的order
+        category.delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
     # 修改知识点
@@ -208,66 +251,86 @@ class CourseCategoryDetailView(APIView):
 class UpdateCategoryTreeView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @extend_schema(
+        tags=['知识点'],
+        summary="拖拽知识点",
+        request=inline_serializer(
+            name='CategoryMoveRequest',
+            fields={
+                'draggedId': serializers.IntegerField(),
+                'dropId': serializers.IntegerField(),
+                'type': serializers.ChoiceField(choices=['before', 'after', 'inner']),
+            }
+        ),
+        description="把知识点移动到目标知识点之前、之后或内部末尾，只更新被拖拽的知识点。"
+    )
     def post(self, request, course_id):
         with transaction.atomic():  # 使用事务确保整个操作的原子性
-            # 验证传入的ID对应的实体是否存在
-            dragged_node = get_object_or_404(Category, id=request.data.get('draggedId'), course_id=course_id)
-            drop_node = get_object_or_404(Category, id=request.data.get('dropId'), course_id=course_id)
-            course = get_object_or_404(Course, id=course_id)
-
-            drop_type = request.data.get('type')
-
-            # 确定新的parent和order
-            if drop_type == 'inner':
-                new_parent = drop_node
-                new_order = Category.objects.filter(parent=new_parent,course=course).count() + 1  # 最后的位置
-            else:
-                new_parent = drop_node.parent
-                if drop_type == 'before':
-                    new_order = drop_node.order
-                elif drop_type == 'after':
-                    new_order = drop_node.order + 1
-
-            # 更新被拖拽节点及其子节点的order
-            if dragged_node.parent == new_parent:
-                # 同一个父节点
-                Category.objects.filter(parent=new_parent, course=course, order__gte=new_order).exclude(id=dragged_node.id).update(order=F('order') + 1)
-            else:
-                # 不同的父节点
-                Category.objects.filter(parent=dragged_node.parent, course=course, order__gt=dragged_node.order).update(order=F('order') - 1)
-                Category.objects.filter(parent=new_parent, course=course, order__gte=new_order).update(order=F('order') + 1)
-
-            # 更新拖拽节点
-            dragged_node.parent = new_parent
-            dragged_node.order = new_order
-            dragged_node.save()
-
-            # 重新排序所有影响的节点以保证order的连续性
-            self.reorder_siblings(new_parent, course)
-            if dragged_node.parent != new_parent:
-                self.reorder_siblings(dragged_node.parent, course)
-
+            error = move_category(course_id, request.data)
+            if error is not None:
+                return error
         return Response({"message": "Node reordered successfully"})
 
-    def reorder_siblings(self, parent, course):
-        siblings = Category.objects.filter(parent=parent, course=course).order_by('order')
-        for index, sibling in enumerate(siblings):
-            sibling.order = index + 1  # 重新分配order，从1开始
-            sibling.save()
-        
+# 批量拖拽知识点
+class BatchUpdateCategoryTreeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['知识点'],
+        summary="批量拖拽知识点",
+        request=inline_serializer(
+            name='CategoryBatchMoveRequest',
+            fields={'moves': serializers.ListField(child=serializers.DictField())}
+        ),
+        description="按顺序执行moves中的每个移动（格式同tree-update），全部成功才提交；任一失败则全部回滚并返回出错的序号。"
+    )
+    def post(self, request, course_id):
+        moves = request.data.get('moves')
+        if not isinstance(moves, list):
+            return Response({'error': '请提供moves列表'}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            for index, move in enumerate(moves):
+                error = move_category(course_id, move)
+                if error is not None:
+                    transaction.set_rollback(True)
+                    error.data['index'] = index
+                    return error
+        return Response({"message": "Nodes reordered successfully", "count": len(moves)})
+
+# 执行一次拖拽，成功返回None，失败返回错误响应
+def move_category(course_id, move):
+    if not isinstance(move, dict):
+        return Response({'error': '移动参数格式错误'}, status=status.HTTP_400_BAD_REQUEST)
+    dragged_id, drop_id = _as_id(move.get('draggedId')), _as_id(move.get('dropId'))
+    nodes = Category.objects.filter(course_id=course_id).in_bulk([dragged_id, drop_id])
+    dragged_node, drop_node = nodes.get(dragged_id), nodes.get(drop_id)
+    if dragged_node is None or drop_node is None:
+        return Response({'error': '知识点未找到'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        dragged_node.move_to(drop_node, move.get('type'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 # 试题创建
-class QuestionCreateView(APIView):
+class QuestionCreateView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
         tags=['试题'],
         summary="根据课程ID获取试题",
         responses={200: QuestionSerializer(many=True)},
-        description="返回指定课程中所有试题的列表。",
+        description="返回指定课程中所有试题的列表。提供cursor或page_size时按id游标分页，stream=1时流式返回。",
         parameters=[{
             'name': 'course_id',
             'description': '课程的ID'
-        }]
+        }] + QUESTION_LIST_PARAMETERS
     )
     def get(self, request, course_id):
         try:
@@ -275,9 +338,14 @@ class QuestionCreateView(APIView):
         except Course.DoesNotExist:
             return Response({'error': '课程未找到'}, status=status.HTTP_404_NOT_FOUND)
         
-        questions = Question.objects.filter(course=course)
-        serializer = QuestionSerializer(questions, many=True)
-        return Response(serializer.data)
+        questions = QuestionSerializer.setup_eager_loading(Question.objects.filter(course=course))
+        response = paged_question_response(request, questions)
+        if response is not None:
+            return response
+        # 完整列表按课程版本缓存
+        def build():
+            return QuestionSerializer(questions, many=True).data
+        return Response(cached_course_payload(course.id, 'questions', build))
 
     @extend_schema(
         tags=['试题'],
@@ -306,16 +374,83 @@ class QuestionCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# 批量导入试题
+class QuestionImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        tags=['试题'],
+        summary="批量导入试题",
+        description=(
+            "上传JSON Lines或CSV文件为课程批量导入试题。每行包含question_type（题型代码或ID）、summary、"
+            "content_markdown、answer_markdown、answer_json、explanation_markdown、categories、support_objectives，"
+            "CSV中answer_json为JSON字符串，知识点和支撑目标ID用分号分隔。校验失败的行不导入，并在errors中返回。"
+        ),
+        request={
+            'multipart/form-data': inline_serializer(
+                name='QuestionImportRequest',
+                fields={
+                    'file': serializers.FileField(),
+                    'format': serializers.ChoiceField(choices=SUPPORTED_FORMATS, required=False),
+                }
+            )
+        },
+        responses={
+            200: inline_serializer(
+                name='QuestionImportResponse',
+                fields={
+                    'created': serializers.IntegerField(),
+                    'errors': serializers.ListField(child=serializers.DictField()),
+                }
+            ),
+            400: OpenApiResponse(description='缺少文件、格式不支持、不是UTF-8编码或CSV格式错误'),
+            404: OpenApiResponse(description='课程未找到'),
+        },
+    )
+    def post(self, request, course_id):
+        course = get_object_or_404(Course, pk=course_id)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': '请上传试题文件'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or guess_format(upload.name)
+        if file_format not in SUPPORTED_FORMATS:
+            return Response({'error': '仅支持jsonl或csv格式'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            created, errors = import_questions(course, upload, file_format)
+        except ImportFileError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': created, 'errors': errors}, status=status.HTTP_200_OK)
+
 # 上传图片    
 class UploadImageView(APIView):
 
+    @extend_schema(
+        tags=['试题'],
+        summary="上传图片",
+        description="图片按内容SHA-256存储，相同内容只保存一份；比原图窄的位图缩略图在后台生成，thumbnails只列出会生成的宽度，地址可能稍后才可用；svg不生成缩略图。",
+        request={'multipart/form-data': inline_serializer(name='UploadImageRequest', fields={'image': serializers.ImageField()})},
+    )
     def post(self, request):
-        image_file = request.FILES['image']
-        fs = FileSystemStorage()
-        filename = fs.save(image_file.name, image_file)
-        uploaded_file_url = fs.url(filename)
-        return JsonResponse({'message': '图片上传成功', 'url': uploaded_file_url})    
-    
+        image_file = request.FILES.get('image')
+        if image_file is None:
+            return JsonResponse({'error': '请上传图片'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            relative_path, existed = store_image(image_file)
+        except ImageRejected as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # 只返回会存在的缩略图：重复上传时为已生成的，新上传时为已安排生成的（队列已满时没有）
+        widths = thumbnail_widths(relative_path, existing=existed)
+        if not existed and widths and not schedule_thumbnails(relative_path):
+            widths = []
+        return JsonResponse({
+            'message': '图片上传成功',
+            'url': media_url(relative_path),
+            'deduplicated': existed,
+            'thumbnails': {width: media_url(thumbnail_path(relative_path, width)) for width in widths},
+        })
+
 # 课程支撑
 class CourseSupportObjectivesView(APIView):
     permission_classes = [IsAuthenticated]
@@ -332,9 +467,10 @@ class CourseSupportObjectivesView(APIView):
         except Course.DoesNotExist:
             return Response({'error': '课程未找到'}, status=status.HTTP_404_NOT_FOUND)
 
-        support_objectives = SupportObjective.objects.filter(course=course).order_by('order')
-        serializer = SupportObjectiveSerializer(support_objectives, many=True)
-        return Response(serializer.data)
+        def build():
+            support_objectives = SupportObjective.objects.filter(course=course).order_by('order')
+            return SupportObjectiveSerializer(support_objectives, many=True).data
+        return Response(cached_course_payload(course.id, 'support-objectives', build))
 
     @extend_schema(
         tags=['支撑目标'],
@@ -405,21 +541,26 @@ class QuestionDeleteView(APIView):
     def delete(self, request, question_id):
         try:
             question = Question.objects.get(pk=question_id)
-            # 删除content_markdown, answer_markdown, explanation_markdown中的图片
-            remove_markdown_images(question.content_markdown)
-            remove_markdown_images(question.answer_markdown)
-            remove_markdown_images(question.explanation_markdown)
-            
-            # 删除问题本身
+            # 图片可能被其他试题共用，由collect_media命令在后台回收未被引用的图片
             question.delete()
             return Response({'message': '删除成功'}, status=status.HTTP_204_NO_CONTENT)
         except Question.DoesNotExist:
             return Response({'error': '没找到该试题'}, status=status.HTTP_404_NOT_FOUND)
         
 # 根据内容搜索试题
-class SearchQuestionsView(APIView):
+class SearchQuestionsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
+    @extend_schema(
+        tags=['试题'],
+        summary="根据内容搜索试题",
+        description="在试题简介、内容、答案和解析中搜索，结果按相关度排序。提供cursor或page_size时分页返回。",
+        parameters=[
+            OpenApiParameter('query', str, required=True, description='搜索内容'),
+            OpenApiParameter('course_id', int, description='只搜索指定课程'),
+            OpenApiParameter('type', str, description='只搜索指定题型，如SC、MC'),
+        ] + QUESTION_LIST_PARAMETERS
+    )
     def get(self, request):
         search_term = request.query_params.get('query')
         if not search_term:
@@ -427,18 +568,48 @@ class SearchQuestionsView(APIView):
                 {'error': '请提供搜索内容'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        # 搜索试题内容、题型等字段
-        matching_questions = Question.objects.filter(
-            content_markdown__icontains=search_term  # 搜索content_markdown中包含的词语
-        )
+        course_id = request.query_params.get('course_id')
+        if course_id is not None and not course_id.isdigit():
+            return Response({'error': '课程ID错误'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 通过搜索索引按相关度检索简介、内容、答案和解析
+        matching_questions = QuestionSerializer.setup_eager_loading(search_questions(
+            search_term,
+            course_id=int(course_id) if course_id else None,
+            type_code=request.query_params.get('type'),
+        ))
+        response = paged_question_response(request, matching_questions, ranked=True)
+        if response is not None:
+            return response
 
         # 返回找到的试题
-        if matching_questions.exists():
-            serializer = QuestionSerializer(matching_questions, many=True)
+        serializer = QuestionSerializer(matching_questions, many=True)
+        if serializer.data:
             return Response(serializer.data, status=status.HTTP_200_OK)
         else:
             return Response(
                 {'message': '没有找到相关试题'},
                 status=status.HTTP_404_NOT_FOUND
-            )       
\ No newline at end of file
+            )
+
+# 课程缓存命中统计
+class CacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['课程管理'],
+        summary="获取课程缓存命中统计",
+        responses={
+            200: inline_serializer(
+                name='CacheStatsResponse',
+                fields={
+                    'hits': serializers.IntegerField(),
+                    'misses': serializers.IntegerField(),
+                    'hit_rate': serializers.FloatField(),
+                }
+            )
+        },
+        description="返回当前进程中课程缓存的命中、未命中次数和命中率。"
+    )
+    def get(self, request):
+        return Response(cache_stats.snapshot())
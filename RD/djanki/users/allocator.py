@@ -0,0 +1,107 @@
+import hashlib
+from quizbank.cache import cached_course_payload, course_version
+from quizbank.models import Category, Question, QuestionType
+from .models import LearningProgress, LearningRecord
+
+ORDER_MODES = [mode for mode, _ in LearningProgress.ORDER_CHOICES]
+# 随机种子保存在IntegerField中
+SEED_MIN, SEED_MAX = -2 ** 31, 2 ** 31 - 1
+# 没有知识点或题型未知的试题排在最后
+UNRANKED = 1 << 30
+TYPE_RANKS = {code: rank for rank, (code, _) in enumerate(QuestionType.TYPE_CHOICES)}
+
+
+def _category_ranks(course_id):
+    # 先序遍历知识点树，得到每个知识点在树中的显示位置
+    children = {}
+    for category_id, parent_id in Category.objects.filter(course_id=course_id).values_list('id', 'parent_id'):
+        children.setdefault(parent_id, []).append(category_id)
+    ranks, stack = {}, list(reversed(children.get(None, [])))
+    while stack:
+        category_id = stack.pop()
+        ranks[category_id] = len(ranks)
+        stack.extend(reversed(children.get(category_id, [])))
+    return ranks
+
+# 解析查询参数中的随机种子，不是整数或超出范围时抛出ValueError
+def parse_seed(value):
+    seed = int(value)
+    if not SEED_MIN <= seed <= SEED_MAX:
+        raise ValueError(f'seed超出范围：{seed}')
+    return seed
+
+def _random_rank(seed, question_id):
+    digest = hashlib.blake2b(f'{seed}:{question_id}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+# 课程试题按指定顺序排列的排序键列表，每个键的最后一项为试题id；按课程版本缓存
+def question_order(course_id, mode, seed=0):
+    def build():
+        questions = Question.objects.filter(course_id=course_id)
+        if mode == 'category':
+            ranks = _category_ranks(course_id)
+            best = {}
+            through = Question.categories.through.objects.filter(question__course_id=course_id)
+            for question_id, category_id in through.values_list('question_id', 'category_id'):
+                best[question_id] = min(best.get(question_id, UNRANKED), ranks.get(category_id, UNRANKED))
+            keys = [(best.get(question_id, UNRANKED), question_id) for question_id in questions.values_list('id', flat=True)]
+        elif mode == 'type':
+            rows = questions.values_list('question_type__type_code', 'id')
+            keys = [(TYPE_RANKS.get(type_code, UNRANKED), question_id) for type_code, question_id in rows]
+        elif mode == 'random':
+            keys = [(_random_rank(seed, question_id), question_id) for question_id in questions.values_list('id', flat=True)]
+        else:
+            keys = [(question_id,) for question_id in questions.values_list('id', flat=True)]
+        return sorted(keys)
+    return cached_course_payload(course_id, f'question-order:{mode}:{seed}', build)
+
+
+def _learned(user, question_ids):
+    return set(LearningRecord.objects.filter(user=user, question_id__in=question_ids).values_list('question_id', flat=True))
+
+# 已学习前缀的长度：课程变化后试题可能插入或移动到任意位置，用一次查询取出该课程已学习的全部试题重新计算
+def _learned_prefix(user, course_id, order):
+    learned = set(LearningRecord.objects.filter(user=user, course_id=course_id).values_list('question_id', flat=True))
+    for position, key in enumerate(order):
+        if key[-1] not in learned:
+            return position
+    return len(order)
+
+# 分配最多count道未学习的新题，返回按顺序排列的试题id
+# 进度记录已学习前缀的长度和当时的课程版本号；版本号不变时只检查前缀之后的少量试题，耗时与已学习数量无关，
+# 版本号变化（增删试题、修改知识点或题型）后重新计算前缀；进度不变时不写数据库，读请求仍可使用只读副本
+def allocate_new_questions(user, course_id, count, mode='id', seed=0):
+    progress = LearningProgress.objects.filter(user=user, course_id=course_id).first() or LearningProgress(user=user, course_id=course_id)
+    saved = (progress.order_mode, progress.seed, progress.version, progress.position)
+    if (progress.order_mode, progress.seed) != (mode, seed):
+        progress.order_mode, progress.seed, progress.version = mode, seed, None
+
+    # 先读版本号再读顺序：两者之间版本号变化时记录的是旧版本号，下次会重新计算
+    version = course_version(course_id)
+    order = question_order(course_id, mode, seed)
+    if progress.version != version:
+        progress.version, progress.position = version, _learned_prefix(user, course_id, order)
+
+    unseen, position, chunk_size = [], progress.position, max(count * 2, 50)
+    advancing = True
+    while len(unseen) < count and position < len(order):
+        chunk = order[position:position + chunk_size]
+        learned = _learned(user, [key[-1] for key in chunk])
+        for offset, key in enumerate(chunk):
+            if key[-1] in learned:
+                # 连续已学习的前缀直接跳过，下次从其后开始
+                if advancing:
+                    progress.position = position + offset + 1
+                continue
+            advancing = False
+            unseen.append(key[-1])
+            if len(unseen) >= count:
+                break
+        position += chunk_size
+
+    if progress.pk is None:
+        # 同一用户并发的首次请求可能已创建进度；进度只用于加速，保留先写入的即可
+        LearningProgress.objects.bulk_create([progress], ignore_conflicts=True)
+    elif (progress.order_mode, progress.seed, progress.version, progress.position) != saved:
+        progress.save(update_fields=['order_mode', 'seed', 'version', 'position'])
+    return unseen
@@ -0,0 +1,116 @@
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from quizbank.models import Course, Question
+from quizbank.serializers import QuestionSerializer
+from .allocator import ORDER_MODES, SEED_MAX, SEED_MIN, allocate_new_questions, parse_seed
+from .queue import adue_question_ids
+from .scheduler import submit_grades
+
+# 与同步视图行为相同的异步版本，部署在ASGI下时慢速连接不占用工作线程
+# Django 4.2的事务还不能在异步上下文中使用，评分和新题分配整体放到线程里执行，其余查询使用异步ORM
+
+
+def json_response(data, status=200):
+    # 与DRF的JSONRenderer一致：中文不转义，日期等类型用DRF的编码器
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder, json_dumps_params={'ensure_ascii': False})
+
+def error_response(exc):
+    return json_response({'detail': exc.detail}, status=exc.status_code)
+
+async def _serialize_questions(question_ids):
+    queryset = QuestionSerializer.setup_eager_loading(Question.objects.filter(id__in=question_ids))
+    questions = {question.id: question async for question in queryset}
+    # 预取完成后序列化只读内存中的数据
+    return QuestionSerializer([questions[i] for i in question_ids if i in questions], many=True).data
+
+
+# 异步视图基类：使用REST_FRAMEWORK配置的认证类认证，要求已登录；JWT认证不依赖Cookie，免CSRF校验
+class AsyncAPIView(View):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await sync_to_async(self.authenticate)(request)
+        except exceptions.APIException as exc:
+            return self.authentication_error(request, exc)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def authentication_error(self, request, exc):
+        # 与DRF的APIView相同：401附带第一个认证类的WWW-Authenticate，认证类不提供时改为403
+        classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        header = classes[0]().authenticate_header(request) if classes else None
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)) and not header:
+            exc.status_code = 403
+        response = error_response(exc)
+        if response.status_code == 401:
+            response['WWW-Authenticate'] = header
+        return response
+
+    def authenticate(self, request):
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            result = authentication_class().authenticate(request)
+            if result is not None:
+                return result[0]
+        raise exceptions.NotAuthenticated()
+
+
+# 获取已学习的试题（异步）
+class AsyncStartReviewView(AsyncAPIView):
+    async def get(self, request, course_id):
+        today = timezone.now().date()
+        question_num = int(request.GET.get('question_num', 5))
+        if not await Course.objects.filter(id=course_id).aexists():
+            return error_response(exceptions.NotFound())
+
+        question_ids = await adue_question_ids(request.user, course_id, question_num, today)
+        data = await _serialize_questions(question_ids)
+        if data:
+            return json_response(data)
+        return json_response({"message": "今天暂时无需要复习的试题！"})
+
+
+# 获取未学习的试题（异步）
+class AsyncStartLearningView(AsyncAPIView):
+    async def get(self, request, course_id):
+        question_num = int(request.GET.get('question_num', 5))
+        if not await Course.objects.filter(id=course_id).aexists():
+            return error_response(exceptions.NotFound())
+        order_mode = request.GET.get('order', 'id')
+        if order_mode not in ORDER_MODES:
+            return json_response({'error': f'order必须是{"、".join(ORDER_MODES)}之一'}, status=400)
+        try:
+            seed = parse_seed(request.GET.get('seed', 0)) if order_mode == 'random' else 0
+        except ValueError:
+            return json_response({'error': f'seed必须是{SEED_MIN}到{SEED_MAX}之间的整数'}, status=400)
+
+        question_ids = await sync_to_async(allocate_new_questions)(request.user, course_id, question_num, order_mode, seed)
+        data = await _serialize_questions(question_ids)
+        if data:
+            return json_response(data)
+        return json_response({"message": "暂无要学习试题！"})
+
+
+# 更新学习记录（异步）
+class AsyncBulkUpdateOrCreateLearningRecordsView(AsyncAPIView):
+    async def post(self, request):
+        try:
+            updates = json.loads(request.body or b'{}').get('updates', [])
+        except (ValueError, AttributeError):
+            return error_response(exceptions.ParseError())
+        if not isinstance(updates, list):
+            return json_response({'errors': [{'error': 'updates必须是列表'}]}, status=400)
+        response_data, errors = await sync_to_async(submit_grades)(request.user, updates)
+
+        if errors:
+            return json_response({'errors': errors}, status=400)
+        return json_response(response_data)
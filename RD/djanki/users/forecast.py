@@ -0,0 +1,56 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from .models import LearningRecord
+from .spread import peak_to_mean
+
+# 最多预测的天数，缓存中按此范围一次算好所有课程
+MAX_FORECAST_DAYS = 365
+FORECAST_TIMEOUT = 24 * 60 * 60
+
+
+def _forecast_key(user_id, today):
+    return f'users:forecast:{user_id}:{today.isoformat()}'
+
+# 一次分组聚合得到用户各课程在预测范围内每天到期的数量，今天之前到期的合并为overdue
+# 返回{course_id: {'overdue': n, 'days': {偏移天数: n}}}
+def _due_counts(user, today):
+    rows = (
+        LearningRecord.objects.filter(user=user, next_review_date__lt=today + timedelta(days=MAX_FORECAST_DAYS))
+        .order_by().values_list('course_id', 'next_review_date').annotate(due=Count('id'))
+    )
+    counts = defaultdict(lambda: {'overdue': 0, 'days': {}})
+    for course_id, due_date, due in rows:
+        offset = (due_date - today).days
+        if offset < 0:
+            counts[course_id]['overdue'] += due
+        else:
+            counts[course_id]['days'][offset] = due
+    return dict(counts)
+
+# 未来days天每天到期的复习数量及其峰均比，course_id为None时汇总所有课程；结果按用户每天缓存，评分后失效
+def review_forecast(user, days, course_id=None, today=None):
+    today = today or timezone.now().date()
+    key = _forecast_key(user.pk, today)
+    counts = cache.get(key)
+    if counts is None:
+        counts = _due_counts(user, today)
+        cache.set(key, counts, FORECAST_TIMEOUT)
+
+    selected = [counts.get(course_id)] if course_id is not None else list(counts.values())
+    selected = [course for course in selected if course]
+    forecast = [
+        {'date': today + timedelta(days=offset), 'due': sum(course['days'].get(offset, 0) for course in selected)}
+        for offset in range(days)
+    ]
+    return {
+        'overdue': sum(course['overdue'] for course in selected),
+        'peak_to_mean': peak_to_mean([day['due'] for day in forecast]),
+        'forecast': forecast,
+    }
+
+def invalidate_forecast(user, today=None):
+    today = today or timezone.now().date()
+    cache.delete(_forecast_key(user.pk, today))
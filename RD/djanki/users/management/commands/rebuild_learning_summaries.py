@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from login.models import User
+from users.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = '从学习记录重新计算学习汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='只重建指定用户的汇总')
+        parser.add_argument('--course', type=int, help='只重建指定课程的汇总')
+
+    def handle(self, *args, **options):
+        user = User.objects.get(pk=options['user']) if options['user'] else None
+        course_ids = [options['course']] if options['course'] else None
+        total = rebuild_summaries(user, course_ids)
+        self.stdout.write(self.style.SUCCESS(f'已重建 {total} 条学习汇总'))
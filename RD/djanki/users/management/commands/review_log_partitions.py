@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from users.reviewlog import ensure_partitions, prune_review_log
+
+
+class Command(BaseCommand):
+    help = '维护评分日志：创建未来几个月的分区，并清理过期日志'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help='提前创建的月分区数，默认3')
+        parser.add_argument('--retain-months', type=int, help='保留最近几个月的日志，不指定则不清理')
+
+    def handle(self, *args, **options):
+        created = ensure_partitions(options['months_ahead'])
+        self.stdout.write(f'新建分区：{", ".join(created) or "无"}')
+        if options['retain_months'] is not None:
+            pruned = prune_review_log(options['retain_months'])
+            self.stdout.write(f'已清理：{pruned}')
+        self.stdout.write(self.style.SUCCESS('评分日志维护完成'))
@@ -0,0 +1,55 @@
+import json
+import numpy as np
+from django.core.management.base import BaseCommand
+from users.simulation import benchmark_engines, simulate
+
+
+class Command(BaseCommand):
+    help = '离线模拟N个用户×M道题×D天的SM-2复习负载，并测量评分引擎吞吐'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='用户数，默认1000')
+        parser.add_argument('--questions', type=int, default=200, help='每个用户的题目数，默认200')
+        parser.add_argument('--days', type=int, default=365, help='模拟天数，默认365')
+        parser.add_argument('--new-per-day', type=int, default=10, help='每人每天学习的新题数，默认10')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子')
+        parser.add_argument('--spread-tolerance', type=float, default=0,
+                            help='按SM2_SPREAD_TOLERANCE的规则分散到期日期，默认0不分散')
+        parser.add_argument('--spread-max-days', type=int, default=7, help='分散窗口的最大天数，默认7')
+        parser.add_argument('--json', help='把每天的曲线写入该JSON文件')
+        parser.add_argument('--engine-bench', type=int, default=0, metavar='GRADES',
+                            help='在数据库上用GRADES条评分测量两种评分引擎（事务回滚，不留数据）')
+
+    def handle(self, *args, **options):
+        users, days = options['users'], options['days']
+        result = simulate(
+            users, options['questions'], days, options['new_per_day'], options['seed'],
+            tolerance=options['spread_tolerance'], max_days=options['spread_max_days'],
+        )
+        reviews, mastered = result['reviews'], result['mastered']
+
+        self.stdout.write(f'{"周":>4} {"人均日复习":>10} {"人均日新学":>10} {"答对率":>8} {"人均已掌握":>10}')
+        for start in range(0, days, 7):
+            week = slice(start, min(start + 7, days))
+            graded = reviews[week].sum() + result['new'][week].sum()
+            self.stdout.write(
+                f'{start // 7 + 1:>4} {reviews[week].mean() / users:>10.2f} {result["new"][week].mean() / users:>10.2f} '
+                f'{result["correct"][week].sum() / max(graded, 1):>8.1%} {mastered[week.stop - 1] / users:>10.1f}'
+            )
+        peak = int(np.argmax(reviews))
+        self.stdout.write(f'复习高峰：第{peak + 1}天，人均{reviews[peak] / users:.1f}题；'
+                          f'总复习量峰均比{result["peak_to_mean"]:.2f}，单个用户每周峰均比{result["user_peak_to_mean"]:.2f}')
+        self.stdout.write(f'SM-2向量化计算：{result["grades"]}次评分，{result["grades_per_second"]:,.0f}次/秒')
+
+        if options['engine_bench']:
+            for name, rate in benchmark_engines(options['engine_bench']).items():
+                self.stdout.write(f'{name}引擎（数据库）：{rate:,.0f}次评分/秒')
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    **{name: result[name].tolist() for name in ('reviews', 'new', 'correct', 'mastered')},
+                    'peak_to_mean': result['peak_to_mean'],
+                    'user_peak_to_mean': result['user_peak_to_mean'],
+                    'grades_per_second': result['grades_per_second'],
+                }, f)
+        self.stdout.write(self.style.SUCCESS('模拟完成'))
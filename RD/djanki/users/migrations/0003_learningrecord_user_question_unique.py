@@ -0,0 +1,29 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:03
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+# 同一用户同一题的重复学习记录只保留最早的一条
+def remove_duplicate_records(apps, schema_editor):
+    LearningRecord = apps.get_model('users', 'LearningRecord')
+    duplicates = LearningRecord.objects.values('user_id', 'question_id').annotate(
+        count=Count('id'), keep=Min('id')
+    ).filter(count__gt=1)
+    for row in duplicates:
+        LearningRecord.objects.filter(user_id=row['user_id'], question_id=row['question_id']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_delete_courselearningstatus'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='learningrecord',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='users_learningrecord_user_question_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_learningrecord_user_question_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='learningrecord',
+            index=models.Index(fields=['user', 'course', 'next_review_date'], name='users_learn_due_queue_idx'),
+        ),
+    ]
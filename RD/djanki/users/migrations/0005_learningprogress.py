@@ -0,0 +1,33 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizbank', '0004_question_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0004_learningrecord_due_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_mode', models.CharField(choices=[('id', '添加顺序'), ('category', '知识点顺序'), ('type', '题型'), ('random', '随机')], default='id', max_length=10, verbose_name='出题顺序')),
+                ('seed', models.IntegerField(default=0, verbose_name='随机种子')),
+                ('version', models.BigIntegerField(blank=True, null=True, verbose_name='计算position时的课程版本号')),
+                ('position', models.PositiveIntegerField(default=0, verbose_name='已学习前缀在试题顺序中的长度')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizbank.course', verbose_name='所属课程')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='learningprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='users_learningprogress_user_course_uniq'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import RowNumber
+import django.db.models.deletion
+
+
+# 从已有学习记录生成汇总，与users.summary.summary_rows相同：复习次数最多的试题用窗口函数单独查询，不用关联子查询
+def fill_learning_summaries(apps, schema_editor):
+    LearningRecord = apps.get_model('users', 'LearningRecord')
+    LearningSummary = apps.get_model('users', 'LearningSummary')
+    rows = LearningRecord.objects.order_by().values('user', 'course').annotate(
+        learned=models.Count('id'),
+        reviewing=models.Count('id', filter=models.Q(status='reviewing')),
+        mastered=models.Count('id', filter=models.Q(status='mastered')),
+        total_repetitions=models.Sum('repetition'),
+        max_repetition=models.Max('repetition'),
+        first_study_date=models.Min('created_at'),
+        last_review_date=models.Max('last_review_date'),
+        farthest_review_date=models.Max('next_review_date'),
+    )
+    holders = LearningRecord.objects.order_by().annotate(rank=models.Window(
+        RowNumber(), partition_by=[models.F('user'), models.F('course')],
+        order_by=[models.F('repetition').desc(), models.F('question_id').asc()],
+    )).filter(rank=1).values_list('user', 'course', 'question_id')
+    holders = {(user_id, course_id): question_id for user_id, course_id, question_id in holders}
+    summaries = []
+    for row in rows:
+        key = (row.pop('user'), row.pop('course'))
+        summaries.append(LearningSummary(user_id=key[0], course_id=key[1], max_repetition_question_id=holders.get(key), **row))
+    LearningSummary.objects.bulk_create(summaries, batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quizbank', '0004_question_search'),
+        ('users', '0005_learningprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('learned', models.IntegerField(default=0, verbose_name='已学习试题数')),
+                ('reviewing', models.IntegerField(default=0, verbose_name='复习中试题数')),
+                ('mastered', models.IntegerField(default=0, verbose_name='已掌握试题数')),
+                ('total_repetitions', models.IntegerField(default=0, verbose_name='复习总次数')),
+                ('max_repetition', models.IntegerField(default=0, verbose_name='单题最多复习次数')),
+                ('first_study_date', models.DateField(blank=True, null=True, verbose_name='最早学习日期')),
+                ('last_review_date', models.DateField(blank=True, null=True, verbose_name='最近一次复习日期')),
+                ('farthest_review_date', models.DateField(blank=True, null=True, verbose_name='最远一次复习日期')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizbank.course', verbose_name='所属课程')),
+                ('max_repetition_question', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quizbank.question', verbose_name='复习次数最多的试题')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='learningsummary',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='users_learningsummary_user_course_uniq'),
+        ),
+        migrations.RunPython(fill_learning_summaries, migrations.RunPython.noop),
+    ]
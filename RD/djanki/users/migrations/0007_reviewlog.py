@@ -0,0 +1,69 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:11
+
+from datetime import datetime
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def _month_start(moment, offset):
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.get_current_timezone())
+
+# PostgreSQL上把评分日志改建为按reviewed_at的范围分区表：主键需包含分区键，
+# 另建DEFAULT分区兜底，BRIN索引按时间范围查询；同时创建本月及之后3个月的分区，之后由review_log_partitions命令维护
+def partition_review_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TABLE users_reviewlog')
+    schema_editor.execute(
+        'CREATE TABLE users_reviewlog ('
+        'id bigint GENERATED BY DEFAULT AS IDENTITY, '
+        'user_id bigint NOT NULL, '
+        'question_id bigint NOT NULL, '
+        'quality smallint NOT NULL, '
+        'previous_interval integer NOT NULL, '
+        'interval integer NOT NULL, '
+        'previous_ef double precision NOT NULL, '
+        'ef double precision NOT NULL, '
+        'reviewed_at timestamp with time zone NOT NULL, '
+        'PRIMARY KEY (id, reviewed_at)'
+        ') PARTITION BY RANGE (reviewed_at)'
+    )
+    schema_editor.execute('CREATE TABLE users_reviewlog_default PARTITION OF users_reviewlog DEFAULT')
+    schema_editor.execute('CREATE INDEX users_reviewlog_reviewed_brin ON users_reviewlog USING brin (reviewed_at)')
+    now = timezone.now()
+    for offset in range(4):
+        start, end = _month_start(now, offset), _month_start(now, offset + 1)
+        schema_editor.execute(
+            f"CREATE TABLE users_reviewlog_y{start.year}m{start.month:02d} PARTITION OF users_reviewlog "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizbank', '0004_question_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0006_learningsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quality', models.SmallIntegerField(verbose_name='质量评分')),
+                ('previous_interval', models.IntegerField(verbose_name='评分前复习间隔')),
+                ('interval', models.IntegerField(verbose_name='评分后复习间隔')),
+                ('previous_ef', models.FloatField(verbose_name='评分前易度系数')),
+                ('ef', models.FloatField(verbose_name='评分后易度系数')),
+                ('reviewed_at', models.DateTimeField(verbose_name='评分时间')),
+                ('question', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='quizbank.question', verbose_name='题目')),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+        ),
+        migrations.RunPython(partition_review_log, migrations.RunPython.noop),
+    ]
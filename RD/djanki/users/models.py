@@ -32,8 +32,14 @@ class LearningRecord(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['user', 'next_review_date']),
+            # 按课程取到期复习队列：WHERE user=? AND course=? AND next_review_date<=? ORDER BY next_review_date
+            models.Index(fields=['user', 'course', 'next_review_date'], name='users_learn_due_queue_idx'),
             models.Index(fields=['status']),
         ]
+        constraints = [
+            # 每个用户每道题只有一条学习记录，评分可用upsert原子更新
+            models.UniqueConstraint(fields=['user', 'question'], name='users_learningrecord_user_question_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.course.name} - {self.status}"
@@ -77,3 +83,65 @@ class LearningRecord(models.Model):
         self.last_review_date = timezone.now().date()
         self.update_status()
         self.save()
+
+# 新题分配进度：按选定顺序排列课程试题，cursor之前的试题均已学习
+class LearningProgress(models.Model):
+    ORDER_CHOICES = [
+        ('id', '添加顺序'),
+        ('category', '知识点顺序'),
+        ('type', '题型'),
+        ('random', '随机'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="用户")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="所属课程")
+    order_mode = models.CharField(max_length=10, choices=ORDER_CHOICES, default='id', verbose_name="出题顺序")
+    seed = models.IntegerField(default=0, verbose_name="随机种子")
+    version = models.BigIntegerField(null=True, blank=True, verbose_name="计算position时的课程版本号")
+    position = models.PositiveIntegerField(default=0, verbose_name="已学习前缀在试题顺序中的长度")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='users_learningprogress_user_course_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.course.name} - {self.order_mode}"
+
+# 用户在每门课程上的学习汇总，由评分时增量维护，统计接口直接读取
+class LearningSummary(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="用户")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="所属课程")
+    learned = models.IntegerField(default=0, verbose_name="已学习试题数")
+    reviewing = models.IntegerField(default=0, verbose_name="复习中试题数")
+    mastered = models.IntegerField(default=0, verbose_name="已掌握试题数")
+    total_repetitions = models.IntegerField(default=0, verbose_name="复习总次数")
+    max_repetition = models.IntegerField(default=0, verbose_name="单题最多复习次数")
+    max_repetition_question = models.ForeignKey(
+        Question, null=True, blank=True, on_delete=models.SET_NULL, related_name='+', verbose_name="复习次数最多的试题"
+    )
+    first_study_date = models.DateField(null=True, blank=True, verbose_name="最早学习日期")
+    last_review_date = models.DateField(null=True, blank=True, verbose_name="最近一次复习日期")
+    farthest_review_date = models.DateField(null=True, blank=True, verbose_name="最远一次复习日期")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='users_learningsummary_user_course_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.course.name} - {self.learned}"
+
+# 评分日志：每次评分追加一行，只插入不更新
+# 不建外键约束和二级B树索引，写入代价不随表增长；PostgreSQL上按reviewed_at按月分区
+class ReviewLog(models.Model):
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+', verbose_name="用户")
+    question = models.ForeignKey(Question, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+', verbose_name="题目")
+    quality = models.SmallIntegerField(verbose_name="质量评分")
+    previous_interval = models.IntegerField(verbose_name="评分前复习间隔")
+    interval = models.IntegerField(verbose_name="评分后复习间隔")
+    previous_ef = models.FloatField(verbose_name="评分前易度系数")
+    ef = models.FloatField(verbose_name="评分后易度系数")
+    reviewed_at = models.DateTimeField(verbose_name="评分时间")
+
+    def __str__(self):
+        return f"{self.user_id} - {self.question_id} - {self.quality}"
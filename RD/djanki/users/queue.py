@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import LearningRecord
+
+# 每个用户每门课程缓存的到期题目数量上限
+QUEUE_SIZE = 200
+# 缓存保留时间（秒），键中含日期，过了零点自然换成新队列
+QUEUE_TIMEOUT = 24 * 60 * 60
+
+
+def _queue_key(user_id, course_id, today):
+    return f'users:due:{user_id}:{course_id}:{today.isoformat()}'
+
+def queue_enabled():
+    return getattr(settings, 'REVIEW_QUEUE_CACHE', False)
+
+def _due_queryset(user, course_id, today, limit):
+    return (
+        LearningRecord.objects.filter(user=user, course_id=course_id, next_review_date__lte=today)
+        .order_by('next_review_date', 'id').values_list('question_id', flat=True)[:limit]
+    )
+
+def _due_question_ids(user, course_id, today, limit):
+    return list(_due_queryset(user, course_id, today, limit))
+
+# 用户在某课程下最早到期的limit道题的id；开启REVIEW_QUEUE_CACHE时使用按天缓存的队列
+def due_question_ids(user, course_id, limit, today=None):
+    today = today or timezone.now().date()
+    if not queue_enabled() or limit > QUEUE_SIZE:
+        return _due_question_ids(user, course_id, today, limit)
+    key = _queue_key(user.pk, course_id, today)
+    queue = cache.get(key)
+    if queue is None:
+        queue = _due_question_ids(user, course_id, today, QUEUE_SIZE)
+        cache.set(key, queue, QUEUE_TIMEOUT)
+    return queue[:limit]
+
+# due_question_ids的异步版本，供ASGI视图使用
+async def adue_question_ids(user, course_id, limit, today=None):
+    today = today or timezone.now().date()
+    if not queue_enabled() or limit > QUEUE_SIZE:
+        return [question_id async for question_id in _due_queryset(user, course_id, today, limit)]
+    key = _queue_key(user.pk, course_id, today)
+    queue = await cache.aget(key)
+    if queue is None:
+        queue = [question_id async for question_id in _due_queryset(user, course_id, today, QUEUE_SIZE)]
+        await cache.aset(key, queue, QUEUE_TIMEOUT)
+    return queue[:limit]
+
+# 评分后清除相关课程当天的队列
+def invalidate_due_queues(user, course_ids, today=None):
+    if not queue_enabled():
+        return
+    today = today or timezone.now().date()
+    cache.delete_many([_queue_key(user.pk, course_id, today) for course_id in course_ids])
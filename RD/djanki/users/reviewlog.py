@@ -0,0 +1,97 @@
+from datetime import datetime
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import ReviewLog
+
+# 一次INSERT写入的日志行数
+LOG_BATCH_SIZE = 1000
+# 非PostgreSQL数据库清理过期日志时每次删除的行数
+PRUNE_BATCH_SIZE = 5000
+PARTITION_PREFIX = 'users_reviewlog_y'
+
+
+# 收集一次评分请求产生的日志，flush时批量插入；同一请求共用一个评分时间
+class ReviewLogBuffer:
+    def __init__(self, user, reviewed_at=None):
+        self.user = user
+        self.reviewed_at = reviewed_at or timezone.now()
+        self.entries = []
+
+    def add(self, question_id, quality, previous_interval, interval, previous_ef, ef):
+        self.entries.append(ReviewLog(
+            user=self.user, question_id=question_id, quality=quality,
+            previous_interval=previous_interval, interval=interval,
+            previous_ef=previous_ef, ef=ef, reviewed_at=self.reviewed_at,
+        ))
+
+    def flush(self):
+        if self.entries:
+            ReviewLog.objects.bulk_create(self.entries, batch_size=LOG_BATCH_SIZE)
+        self.entries = []
+
+
+def _month_start(moment, offset=0):
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.get_current_timezone())
+
+def partition_name(month):
+    return f'{PARTITION_PREFIX}{month.year}m{month.month:02d}'
+
+# 在PostgreSQL上创建本月及之后months_ahead个月的分区，返回新建的分区名；其他数据库不分区
+# DEFAULT分区中已有该月的日志时不能直接创建分区，先建独立的表，把这些日志移入后再挂载为分区
+def ensure_partitions(months_ahead=3, now=None):
+    if connection.vendor != 'postgresql':
+        return []
+    now = now or timezone.now()
+    created = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'users_reviewlog'::regclass"
+        )
+        existing = {name for name, in cursor.fetchall()}
+        for offset in range(months_ahead + 1):
+            start, end = _month_start(now, offset), _month_start(now, offset + 1)
+            name = partition_name(start)
+            if name in existing:
+                continue
+            with transaction.atomic():
+                cursor.execute(f'CREATE TABLE {name} (LIKE users_reviewlog INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM users_reviewlog_default WHERE reviewed_at >= %s AND reviewed_at < %s RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved',
+                    [start, end],
+                )
+                cursor.execute(
+                    f"ALTER TABLE users_reviewlog ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            created.append(name)
+    return created
+
+# 删除retain_months个月之前的日志：PostgreSQL上整体卸载并删除过期分区，其他数据库分批DELETE
+# 返回删除的分区名或行数
+def prune_review_log(retain_months, now=None):
+    cutoff = _month_start(now or timezone.now(), -retain_months)
+    if connection.vendor != 'postgresql':
+        deleted = 0
+        while True:
+            ids = list(ReviewLog.objects.filter(reviewed_at__lt=cutoff).values_list('id', flat=True)[:PRUNE_BATCH_SIZE])
+            if not ids:
+                return deleted
+            deleted += ReviewLog.objects.filter(id__in=ids).delete()[0]
+
+    dropped = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'users_reviewlog'::regclass AND c.relname LIKE %s",
+            [f'{PARTITION_PREFIX}%'],
+        )
+        for name, in cursor.fetchall():
+            year, month = name[len(PARTITION_PREFIX):].split('m')
+            if datetime(int(year), int(month), 1, tzinfo=cutoff.tzinfo) < cutoff:
+                cursor.execute(f'ALTER TABLE users_reviewlog DETACH PARTITION {name}')
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+    return dropped
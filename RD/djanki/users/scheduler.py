@@ -0,0 +1,255 @@
+from collections import defaultdict
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from quizbank.models import Question
+from .models import LearningRecord
+from .queue import invalidate_due_queues
+from .forecast import invalidate_forecast
+from .reviewlog import ReviewLogBuffer
+from .spread import spread_due_dates
+from .summary import lock_summaries, rebuild_summaries, record_grades
+
+# 新学习记录的初始参数，与LearningRecord字段默认值一致
+DEFAULT_EF = 2.5
+DEFAULT_INTERVAL = 1
+MIN_EF = 1.3
+# 已掌握：最后一次质量评分为5且复习间隔大于该天数
+MASTERED_INTERVAL = 30
+
+
+# SM-2向量化计算，与LearningRecord.update_learning_parameters逐项一致，返回(ef, interval, repetition, mastered)
+def sm2_step(ef, interval, repetition, quality):
+    ef = np.asarray(ef, dtype=np.float64)
+    interval = np.asarray(interval, dtype=np.int64)
+    repetition = np.asarray(repetition, dtype=np.int64)
+    quality = np.asarray(quality, dtype=np.int64)
+
+    failed = quality < 3
+    passed = quality >= 4
+    distance = 5 - quality
+    new_ef = np.where(failed, ef, np.maximum(MIN_EF, ef + (0.1 - distance * (0.08 + distance * 0.02))))
+    grown = np.trunc(new_ef * interval).astype(np.int64)
+    passed_interval = np.where(repetition == 0, 1, np.where(repetition == 1, 6, grown))
+    new_interval = np.where(failed, 1, np.where(passed, passed_interval, interval))
+    new_repetition = np.where(failed, 0, repetition + 1)
+    mastered = (quality == 5) & (new_interval > MASTERED_INTERVAL)
+    return new_ef, new_interval, new_repetition, mastered
+
+
+# 解析并校验评分，返回(有效评分列表, 错误列表)；有效评分为(question_id, quality_score, 原始question_id)
+def _parse_updates(updates):
+    valid, errors = [], []
+    for update in updates:
+        raw_id = update.get('question_id') if isinstance(update, dict) else None
+        try:
+            question_id = int(raw_id)
+            quality_score = int(update.get('quality_score'))
+            if not (0 <= quality_score <= 5):
+                raise ValueError("质量评分必须在0到5之间")
+        except (TypeError, ValueError) as e:
+            errors.append({'question_id': raw_id, 'error': str(e)})
+            continue
+        valid.append((question_id, quality_score, raw_id))
+    return valid, errors
+
+
+# 批量应用评分：两次查询加载试题和学习记录，NumPy计算SM-2，一个事务内批量写入
+# 同一题在一批中出现多次时按顺序依次生效。返回(响应数据, 错误列表)
+# 读取学习记录前先锁住涉及课程的学习汇总，同一用户并发提交的评分批次依次执行，不会基于同一份旧状态计算
+def apply_grades(user, updates, today=None):
+    today = today or timezone.now().date()
+    valid, errors = _parse_updates(updates)
+    question_ids = {question_id for question_id, _, _ in valid}
+    courses = dict(Question.objects.filter(pk__in=question_ids).values_list('id', 'course_id'))
+
+    with transaction.atomic():
+        summaries = lock_summaries(user, sorted(set(courses.values())))
+        records = {}
+        for record in LearningRecord.objects.select_for_update().filter(user=user, question_id__in=courses).order_by('-id'):
+            # 同一题有多条记录时使用最早的一条
+            records[record.question_id] = record
+
+        # 评分前的状态，用于增量更新学习汇总
+        before = {
+            record.question_id: (record.status, record.repetition, record.next_review_date) for record in records.values()
+        }
+        grades, response_data = [], []
+        for question_id, quality_score, raw_id in valid:
+            if question_id not in courses:
+                errors.append({'question_id': raw_id, 'error': 'Question matching query does not exist.'})
+                continue
+            created = question_id not in records
+            if created:
+                records[question_id] = LearningRecord(
+                    user=user, question_id=question_id, course_id=courses[question_id],
+                    ef=DEFAULT_EF, interval=DEFAULT_INTERVAL, repetition=0,
+                    next_review_date=today, last_review_date=today,
+                )
+            grades.append((records[question_id], quality_score))
+            response_data.append({'question_id': raw_id, 'message': 'Updated successfully', 'created': created})
+
+        # 按同一题出现的次数分轮，每轮内各题互不相同，可以整体向量化
+        rounds = defaultdict(list)
+        seen = defaultdict(int)
+        for record, quality_score in grades:
+            rounds[seen[id(record)]].append((record, quality_score))
+            seen[id(record)] += 1
+        log = ReviewLogBuffer(user)
+        for index in sorted(rounds):
+            _apply_round(rounds[index], today, log)
+
+        touched = list({id(record): record for record, _ in grades}.values())
+        spread_due_dates(user, touched, today)
+        LearningRecord.objects.bulk_create([record for record in touched if record.pk is None])
+        LearningRecord.objects.bulk_update(
+            [record for record in touched if record.pk is not None],
+            ['ef', 'interval', 'repetition', 'last_quality', 'next_review_date', 'last_review_date', 'status'],
+            batch_size=500,
+        )
+        record_grades(user, [(before.get(record.question_id), record) for record in touched], today, summaries)
+        log.flush()
+    invalidate_due_queues(user, {record.course_id for record in touched}, today)
+    invalidate_forecast(user, today)
+    return response_data, errors
+
+def _apply_round(grades, today, log):
+    records = [record for record, _ in grades]
+    ef, interval, repetition, mastered = sm2_step(
+        [record.ef for record in records],
+        [record.interval for record in records],
+        [record.repetition for record in records],
+        [quality_score for _, quality_score in grades],
+    )
+    for i, (record, quality_score) in enumerate(grades):
+        log.add(record.question_id, quality_score, record.interval, int(interval[i]), record.ef, float(ef[i]))
+        record.ef = float(ef[i])
+        record.interval = int(interval[i])
+        record.repetition = int(repetition[i])
+        record.last_quality = quality_score
+        record.next_review_date = today + timedelta(days=record.interval)
+        record.last_review_date = today
+        record.status = 'mastered' if mastered[i] else 'reviewing'
+
+
+# 以下为数据库内的SM-2更新：每次评分一条INSERT ... ON CONFLICT DO UPDATE ... RETURNING，
+# 评分相关的分支在Python中确定，与记录相关的计算写成SQL表达式，不跨往返持有行锁
+
+def _float_literal(value):
+    # repr保证解析回同一个双精度数
+    if connection.vendor == 'postgresql':
+        return f'CAST({value!r} AS DOUBLE PRECISION)'
+    return repr(value)
+
+def _floor_int(expression):
+    # 参数为正数，截断与int()一致
+    if connection.vendor == 'postgresql':
+        return f'CAST(FLOOR({expression}) AS INTEGER)'
+    return f'CAST({expression} AS INTEGER)'
+
+def _add_days(date_expression, days_expression):
+    if connection.vendor == 'postgresql':
+        return f'({date_expression} + {days_expression})'
+    return f"date({date_expression}, '+' || ({days_expression}) || ' days')"
+
+# 生成某个评分对应的upsert语句，表达式与LearningRecord.update_learning_parameters逐项对应
+def _upsert_sql(quality_score):
+    qn = connection.ops.quote_name
+    table = qn(LearningRecord._meta.db_table)
+    ef, interval, repetition = f'{table}.{qn("ef")}', f'{table}.{qn("interval")}', f'{table}.{qn("repetition")}'
+
+    if quality_score < 3:
+        new_ef, new_interval, new_repetition = ef, '1', '0'
+    else:
+        delta = 0.1 - (5 - quality_score) * (0.08 + (5 - quality_score) * 0.02)
+        min_ef = _float_literal(MIN_EF)
+        new_ef = f'(CASE WHEN {ef} + {_float_literal(delta)} < {min_ef} THEN {min_ef} ELSE {ef} + {_float_literal(delta)} END)'
+        new_repetition = f'{repetition} + 1'
+        if quality_score < 4:
+            new_interval = interval
+        else:
+            new_interval = (
+                f'(CASE WHEN {repetition} = 0 THEN 1 WHEN {repetition} = 1 THEN 6 '
+                f'ELSE {_floor_int(f"{new_ef} * {interval}")} END)'
+            )
+    if quality_score == 5:
+        new_status = f"(CASE WHEN {new_interval} > {MASTERED_INTERVAL} THEN 'mastered' ELSE 'reviewing' END)"
+    else:
+        new_status = "'reviewing'"
+
+    columns = [
+        'user_id', 'question_id', 'course_id', 'ef', 'interval', 'repetition', 'last_quality',
+        'status', 'created_at', 'next_review_date', 'last_review_date',
+    ]
+    assignments = {
+        'ef': new_ef,
+        'interval': new_interval,
+        'repetition': new_repetition,
+        'last_quality': str(quality_score),
+        'status': new_status,
+        'next_review_date': _add_days(f'EXCLUDED.{qn("last_review_date")}', new_interval),
+        'last_review_date': f'EXCLUDED.{qn("last_review_date")}',
+    }
+    return (
+        f'INSERT INTO {table} ({", ".join(qn(column) for column in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({qn("user_id")}, {qn("question_id")}) DO UPDATE SET '
+        + ', '.join(f'{qn(column)} = {expression}' for column, expression in assignments.items())
+        + f' RETURNING {qn("question_id")}, {qn("ef")}, {qn("interval")}, {qn("repetition")}, {qn("status")}, {qn("next_review_date")}'
+    )
+
+# 逐条以原子upsert应用评分，并发提交同一题时不会丢失更新；返回值与apply_grades相同
+def apply_grades_atomic(user, updates, today=None):
+    today = today or timezone.now().date()
+    valid, errors = _parse_updates(updates)
+    question_ids = {question_id for question_id, _, _ in valid}
+    courses = dict(Question.objects.filter(pk__in=question_ids).values_list('id', 'course_id'))
+    # 用于响应中的created标记和日志中评分前的参数；同一题被并发评分时日志里的评分前参数可能略旧
+    existing = {
+        question_id: (ef, interval) for question_id, ef, interval
+        in LearningRecord.objects.filter(user=user, question_id__in=courses).values_list('question_id', 'ef', 'interval')
+    }
+    log = ReviewLogBuffer(user)
+
+    response_data = []
+    adapt = connection.ops.adapt_datefield_value
+    with connection.cursor() as cursor:
+        for question_id, quality_score, raw_id in valid:
+            if question_id not in courses:
+                errors.append({'question_id': raw_id, 'error': 'Question matching query does not exist.'})
+                continue
+            # 新记录的插入值：以默认参数计算一次SM-2
+            ef, interval, repetition, mastered = sm2_step([DEFAULT_EF], [DEFAULT_INTERVAL], [0], [quality_score])
+            cursor.execute(_upsert_sql(quality_score), [
+                user.pk, question_id, courses[question_id], float(ef[0]), int(interval[0]), int(repetition[0]),
+                quality_score, 'mastered' if mastered[0] else 'reviewing', adapt(today),
+                adapt(today + timedelta(days=int(interval[0]))), adapt(today),
+            ])
+            _, new_ef, new_interval, _, _, _ = cursor.fetchone()
+            previous_ef, previous_interval = existing.get(question_id, (DEFAULT_EF, DEFAULT_INTERVAL))
+            log.add(question_id, quality_score, previous_interval, new_interval, previous_ef, new_ef)
+            response_data.append({
+                'question_id': raw_id, 'message': 'Updated successfully', 'created': question_id not in existing
+            })
+            existing[question_id] = (new_ef, new_interval)
+    log.flush()
+    course_ids = {courses[question_id] for question_id, _, _ in valid if question_id in courses}
+    # 原子引擎拿不到评分前的状态，按课程重新聚合汇总
+    if course_ids:
+        rebuild_summaries(user, course_ids)
+    invalidate_due_queues(user, course_ids, today)
+    invalidate_forecast(user, today)
+    return response_data, errors
+
+
+# 按settings.SM2_ENGINE选择批量引擎（batch）或原子引擎（atomic）；
+# 批量写入与并发提交冲突时事务整体回滚，改用原子引擎重新应用
+def submit_grades(user, updates):
+    if getattr(settings, 'SM2_ENGINE', 'batch') == 'atomic':
+        return apply_grades_atomic(user, updates)
+    try:
+        return apply_grades(user, updates)
+    except IntegrityError:
+        return apply_grades_atomic(user, updates)
@@ -0,0 +1,24 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from quizbank.models import Course, Question
+from .summary import forget_question, rebuild_summaries
+
+
+def _deleting_course(origin):
+    return isinstance(origin, Course) or (isinstance(origin, QuerySet) and origin.model is Course)
+
+
+# 删除试题会级联删除学习记录：删除前从学习者的汇总中减去这些记录，删除后只重新聚合最值受影响的用户
+# 删除整门课程时汇总随课程级联删除，不需要处理
+@receiver(pre_delete, sender=Question)
+def subtract_question_from_summaries(sender, instance, origin=None, **kwargs):
+    if not _deleting_course(origin):
+        instance._stale_summary_users = forget_question(instance)
+
+
+@receiver(post_delete, sender=Question)
+def rebuild_stale_summaries(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_stale_summary_users', None)
+    if user_ids:
+        rebuild_summaries(user_ids=user_ids, course_ids=[instance.course_id])
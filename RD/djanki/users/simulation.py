@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from django.db import transaction
+from login.models import User
+from quizbank.models import Course, Question, QuestionType
+from .scheduler import DEFAULT_EF, DEFAULT_INTERVAL, apply_grades, apply_grades_atomic, sm2_step
+from .spread import peak_to_mean, spread_window
+
+# 合成回忆模型：回忆概率 p = exp(-间隔天数 / 记忆稳定度)
+# 稳定度初值 = BASE_STABILITY × 用户能力 × 试题容易度（均为对数正态），
+# 答对后稳定度按GROWTH放大，答错后按LAPSE缩小
+BASE_STABILITY = 2.0
+GROWTH = 2.2
+LAPSE = 0.3
+# 第一次学习新题时答对的概率
+FIRST_RECALL = 0.7
+# 统计单个用户负载峰均比的分段天数
+LOAD_WINDOW = 7
+
+
+# 模拟users个用户、每人questions道题、days天的学习过程，每人每天学习new_per_day道新题，
+# 并复习所有到期的题；评分经sm2_step计算，与LearningRecord.update_learning_parameters一致
+# tolerance大于0时按users.spread的规则分散到期日期（max_days为窗口上限）
+# 返回每天的复习量、新学量、答对率、已掌握数量曲线，复习量的峰均比以及SM-2计算吞吐
+def simulate(users, questions, days, new_per_day=10, seed=0, spread=0.5, tolerance=0, max_days=7):
+    rng = np.random.default_rng(seed)
+    size = users * questions
+    ef = np.full(size, DEFAULT_EF)
+    interval = np.full(size, DEFAULT_INTERVAL, dtype=np.int64)
+    repetition = np.zeros(size, dtype=np.int64)
+    mastered = np.zeros(size, dtype=bool)
+    # -1表示尚未学习
+    next_day = np.full(size, -1, dtype=np.int32)
+    last_day = np.zeros(size, dtype=np.int32)
+    # 每个用户每天实际复习的数量；分散时还要记录每个用户今后每天已排定的到期数量
+    user_reviews = np.zeros((users, days), dtype=np.int32)
+    scheduled = np.zeros((users, days), dtype=np.int32) if tolerance else None
+    ability = rng.lognormal(0, spread, users)
+    easiness = rng.lognormal(0, spread, questions)
+    stability = (BASE_STABILITY * np.outer(ability, easiness)).ravel()
+
+    curves = {name: np.zeros(days, dtype=np.int64) for name in ('reviews', 'new', 'correct', 'mastered')}
+    step_seconds = 0.0
+    for day in range(days):
+        first = day * new_per_day
+        new = np.empty(0, dtype=np.int64)
+        if first < questions:
+            columns = np.arange(first, min(first + new_per_day, questions))
+            new = (np.arange(users)[:, None] * questions + columns).ravel()
+        due = np.flatnonzero(next_day == day)
+        cards = np.concatenate([due, new])
+        if cards.size:
+            elapsed = np.concatenate([day - last_day[due], np.ones(new.size, dtype=np.int32)])
+            memory = stability[cards]
+            recall = np.exp(-elapsed / memory)
+            recall[due.size:] = FIRST_RECALL
+            correct = rng.random(cards.size) < recall
+            # 答对时回忆概率越高评分越高(3~5)，答错时评分为0~2
+            quality = np.where(
+                correct,
+                3 + (rng.random(cards.size) < recall) + (rng.random(cards.size) < recall),
+                rng.integers(0, 3, cards.size),
+            )
+
+            started = time.perf_counter()
+            new_ef, new_interval, new_repetition, new_mastered = sm2_step(
+                ef[cards], interval[cards], repetition[cards], quality
+            )
+            step_seconds += time.perf_counter() - started
+
+            ef[cards], interval[cards], repetition[cards], mastered[cards] = new_ef, new_interval, new_repetition, new_mastered
+            stability[cards] = np.where(correct, np.maximum(memory, elapsed) * GROWTH, np.maximum(1.0, memory * LAPSE))
+            last_day[cards] = day
+            if scheduled is None:
+                next_day[cards] = day + new_interval
+            else:
+                next_day[cards] = _spread(cards // questions, day + new_interval, spread_window(new_interval, tolerance, max_days), scheduled, day)
+            curves['correct'][day] = correct.sum()
+        curves['reviews'][day] = due.size
+        user_reviews[:, day] = np.bincount(due // questions, minlength=users)
+        curves['new'][day] = new.size
+        curves['mastered'][day] = mastered.sum()
+
+    grades = int(curves['reviews'].sum() + curves['new'].sum())
+    # 把每个用户的每天复习量按LOAD_WINDOW天分段，取各段峰均比的平均值，衡量短期内的负载尖峰
+    weeks = user_reviews[:, :days // LOAD_WINDOW * LOAD_WINDOW].reshape(users, -1, LOAD_WINDOW)
+    weekly_mean = weeks.mean(axis=2)
+    busy = weekly_mean > 0
+    return {
+        **curves,
+        'peak_to_mean': peak_to_mean(curves['reviews']),
+        'user_peak_to_mean': float((weeks.max(axis=2)[busy] / weekly_mean[busy]).mean()) if busy.any() else 0.0,
+        'grades': grades,
+        'step_seconds': step_seconds,
+        'grades_per_second': grades / step_seconds if step_seconds else 0.0,
+    }
+
+# 向量化的到期日分散，规则与spread.pick_offset相同：窗口内选该用户已排定数量最少的一天，
+# 相同时选离原到期日最近的、再选较早的。同一用户当天的多张卡片分轮依次放置，每轮每个用户一张
+def _spread(owners, ideal, window, scheduled, day):
+    horizon = scheduled.shape[1]
+    chosen = ideal.copy()
+    fixed = window <= 0
+    inside = fixed & (ideal < horizon)
+    np.add.at(scheduled, (owners[inside], ideal[inside]), 1)
+    movable = np.flatnonzero(~fixed)
+    if not movable.size:
+        return chosen
+
+    order = movable[np.argsort(owners[movable], kind='stable')]
+    sorted_owners = owners[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_owners)) + 1]
+    rank = np.arange(order.size) - np.repeat(starts, np.diff(np.r_[starts, order.size]))
+    order = order[np.argsort(rank, kind='stable')]
+    bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+
+    widest = int(window[movable].max())
+    offsets = np.arange(-widest, widest + 1)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        cards = order[start:end]
+        candidates = ideal[cards, None] + offsets
+        valid = (np.abs(offsets) <= window[cards, None]) & (candidates > day)
+        load = np.where(
+            candidates < horizon, scheduled[owners[cards, None], np.clip(candidates, 0, horizon - 1)], 0
+        )
+        score = np.where(valid, load * (4 * widest + 4) + 2 * np.abs(offsets) + (offsets > 0), np.iinfo(np.int64).max)
+        picked = candidates[np.arange(cards.size), score.argmin(axis=1)]
+        chosen[cards] = picked
+        inside = picked < horizon
+        scheduled[owners[cards][inside], picked[inside]] += 1
+    return chosen
+
+
+# 在数据库上测量两种评分引擎的吞吐：临时用户和课程在一个事务里创建，测完整体回滚
+# 每次提交batch_size条评分，共grades条，返回{引擎名: 每秒评分数}
+def benchmark_engines(grades=2000, batch_size=50, questions=200, seed=0):
+    rng = np.random.default_rng(seed)
+    results = {}
+    with transaction.atomic():
+        question_type = QuestionType.objects.get_or_create(type_code='SC', defaults={'description': '单选题'})[0]
+        course = Course.objects.create(name='评分引擎基准')
+        created = Question.objects.bulk_create([
+            Question(question_type=question_type, course=course, summary=f'题目{i}', content_markdown='',
+                     answer_markdown='', answer_json={}, explanation_markdown='')
+            for i in range(questions)
+        ])
+        question_ids = [question.id for question in created]
+        for name, engine in (('batch', apply_grades), ('atomic', apply_grades_atomic)):
+            user = User(username=f'sm2-benchmark-{name}')
+            user.set_unusable_password()
+            user.save()
+            batches = [
+                [{'question_id': question_ids[i], 'quality_score': int(q)}
+                 for i, q in zip(rng.integers(0, questions, batch_size), rng.integers(0, 6, batch_size))]
+                for _ in range(max(1, grades // batch_size))
+            ]
+            started = time.perf_counter()
+            for updates in batches:
+                engine(user, updates)
+            results[name] = len(batches) * batch_size / (time.perf_counter() - started)
+        transaction.set_rollback(True)
+    return results
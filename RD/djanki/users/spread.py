@@ -0,0 +1,59 @@
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from .models import LearningRecord
+
+# 分散到期日期：在SM-2给出的到期日附近±window天内，选该用户到期数量最少的一天
+# window = min(复习间隔 × SM2_SPREAD_TOLERANCE, SM2_SPREAD_MAX_DAYS)，只移动next_review_date，
+# interval、EF等SM-2参数不变；最早不早于明天。容差为0时关闭
+
+
+def spread_settings():
+    return getattr(settings, 'SM2_SPREAD_TOLERANCE', 0), getattr(settings, 'SM2_SPREAD_MAX_DAYS', 7)
+
+def spread_window(interval, tolerance, max_days):
+    return np.minimum(np.floor(np.asarray(interval) * tolerance).astype(np.int64), max_days)
+
+# 在窗口内选到期数量最少的偏移天数，数量相同时选离原到期日最近的、再选较早的
+def pick_offset(interval, window, load):
+    candidates = range(max(1, interval - window), interval + window + 1)
+    return min(candidates, key=lambda offset: (load.get(offset, 0), abs(offset - interval), offset))
+
+# 为一批刚评分的学习记录分散到期日期，直接修改record.next_review_date
+# 用户在候选日期上已有的到期数量由(user, next_review_date)索引一次分组查询得到，
+# 之后每放置一张卡片就在内存里更新，同一批的卡片不会挤到同一天
+def spread_due_dates(user, records, today):
+    tolerance, max_days = spread_settings()
+    if not tolerance or not records:
+        return
+    windows = spread_window([record.interval for record in records], tolerance, max_days)
+    movable = [(record, int(window)) for record, window in zip(records, windows) if window > 0]
+    if not movable:
+        return
+    offsets = {
+        offset for record, window in movable
+        for offset in range(max(1, record.interval - window), record.interval + window + 1)
+    }
+    rows = (
+        LearningRecord.objects.filter(user=user, next_review_date__in=[today + timedelta(days=offset) for offset in offsets])
+        .exclude(question_id__in=[record.question_id for record in records])
+        .order_by().values_list('next_review_date').annotate(due=Count('id'))
+    )
+    load = {(due_date - today).days: due for due_date, due in rows}
+    # 不移动的卡片也占用它们的到期日
+    moving = {id(record) for record, _ in movable}
+    for record in records:
+        if id(record) not in moving:
+            load[record.interval] = load.get(record.interval, 0) + 1
+    for record, window in movable:
+        offset = pick_offset(record.interval, window, load)
+        record.next_review_date = today + timedelta(days=offset)
+        load[offset] = load.get(offset, 0) + 1
+
+
+# 峰均比：每天到期数量的最大值除以平均值，越接近1负载越平
+def peak_to_mean(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    mean = counts.mean() if counts.size else 0.0
+    return float(counts.max() / mean) if mean else 0.0
@@ -0,0 +1,140 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from .models import LearningRecord, LearningSummary
+
+SUMMARY_FIELDS = [
+    'learned', 'reviewing', 'mastered', 'total_repetitions', 'max_repetition', 'max_repetition_question',
+    'first_study_date', 'last_review_date', 'farthest_review_date',
+]
+
+
+# 从学习记录按(用户, 课程)分组重新计算汇总：一条聚合查询，加一条窗口函数查询取每组复习次数最多的试题
+# （相同时取question_id最小的）；放在聚合查询里做关联子查询时，SQLite会对每条记录执行一次子查询
+def summary_rows(records):
+    rows = records.order_by().values('user', 'course').annotate(
+        learned=Count('id'),
+        reviewing=Count('id', filter=Q(status='reviewing')),
+        mastered=Count('id', filter=Q(status='mastered')),
+        total_repetitions=Sum('repetition'),
+        max_repetition=Max('repetition'),
+        first_study_date=Min('created_at'),
+        last_review_date=Max('last_review_date'),
+        farthest_review_date=Max('next_review_date'),
+    )
+    holders = records.order_by().annotate(rank=Window(
+        RowNumber(), partition_by=[F('user'), F('course')], order_by=[F('repetition').desc(), F('question_id').asc()],
+    )).filter(rank=1).values_list('user', 'course', 'question_id')
+    holders = {(user_id, course_id): question_id for user_id, course_id, question_id in holders}
+    return [
+        LearningSummary(
+            user_id=row['user'], course_id=row['course'],
+            max_repetition_question_id=holders.get((row['user'], row['course'])),
+            **{field: row[field] for field in SUMMARY_FIELDS if field != 'max_repetition_question'},
+        )
+        for row in rows
+    ]
+
+# 重建指定用户（user或user_ids）和/或课程的汇总；都不指定时重建全部，返回写入的汇总数
+def rebuild_summaries(user=None, course_ids=None, user_ids=None):
+    records, summaries = LearningRecord.objects.all(), LearningSummary.objects.all()
+    if user is not None:
+        records, summaries = records.filter(user=user), summaries.filter(user=user)
+    if user_ids is not None:
+        records, summaries = records.filter(user_id__in=user_ids), summaries.filter(user_id__in=user_ids)
+    if course_ids is not None:
+        records, summaries = records.filter(course_id__in=course_ids), summaries.filter(course_id__in=course_ids)
+    with transaction.atomic():
+        # 先锁住旧汇总再聚合，并发重建时后一个事务能看到前一个提交的记录
+        list(summaries.select_for_update().values_list('id', flat=True))
+        rows = summary_rows(records)
+        summaries.delete()
+        LearningSummary.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+# 删除试题前从各学习者的汇总中减去该题的学习记录，须在删除试题的事务中调用
+# 返回需要在删除后重新聚合的用户：被删记录恰好是某项最值，或汇总中已没有学习记录
+def forget_question(question):
+    records = LearningRecord.objects.filter(question=question)
+    summaries = {
+        summary.user_id: summary for summary in LearningSummary.objects.select_for_update()
+        .filter(course_id=question.course_id, user__in=records.values('user'))
+    }
+    if not summaries:
+        return []
+    stale = set()
+    rows = records.values_list('user', 'status', 'repetition', 'created_at', 'last_review_date', 'next_review_date')
+    for user_id, status, repetition, created_at, last_review_date, next_review_date in rows:
+        summary = summaries.get(user_id)
+        if summary is None:
+            continue
+        summary.learned -= 1
+        if status in ('reviewing', 'mastered'):
+            setattr(summary, status, getattr(summary, status) - 1)
+        summary.total_repetitions -= repetition
+        if (summary.learned <= 0 or summary.max_repetition_question_id == question.pk
+                or created_at == summary.first_study_date or last_review_date == summary.last_review_date
+                or next_review_date == summary.farthest_review_date):
+            stale.add(user_id)
+    LearningSummary.objects.bulk_update(list(summaries.values()), ['learned', 'reviewing', 'mastered', 'total_repetitions'])
+    return sorted(stale)
+
+# 创建并锁住用户在这些课程上的汇总，须在事务中调用；同一用户同一课程的评分批次由此串行执行
+def lock_summaries(user, course_ids):
+    if not course_ids:
+        return []
+    LearningSummary.objects.bulk_create(
+        [LearningSummary(user=user, course_id=course_id) for course_id in course_ids], ignore_conflicts=True
+    )
+    return list(LearningSummary.objects.select_for_update().filter(user=user, course_id__in=course_ids))
+
+# 评分后按记录的前后状态增量更新汇总，须在写入学习记录的事务中调用
+# changes为(评分前的(status, repetition, next_review_date)或None, 评分后的记录)列表；
+# summaries为已用lock_summaries锁住的汇总，不传时在这里锁
+def record_grades(user, changes, today, summaries=None):
+    by_course = defaultdict(list)
+    for before, record in changes:
+        by_course[record.course_id].append((before, record))
+    if not by_course:
+        return
+    if summaries is None:
+        summaries = lock_summaries(user, list(by_course))
+    summaries = [summary for summary in summaries if summary.course_id in by_course]
+
+    stale = []
+    for summary in summaries:
+        if _apply_changes(summary, by_course[summary.course_id], today):
+            stale.append(summary.course_id)
+    LearningSummary.objects.bulk_update(summaries, SUMMARY_FIELDS)
+    if stale:
+        rebuild_summaries(user, stale)
+
+# 返回True表示最大值所在的记录回退了，需要重新聚合
+def _apply_changes(summary, changes, today):
+    stale = False
+    for before, record in changes:
+        if before is None:
+            summary.learned += 1
+            summary.first_study_date = min(summary.first_study_date or today, today)
+            old_status, old_repetition, old_next = None, 0, None
+        else:
+            old_status, old_repetition, old_next = before
+        for status, step in ((old_status, -1), (record.status, 1)):
+            if status in ('reviewing', 'mastered'):
+                setattr(summary, status, getattr(summary, status) + step)
+        summary.total_repetitions += record.repetition - old_repetition
+        summary.last_review_date = max(summary.last_review_date or record.last_review_date, record.last_review_date)
+
+        if summary.farthest_review_date is None or record.next_review_date > summary.farthest_review_date:
+            summary.farthest_review_date = record.next_review_date
+        elif old_next == summary.farthest_review_date and record.next_review_date < old_next:
+            stale = True
+
+        holder = summary.max_repetition_question_id
+        if holder is None or (record.repetition, -record.question_id) > (summary.max_repetition, -holder):
+            summary.max_repetition, summary.max_repetition_question_id = record.repetition, record.question_id
+        elif holder == record.question_id and record.repetition < old_repetition:
+            stale = True
+    return stale
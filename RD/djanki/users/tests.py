@@ -1,3 +1,513 @@
-from django.test import TestCase
+import random
+import threading
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.db import connection, connections
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from login.models import User
+from quizbank.models import Category, Course
+from quizbank.tests import ApiTestCase, QueryBudgetMixin, create_questions
+from .models import LearningProgress, LearningRecord, LearningSummary, ReviewLog
+from .scheduler import apply_grades, apply_grades_atomic
+from .summary import rebuild_summaries
+from .reviewlog import ReviewLogBuffer, ensure_partitions, partition_name, prune_review_log
+from .simulation import benchmark_engines, simulate
+from .spread import peak_to_mean, pick_offset, spread_due_dates
 
-# Create your tests here.
+
+class LearnListQueryTests(QueryBudgetMixin, ApiTestCase):
+    role = '学生'
+
+    def setUp(self):
+        super().setUp()
+        create_questions(self.course, 2)
+
+    def add_records(self, count):
+        today = timezone.now().date()
+        for question in create_questions(self.course, count):
+            LearningRecord.objects.create(
+                user=self.user, question=question, course=self.course,
+                next_review_date=today, last_review_date=today
+            )
+
+    def test_start_learning(self):
+        url = f'/api/learn/courses/{self.course.id}/question-learn/?question_num=50'
+        # 第一次请求会创建学习进度并缓存试题顺序，之后比较缓存命中时的查询数
+        self.client.get(url)
+        small = self.count_queries(url)
+        self.commit(lambda: create_questions(self.course, 20))
+        self.client.get(url)
+        self.assertEqual(self.count_queries(url), small)
+
+    def test_start_review(self):
+        self.add_records(2)
+        url = f'/api/learn/courses/{self.course.id}/question-review/?question_num=50'
+        self.assertConstantQueries(url, lambda: self.add_records(20))
+
+
+class BatchGradingTests(ApiTestCase):
+    role = '学生'
+    url = '/api/learn/courses/learning-records/'
+
+    def setUp(self):
+        super().setUp()
+        self.questions = create_questions(self.course, 6)
+
+    # 用模型上的逐条实现作为对照
+    def reference(self, grades, today):
+        records = {}
+        with mock.patch('users.models.timezone.now', return_value=timezone.make_aware(datetime.combine(today, datetime.min.time()))):
+            for question_id, quality_score in grades:
+                record = records.setdefault(question_id, LearningRecord(
+                    user=self.user, question_id=question_id, course=self.course,
+                    next_review_date=today, last_review_date=today
+                ))
+                with mock.patch.object(LearningRecord, 'save'):
+                    record.update_learning_parameters(quality_score)
+        return records
+
+    def test_matches_model_sm2(self):
+        rng = random.Random(7)
+        grades = [(rng.choice(self.questions).id, rng.randint(0, 5)) for _ in range(300)]
+        today = timezone.now().date()
+        expected = self.reference(grades, today)
+        response_data, errors = apply_grades(self.user, [{'question_id': q, 'quality_score': s} for q, s in grades], today)
+        self.assertEqual(errors, [])
+        for record in LearningRecord.objects.filter(user=self.user):
+            reference = expected[record.question_id]
+            self.assertEqual(
+                (record.ef, record.interval, record.repetition, record.status, record.next_review_date),
+                (reference.ef, reference.interval, reference.repetition, reference.status, reference.next_review_date)
+            )
+
+    def test_constant_queries(self):
+        updates = [{'question_id': q.id, 'quality_score': 4} for q in self.questions]
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'updates': updates[:2]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_errors_reported(self):
+        response = self.client.post(self.url, {'updates': [
+            {'question_id': self.questions[0].id, 'quality_score': 9},
+            {'question_id': 999999, 'quality_score': 3},
+            {'question_id': self.questions[1].id, 'quality_score': 3},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()['errors']), 2)
+        self.assertTrue(LearningRecord.objects.filter(question=self.questions[1]).exists())
+
+
+# 两个评分批次交错：第一批读取学习记录后暂停，第二批在此期间执行；第二批必须等第一批提交后再读取
+class ConcurrentGradingTests(TransactionTestCase):
+    def setUp(self):
+        # 内存SQLite的共享缓存是表级锁，并发写入立即失败而不是等待
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('需要PostgreSQL或文件SQLite测试库')
+
+    def test_interleaved_batches(self):
+        user = User.objects.create_user(username='student', password='pw', role='学生')
+        question = create_questions(Course.objects.create(name='课程'), 1)[0]
+        updates = [{'question_id': question.id, 'quality_score': 4}]
+        apply_grades(user, updates)
+
+        failures = []
+
+        def grade_in_thread():
+            try:
+                apply_grades(user, updates)
+            except Exception as e:
+                failures.append(e)
+            finally:
+                connections.close_all()
+        second = threading.Thread(target=grade_in_thread)
+
+        def pause(*args):
+            if threading.current_thread() is not second and not second.is_alive():
+                second.start()
+                second.join(timeout=1)
+            return spread_due_dates(*args)
+        with mock.patch('users.scheduler.spread_due_dates', side_effect=pause):
+            apply_grades(user, updates)
+        second.join()
+        self.assertEqual(failures, [])
+
+        record = LearningRecord.objects.get(user=user, question=question)
+        summary = LearningSummary.objects.get(user=user)
+        self.assertEqual((record.repetition, summary.total_repetitions, summary.max_repetition), (3, 3, 3))
+
+
+class AtomicGradingTests(ApiTestCase):
+    role = '学生'
+
+    def test_matches_batch_engine(self):
+        questions = create_questions(self.course, 4)
+        other = User.objects.create_user(username='other', password='pw', role='学生')
+        rng = random.Random(11)
+        updates = [{'question_id': rng.choice(questions).id, 'quality_score': rng.randint(0, 5)} for _ in range(200)]
+        today = timezone.now().date()
+        apply_grades(self.user, updates, today)
+        response_data, errors = apply_grades_atomic(other, updates, today)
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(row['created'] for row in response_data), len({u['question_id'] for u in updates}))
+        fields = ('question_id', 'ef', 'interval', 'repetition', 'last_quality', 'status', 'next_review_date', 'last_review_date')
+        expected = list(LearningRecord.objects.filter(user=self.user).order_by('question_id').values_list(*fields))
+        self.assertEqual(list(LearningRecord.objects.filter(user=other).order_by('question_id').values_list(*fields)), expected)
+
+    @override_settings(SM2_ENGINE='atomic')
+    def test_view_uses_configured_engine(self):
+        question = create_questions(self.course, 1)[0]
+        url = '/api/learn/courses/learning-records/'
+        for _ in range(2):
+            self.client.post(url, {'updates': [{'question_id': question.id, 'quality_score': 5}]}, format='json')
+        self.assertEqual(LearningRecord.objects.get(user=self.user, question=question).interval, 6)
+
+
+@override_settings(REVIEW_QUEUE_CACHE=True)
+class ReviewQueueTests(ApiTestCase):
+    role = '学生'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        today = timezone.now().date()
+        self.questions = create_questions(self.course, 3)
+        for days, question in zip((3, 1, 2), self.questions):
+            LearningRecord.objects.create(
+                user=self.user, question=question, course=self.course,
+                next_review_date=today - timedelta(days=days), last_review_date=today
+            )
+        self.url = f'/api/learn/courses/{self.course.id}/question-review/'
+
+    def review_ids(self):
+        return [row['id'] for row in self.client.get(self.url, {'question_num': 5}).json()]
+
+    def test_due_order_and_invalidation(self):
+        first, second, third = self.questions
+        self.assertEqual(self.review_ids(), [first.id, third.id, second.id])
+        self.client.post('/api/learn/courses/learning-records/', {'updates': [{'question_id': first.id, 'quality_score': 5}]}, format='json')
+        self.assertEqual(self.review_ids(), [third.id, second.id])
+
+
+class NewQuestionAllocatorTests(ApiTestCase):
+    role = '学生'
+
+    def setUp(self):
+        super().setUp()
+        self.questions = create_questions(self.course, 8)
+        self.url = f'/api/learn/courses/{self.course.id}/question-learn/'
+
+    def learn(self, **params):
+        return [row['id'] for row in self.client.get(self.url, {'question_num': 3, **params}).json()]
+
+    def grade(self, question_ids):
+        updates = [{'question_id': question_id, 'quality_score': 4} for question_id in question_ids]
+        self.commit(lambda: self.client.post('/api/learn/courses/learning-records/', {'updates': updates}, format='json'))
+
+    def test_progresses_in_order_and_repeats_ungraded(self):
+        ids = [q.id for q in self.questions]
+        self.assertEqual(self.learn(), ids[:3])
+        self.assertEqual(self.learn(), ids[:3])
+        self.grade(ids[:2])
+        self.assertEqual(self.learn(), ids[2:5])
+
+    def test_new_question_before_cursor_is_found(self):
+        ids = [q.id for q in self.questions]
+        self.grade(ids[:6])
+        self.assertEqual(self.learn(), ids[6:8])
+        self.grade(ids[6:8])
+        late = self.commit(lambda: create_questions(self.course, 1))[0]
+        self.assertEqual(self.learn(order='id'), [late.id])
+
+    def test_unlearned_question_moved_before_prefix_is_found(self):
+        ids = [q.id for q in self.questions]
+        early = Category.objects.create(course=self.course, name='靠前', order=-1)
+        late = Category.objects.create(course=self.course, name='靠后', order=1)
+        for question in self.questions[6:]:
+            self.commit(lambda: question.categories.set([late]))
+        self.grade(ids[:6])
+        self.assertEqual(self.learn(order='category'), ids[6:8])
+        self.commit(lambda: self.questions[7].categories.set([early]))
+        self.assertEqual(self.learn(order='category'), [ids[7], ids[6]])
+
+    def test_queries_independent_of_learned_count(self):
+        self.learn()
+        with CaptureQueriesContext(connection) as few:
+            self.learn()
+        self.grade([q.id for q in self.questions[:2]])
+        self.learn()
+        self.grade([q.id for q in self.questions[2:5]])
+        self.learn()
+        with CaptureQueriesContext(connection) as many:
+            self.learn()
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_unchanged_progress_not_written(self):
+        self.learn()
+        with CaptureQueriesContext(connection) as ctx:
+            self.learn()
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if not q['sql'].startswith('SELECT')])
+        self.grade([q.id for q in self.questions[:2]])
+        with CaptureQueriesContext(connection) as ctx:
+            self.learn()
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in ctx.captured_queries), 1)
+        self.assertEqual(LearningProgress.objects.get(user=self.user, course=self.course).position, 2)
+
+    def test_random_order_is_seeded(self):
+        first = self.learn(order='random', seed=1)
+        self.assertEqual(self.learn(order='random', seed=1), first)
+        self.assertEqual(self.client.get(self.url, {'order': 'bogus'}).status_code, 400)
+        for seed in ('x', '1.5', 2 ** 31):
+            self.assertEqual(self.client.get(self.url, {'order': 'random', 'seed': seed}).status_code, 400)
+
+
+class LearningSummaryTests(ApiTestCase):
+    role = '学生'
+    url = '/api/learn/courses/learning-records/'
+
+    def setUp(self):
+        super().setUp()
+        self.questions = create_questions(self.course, 6)
+
+    def snapshot(self):
+        fields = ('course_id', 'learned', 'reviewing', 'mastered', 'total_repetitions', 'max_repetition',
+                  'max_repetition_question_id', 'first_study_date', 'last_review_date', 'farthest_review_date')
+        return list(LearningSummary.objects.filter(user=self.user).order_by('course_id').values_list(*fields))
+
+    def test_incremental_matches_rebuild(self):
+        rng = random.Random(3)
+        for _ in range(15):
+            updates = [{'question_id': rng.choice(self.questions).id, 'quality_score': rng.choice([0, 2, 4, 5, 5])}
+                       for _ in range(rng.randint(1, 6))]
+            self.client.post(self.url, {'updates': updates}, format='json')
+        incremental = self.snapshot()
+        rebuild_summaries(self.user)
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(incremental[0][1], LearningRecord.objects.filter(user=self.user).count())
+
+    @override_settings(SM2_ENGINE='atomic')
+    def test_atomic_engine_keeps_summary(self):
+        self.client.post(self.url, {'updates': [{'question_id': q.id, 'quality_score': 4} for q in self.questions[:3]]}, format='json')
+        self.assertEqual(self.snapshot()[0][1:3], (3, 3))
+
+    def test_stats_views_read_summary(self):
+        self.client.post(self.url, {'updates': [{'question_id': q.id, 'quality_score': 4} for q in self.questions[:2]]}, format='json')
+        stats_url = f'/api/learn/courses/{self.course.id}/question-stats/'
+        self.client.get(stats_url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(stats_url)
+        self.assertEqual(response.json()['learning_status'], {'not_learned': 4, 'reviewing': 2, 'mastered': 0})
+        self.assertEqual(len(ctx.captured_queries), 2)
+        data = self.client.get('/api/learn/courses/learning-statistics/').json()
+        self.assertEqual((data['learned_count'], data['total_repetitions']), (2, 2))
+        self.assertEqual(data['max_repetition_question']['id'], self.questions[0].id)
+
+    def test_question_delete_rebuilds(self):
+        self.client.post(self.url, {'updates': [{'question_id': q.id, 'quality_score': 4} for q in self.questions[:2]]}, format='json')
+        self.commit(self.questions[0].delete)
+        self.assertEqual(self.snapshot()[0][1], 1)
+
+    def test_question_delete_subtracts_without_rebuild(self):
+        self.client.post(self.url, {'updates': [{'question_id': q.id, 'quality_score': 4} for q in self.questions[:3]]}, format='json')
+        self.client.post(self.url, {'updates': [{'question_id': self.questions[0].id, 'quality_score': 5}]}, format='json')
+        today = timezone.localdate()
+        for question, offset in zip(self.questions[:3], (10, 3, 5)):
+            LearningRecord.objects.filter(user=self.user, question=question).update(
+                created_at=today - timedelta(days=offset), last_review_date=today - timedelta(days=offset % 4),
+                next_review_date=today + timedelta(days=offset * 2))
+        rebuild_summaries(user=self.user)
+        with mock.patch('users.signals.rebuild_summaries') as rebuild:
+            self.questions[1].delete()
+        rebuild.assert_not_called()
+        subtracted = self.snapshot()
+        rebuild_summaries(user=self.user)
+        self.assertEqual(subtracted, self.snapshot())
+
+    def test_delete_max_repetition_question_rebuilds_holder(self):
+        self.client.post(self.url, {'updates': [{'question_id': q.id, 'quality_score': 4} for q in self.questions[:2]]}, format='json')
+        self.client.post(self.url, {'updates': [{'question_id': self.questions[0].id, 'quality_score': 5}]}, format='json')
+        self.questions[0].delete()
+        summary = LearningSummary.objects.get(user=self.user, course=self.course)
+        self.assertEqual((summary.learned, summary.max_repetition, summary.max_repetition_question_id),
+                         (1, 1, self.questions[1].id))
+
+    def test_course_delete_skips_summaries(self):
+        self.client.post(self.url, {'updates': [{'question_id': q.id, 'quality_score': 4} for q in self.questions[:2]]}, format='json')
+        with mock.patch('users.signals.forget_question') as forget, mock.patch('users.signals.rebuild_summaries') as rebuild:
+            self.course.delete()
+        forget.assert_not_called()
+        rebuild.assert_not_called()
+        self.assertFalse(LearningSummary.objects.filter(user=self.user).exists())
+
+
+class ReviewLogTests(ApiTestCase):
+    role = '学生'
+    url = '/api/learn/courses/learning-records/'
+
+    def grade_twice(self):
+        question = create_questions(self.course, 1)[0]
+        for scores in ([4, 5], [2]):
+            self.client.post(self.url, {'updates': [{'question_id': question.id, 'quality_score': s} for s in scores]}, format='json')
+        return question
+
+    def assertLogChain(self, question):
+        fields = ('quality', 'previous_interval', 'interval', 'previous_ef', 'ef')
+        logs = list(ReviewLog.objects.filter(user=self.user, question=question).order_by('id').values_list(*fields))
+        self.assertEqual([log[0] for log in logs], [4, 5, 2])
+        self.assertEqual((logs[0][1], logs[0][3]), (1, 2.5))
+        for previous, current in zip(logs, logs[1:]):
+            self.assertEqual((current[1], current[3]), (previous[2], previous[4]))
+        record = LearningRecord.objects.get(user=self.user, question=question)
+        self.assertEqual((logs[-1][2], logs[-1][4]), (record.interval, record.ef))
+
+    def test_batch_engine_logs_each_grade(self):
+        self.assertLogChain(self.grade_twice())
+
+    @override_settings(SM2_ENGINE='atomic')
+    def test_atomic_engine_logs_each_grade(self):
+        self.assertLogChain(self.grade_twice())
+
+    @skipUnless(connection.vendor == 'postgresql', '只有PostgreSQL上分区')
+    def test_partition_takes_rows_from_default(self):
+        # 迁移只创建了之后3个月的分区，半年后的日志落在DEFAULT分区
+        later = timezone.now() + timedelta(days=200)
+        question = create_questions(self.course, 1)[0]
+        ReviewLog.objects.create(user=self.user, question=question, quality=4, previous_interval=1, interval=6,
+                                 previous_ef=2.5, ef=2.5, reviewed_at=later)
+        name = partition_name(later)
+        self.assertEqual(ensure_partitions(0, now=later), [name])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {name}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(ReviewLog.objects.filter(question=question).count(), 1)
+
+    def test_prune(self):
+        question = create_questions(self.course, 1)[0]
+        buffer = ReviewLogBuffer(self.user, timezone.now() - timedelta(days=120))
+        buffer.add(question.id, 4, 1, 1, 2.5, 2.5)
+        buffer.flush()
+        self.grade_twice()
+        self.assertEqual(prune_review_log(2), 1)
+        self.assertEqual(ReviewLog.objects.count(), 3)
+
+
+class SimulationTests(TestCase):
+    def test_simulation_is_deterministic(self):
+        first, second = simulate(20, 30, 40, new_per_day=5, seed=3), simulate(20, 30, 40, new_per_day=5, seed=3)
+        self.assertEqual(first['reviews'].tolist(), second['reviews'].tolist())
+        self.assertEqual((first['reviews'][0], first['new'][0], first['new'][6]), (0, 100, 0))
+        self.assertEqual(first['grades'], first['reviews'].sum() + first['new'].sum())
+        self.assertLessEqual(first['mastered'].max(), 20 * 30)
+
+    def test_engine_benchmark_rolls_back(self):
+        rates = benchmark_engines(grades=40, batch_size=20, questions=10)
+        self.assertEqual(set(rates), {'batch', 'atomic'})
+        self.assertFalse(LearningRecord.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='sm2-benchmark').exists())
+
+
+class ReviewForecastTests(ApiTestCase):
+    role = '学生'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        today = timezone.now().date()
+        other = Course.objects.create(name='另一门课程')
+        for course, offsets in ((self.course, (-2, 0, 1, 1)), (other, (1, 3))):
+            for offset, question in zip(offsets, create_questions(course, len(offsets))):
+                LearningRecord.objects.create(
+                    user=self.user, question=question, course=course,
+                    next_review_date=today + timedelta(days=offset), last_review_date=today
+                )
+        self.question = question
+
+    def test_overall_and_per_course(self):
+        data = self.client.get('/api/learn/review-forecast/', {'days': 4}).json()
+        self.assertEqual((data['overdue'], [day['due'] for day in data['forecast']]), (1, [1, 3, 0, 1]))
+        data = self.client.get(f'/api/learn/courses/{self.course.id}/review-forecast/', {'days': 2}).json()
+        self.assertEqual((data['overdue'], [day['due'] for day in data['forecast']]), (1, [1, 2]))
+        self.assertEqual(self.client.get('/api/learn/review-forecast/', {'days': 0}).status_code, 400)
+
+    def test_cached_until_next_grade(self):
+        url = '/api/learn/review-forecast/'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'days': 7})
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.client.post('/api/learn/courses/learning-records/', {'updates': [{'question_id': self.question.id, 'quality_score': 5}]}, format='json')
+        data = self.client.get(url, {'days': 7}).json()
+        self.assertEqual([day['due'] for day in data['forecast']][:4], [1, 4, 0, 0])
+
+
+class LoadSpreadingTests(ApiTestCase):
+    role = '学生'
+
+    def grade_mature_cards(self, count):
+        today = timezone.now().date()
+        questions = create_questions(self.course, count)
+        for question in questions:
+            LearningRecord.objects.create(
+                user=self.user, question=question, course=self.course, ef=2.5, interval=10, repetition=2,
+                next_review_date=today, last_review_date=today - timedelta(days=10)
+            )
+        apply_grades(self.user, [{'question_id': q.id, 'quality_score': 5} for q in questions], today)
+        records = LearningRecord.objects.filter(user=self.user)
+        return sorted((record.next_review_date - today).days for record in records), {record.interval for record in records}
+
+    def test_disabled_by_default(self):
+        self.assertEqual(self.grade_mature_cards(3), ([26, 26, 26], {26}))
+
+    @override_settings(SM2_SPREAD_TOLERANCE=0.5, SM2_SPREAD_MAX_DAYS=2)
+    def test_spreads_within_window(self):
+        self.assertEqual(self.grade_mature_cards(6), ([24, 25, 26, 26, 27, 28], {26}))
+
+    def test_pick_offset_and_metric(self):
+        self.assertEqual(pick_offset(1, 3, {}), 1)
+        self.assertEqual(pick_offset(5, 2, {5: 3, 4: 1, 6: 1, 3: 1, 7: 0}), 7)
+        self.assertEqual(peak_to_mean([2, 2, 2]), 1.0)
+        self.assertEqual(peak_to_mean([0, 0, 3]), 3.0)
+
+    def test_simulation_flattens_user_load(self):
+        plain = simulate(100, 60, 120, new_per_day=5, tolerance=0)
+        spread = simulate(100, 60, 120, new_per_day=5, tolerance=0.2)
+        self.assertLess(spread['user_peak_to_mean'], plain['user_peak_to_mean'])
+
+
+class AsyncViewTests(ApiTestCase):
+    role = '学生'
+
+    def setUp(self):
+        super().setUp()
+        self.questions = create_questions(self.course, 3)
+        token = RefreshToken.for_user(self.user).access_token
+        self.async_client = AsyncClient()
+        self.headers = {'authorization': f'Bearer {token}'}
+
+    async def test_matches_sync_views(self):
+        learn = f'/api/learn/courses/{self.course.id}/question-learn/'
+        response = await self.async_client.get(f'/api/learn/async/courses/{self.course.id}/question-learn/', {'question_num': 2}, headers=self.headers)
+        self.assertEqual(response.json(), (await sync_to_async(self.client.get)(learn, {'question_num': 2})).json())
+
+        updates = [{'question_id': q.id, 'quality_score': 1} for q in self.questions[:2]]
+        response = await self.async_client.post('/api/learn/async/courses/learning-records/', {'updates': updates}, content_type='application/json', headers=self.headers)
+        self.assertEqual([row['created'] for row in response.json()], [True, True])
+
+        response = await self.async_client.get(f'/api/learn/async/courses/{self.course.id}/question-review/', headers=self.headers)
+        self.assertEqual(response.json(), {"message": "今天暂时无需要复习的试题！"})
+        await LearningRecord.objects.filter(user=self.user).aupdate(next_review_date=timezone.now().date())
+        response = await self.async_client.get(f'/api/learn/async/courses/{self.course.id}/question-review/', headers=self.headers)
+        self.assertEqual([row['id'] for row in response.json()], [q.id for q in self.questions[:2]])
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(f'/api/learn/async/courses/{self.course.id}/question-review/')
+        self.assertEqual((response.status_code, response['WWW-Authenticate']), (401, 'Bearer realm="api"'))
+        response = await self.async_client.get('/api/learn/async/courses/999999/question-learn/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import CourseQuestionStatsView,StartLearningView,StartReviewView,BulkUpdateOrCreateLearningRecordsView,LearningStatisticsView
+from .async_views import AsyncStartLearningView,AsyncStartReviewView,AsyncBulkUpdateOrCreateLearningRecordsView
+from .views import CourseQuestionStatsView,StartLearningView,StartReviewView,BulkUpdateOrCreateLearningRecordsView,LearningStatisticsView,ReviewForecastView
 
 urlpatterns = [
   path('courses/<int:course_id>/question-stats/', CourseQuestionStatsView.as_view(), name='course-question-stats'), # 学习情况
@@ -7,4 +8,9 @@ urlpatterns = [
   path('courses/<int:course_id>/question-review/', StartReviewView.as_view(), name='course-question-stats'), # 复习试题
   path('courses/learning-records/', BulkUpdateOrCreateLearningRecordsView.as_view(), name='bulk-update-create-learning-records'), # 更新学习记录
   path('courses/learning-statistics/', LearningStatisticsView.as_view(), name='bulk-update-create-learning-records'), # 学习统计
-]
\ No newline at end of file
+  path('review-forecast/', ReviewForecastView.as_view(), name='review-forecast'), # 所有课程的复习量预测
+  path('courses/<int:course_id>/review-forecast/', ReviewForecastView.as_view(), name='course-review-forecast'), # 课程的复习量预测
+  path('async/courses/<int:course_id>/question-learn/', AsyncStartLearningView.as_view(), name='async-question-learn'), # 学习试题（异步）
+  path('async/courses/<int:course_id>/question-review/', AsyncStartReviewView.as_view(), name='async-question-review'), # 复习试题（异步）
+  path('async/courses/learning-records/', AsyncBulkUpdateOrCreateLearningRecordsView.as_view(), name='async-learning-records'), # 更新学习记录（异步）
+]
@@ -6,14 +6,19 @@ from rest_framework import serializers,status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from quizbank.models import Course, Question  # 引入quizbank应用的模型
-from .models import LearningRecord
-from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
+from .models import LearningSummary
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, inline_serializer
 from .serializers import LearningRecordSerializer
+from .scheduler import submit_grades
+from .queue import due_question_ids
+from .forecast import MAX_FORECAST_DAYS, review_forecast
+from .allocator import allocate_new_questions, parse_seed, ORDER_MODES, SEED_MIN, SEED_MAX
 from quizbank.serializers import QuestionSerializer
-from django.db.models import Sum, Min,Max
+from quizbank.cache import cached_course_payload
+from djanki.replica import ReplicaReadMixin
 
 # 获取某用户的某课程学习情况
-class CourseQuestionStatsView(APIView):
+class CourseQuestionStatsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
     @extend_schema(
         tags=['课程学习情况'],
@@ -42,16 +47,13 @@ class CourseQuestionStatsView(APIView):
         # 确保课程存在
         course = get_object_or_404(Course, pk=course_id)
 
-        # 获取课程下所有试题数量
-        total_questions_count = Question.objects.filter(course=course).count()
-
-        # 获取用户在此课程中的学习记录，包括reviewing和mastered状态
-        learning_records = LearningRecord.objects.filter(user=request.user, question__course=course)
-        reviewing_count = learning_records.filter(status='reviewing').count()
-        mastered_count = learning_records.filter(status='mastered').count()
+        # 课程试题数量按课程版本缓存，用户的学习数量从汇总表读取
+        total_questions_count = cached_course_payload(course.id, 'question-count', Question.objects.filter(course=course).count)
+        summary = LearningSummary.objects.filter(user=request.user, course=course).first() or LearningSummary()
+        reviewing_count, mastered_count = summary.reviewing, summary.mastered
 
         # 未学习的试题数量
-        not_learned_count = total_questions_count - (reviewing_count + mastered_count)
+        not_learned_count = total_questions_count - summary.learned
 
         return Response({
             'course_id': course_id,
@@ -69,20 +71,31 @@ class StartLearningView(APIView):
 
     @extend_schema(
         tags=['课程学习情况'],
+        summary="获取未学习的试题",
+        description="按order指定的稳定顺序返回question_num道未学习的试题：id为添加顺序，category为知识点树顺序，type为题型，random为按seed固定的随机顺序。",
+        parameters=[
+            OpenApiParameter('question_num', int, description='返回数量，默认5'),
+            OpenApiParameter('order', str, enum=ORDER_MODES, description='出题顺序，默认id'),
+            OpenApiParameter('seed', int, description='order为random时的随机种子'),
+        ],
     )
     def get(self, request, course_id):
         question_num = int(request.query_params.get('question_num', 5))  # 默认返回5题，如果没有指定则返回5题
         course = get_object_or_404(Course, id=course_id)
-
-        learned_questions = LearningRecord.objects.filter(
-            user=request.user,
-            question__course=course
-        ).values_list('question_id', flat=True)
-
-        # 获取尚未学习的试题，并限制返回的数量
-        new_questions = Question.objects.filter(course=course).exclude(id__in=learned_questions)[:question_num]
-
-        if new_questions.exists():
+        order_mode = request.query_params.get('order', 'id')
+        if order_mode not in ORDER_MODES:
+            return Response({'error': f'order必须是{"、".join(ORDER_MODES)}之一'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            seed = parse_seed(request.query_params.get('seed', 0)) if order_mode == 'random' else 0
+        except ValueError:
+            return Response({'error': f'seed必须是{SEED_MIN}到{SEED_MAX}之间的整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 从学习进度游标处取尚未学习的试题，并限制返回的数量
+        question_ids = allocate_new_questions(request.user, course.id, question_num, order_mode, seed)
+        questions = QuestionSerializer.setup_eager_loading(Question.objects.filter(id__in=question_ids)).in_bulk()
+        new_questions = [questions[question_id] for question_id in question_ids if question_id in questions]
+
+        if new_questions:
             return Response(QuestionSerializer(new_questions, many=True).data)
         else:
             return Response({"message": "暂无要学习试题！"}, status=200)
@@ -97,15 +110,12 @@ class StartReviewView(APIView):
         question_num = int(request.query_params.get('question_num', 5))  # 从查询参数中获取 question_num
         course = get_object_or_404(Course, id=course_id)
 
-        # 查询用户在指定课程中已学习且计划复习日期小于或等于今天的试题
-        review_records = LearningRecord.objects.filter(
-            user=request.user,
-            question__course=course,
-            next_review_date__lte=today  # 只选择需要复习的（即复习日期小于或等于今天的）
-        ).select_related('question').order_by('next_review_date')[:question_num]
+        # 用户在指定课程中计划复习日期小于或等于今天的试题，由(user, course, next_review_date)索引提供
+        question_ids = due_question_ids(request.user, course.id, question_num, today)
+        questions = QuestionSerializer.setup_eager_loading(Question.objects.filter(id__in=question_ids)).in_bulk()
 
-        # 获取这些记录对应的试题
-        questions_to_review = [record.question for record in review_records]
+        # 保持到期先后顺序，跳过已删除的试题
+        questions_to_review = [questions[question_id] for question_id in question_ids if question_id in questions]
 
         if questions_to_review:
             return Response(QuestionSerializer(questions_to_review, many=True).data)
@@ -116,97 +126,57 @@ class StartReviewView(APIView):
 class BulkUpdateOrCreateLearningRecordsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @extend_schema(
+        tags=['课程学习情况'],
+        summary="批量提交评分",
+        description="按SM-2批量更新或创建学习记录：两次查询加载试题和记录，批量计算后在一个事务内写入。",
+    )
     def post(self, request):
         updates = request.data.get('updates', [])
-        response_data = []
-        errors = []
-        for update in updates:
-            question_id = update.get('question_id')
-            quality_score = update.get('quality_score')
-            try:
-                question = Question.objects.get(pk=question_id)
-                quality_score = int(quality_score)
-                course = question.course  # 确保从问题中获取课程信息
-                if not (0 <= quality_score <= 5):
-                    raise ValueError("质量评分必须在0到5之间")
-
-                learning_record, created = LearningRecord.objects.get_or_create(
-                    user=request.user,
-                    question=question,
-                    course=course,
-                    defaults={
-                        'next_review_date': timezone.now().date(),
-                        'last_review_date': timezone.now().date(),
-                        'ef': 2.5,
-                        'interval': 1,
-                        'status': 'learning'
-                    }
-                )
-                # 更新学习参数
-                learning_record.update_learning_parameters(quality_score)
-                
-                response_data.append({
-                    'question_id': question_id,
-                    'message': 'Updated successfully',
-                    'created': created
-                })
-            except Exception as e:
-                errors.append({
-                    'question_id': question_id,
-                    'error': str(e)
-                })
+        if not isinstance(updates, list):
+            return Response({'errors': [{'error': 'updates必须是列表'}]}, status=400)
+        response_data, errors = submit_grades(request.user, updates)
 
         if errors:
             return Response({'errors': errors}, status=400)
         return Response(response_data, status=200)
     
 # 学习统计
-class LearningStatisticsView(APIView):
+class LearningStatisticsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user  # 获取当前用户
         today = datetime.now().date()
 
-        # 获取所有与该用户相关的学习记录
-        learning_records = LearningRecord.objects.filter(user=user)
+        # 汇总该用户各课程的学习汇总
+        summaries = list(LearningSummary.objects.filter(user=user, learned__gt=0))
 
-        if not learning_records.exists():
+        if not summaries:
             return Response(
                 {"message": "没有找到与该用户相关的学习记录。"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # 计算复习总次数
-        total_repetitions = learning_records.aggregate(Sum('repetition'))['repetition__sum']
-
-        # 计算已掌握的试题总数
-        mastered_count = learning_records.filter(status='mastered').count()
-
-        # 计算已学习的试题总数
-        learned_count = learning_records.count()
-
-        # 获取最早的学习记录创建时间
-        start_time = learning_records.aggregate(Min('created_at'))['created_at__min']
+        # 计算复习总次数、已掌握和已学习的试题总数
+        total_repetitions = sum(summary.total_repetitions for summary in summaries)
+        mastered_count = sum(summary.mastered for summary in summaries)
+        learned_count = sum(summary.learned for summary in summaries)
 
         # 计算已学习天数
-        if start_time:
-            learning_days = (today - start_time).days  # 直接计算天数
-        else:
-            learning_days = 0
+        start_time = min(summary.first_study_date for summary in summaries)
+        learning_days = (today - start_time).days
 
         # 获取单个repetition最多的试题
-        max_repetition_record = learning_records.order_by('-repetition').first()
+        top = max(summaries, key=lambda summary: summary.max_repetition)
         max_repetition_question = None
-        if max_repetition_record:
-            question_id = max_repetition_record.question_id
-            max_repetition_question = QuestionSerializer(Question.objects.get(id=question_id)).data
-
-        # 获取最近一次学习时间
-        last_review_date = learning_records.aggregate(Max('last_review_date'))['last_review_date__max']
+        if top.max_repetition_question_id:
+            question = QuestionSerializer.setup_eager_loading(Question.objects.filter(id=top.max_repetition_question_id)).first()
+            max_repetition_question = QuestionSerializer(question).data if question else None
 
-        # 获取最远一次复习时间
-        farthest_review_date = learning_records.aggregate(Max('next_review_date'))['next_review_date__max']
+        # 获取最近一次学习时间和最远一次复习时间
+        last_review_date = max(summary.last_review_date for summary in summaries)
+        farthest_review_date = max(summary.farthest_review_date for summary in summaries)
 
         response_data = {
             "total_repetitions": total_repetitions,
@@ -218,4 +188,40 @@ class LearningStatisticsView(APIView):
             "farthest_review_date": farthest_review_date,
         }
 
-        return Response(response_data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(response_data, status=status.HTTP_200_OK)
+# 复习量预测
+class ReviewForecastView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['课程学习情况'],
+        summary="复习量预测",
+        description="返回未来days天每天到期的复习数量、其峰均比和已逾期的数量；按课程或汇总所有课程，结果缓存到用户下一次评分。",
+        parameters=[OpenApiParameter('days', int, description=f'预测天数，1~{MAX_FORECAST_DAYS}，默认30')],
+        responses={
+            200: inline_serializer(
+                name='ReviewForecastResponse',
+                fields={
+                    'course_id': serializers.IntegerField(allow_null=True),
+                    'overdue': serializers.IntegerField(),
+                    'peak_to_mean': serializers.FloatField(),
+                    'forecast': inline_serializer(
+                        name='ReviewForecastDay',
+                        fields={'date': serializers.DateField(), 'due': serializers.IntegerField()},
+                        many=True,
+                    ),
+                }
+            ),
+            404: OpenApiResponse(description="课程未找到")
+        },
+    )
+    def get(self, request, course_id=None):
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_FORECAST_DAYS:
+            return Response({'error': f'days必须是1到{MAX_FORECAST_DAYS}之间的整数'}, status=status.HTTP_400_BAD_REQUEST)
+        if course_id is not None:
+            course_id = get_object_or_404(Course, id=course_id).id
+        return Response({'course_id': course_id, **review_forecast(request.user, days, course_id)})